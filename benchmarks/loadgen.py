@@ -0,0 +1,50 @@
+"""Synthetic child process emitting configurable output, used by the benchmarks.
+
+Without a rate, all lines are written at once in large blocks. With a rate, the
+lines of both streams are paced to that many lines per second and start with
+the `time.monotonic()` at which they were written, so that a reader on the same
+host can measure how long they took to reach it.
+
+Usage:
+    python benchmarks/loadgen.py [--stdout-lines N] [--stderr-lines N]
+        [--line-length N] [--rate LINES_PER_SECOND]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+
+def main() -> None:
+    """Emit the requested output on stdout and stderr."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stdout-lines", type=int, default=10_000)
+    parser.add_argument("--stderr-lines", type=int, default=0)
+    parser.add_argument("--line-length", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=0)
+    opts = parser.parse_args()
+
+    stdout, stderr = sys.stdout.buffer, sys.stderr.buffer
+    padding = b"x" * opts.line_length
+    if not opts.rate:
+        stdout.write((padding + b"\n") * opts.stdout_lines)
+        stderr.write((padding + b"\n") * opts.stderr_lines)
+        return
+
+    start = time.monotonic()
+    for n in range(max(opts.stdout_lines, opts.stderr_lines)):
+        delay = start + n / opts.rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        stamp = f"{time.monotonic():.6f} ".encode()
+        line = (stamp + padding)[: max(opts.line_length, len(stamp))] + b"\n"
+        for stream, lines in ((stdout, opts.stdout_lines), (stderr, opts.stderr_lines)):
+            if n < lines:
+                stream.write(line)
+                stream.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare Invoker stdio logging throughput against the legacy per-line loop.
+
+Usage:
+    python benchmarks/log_stdio.py [--lines N] [--line-length N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import structlog
+
+from meltano.edk.logging import default_logging_config
+from meltano.edk.process import Invoker
+
+log = structlog.get_logger()
+
+EMITTER = (
+    "import sys\n"
+    "line = b'x' * {length} + b'\\n'\n"
+    "sys.stdout.buffer.write(line * {lines})\n"
+)
+
+
+async def _legacy_log_stdio(
+    reader: asyncio.StreamReader,
+    logger: structlog.BoundLogger,
+) -> None:
+    """The per-line loop `Invoker._log_stdio` used before chunked reads."""
+    while True:
+        if reader.at_eof():
+            break
+        data = await reader.readline()
+        logger.info(data.decode("utf-8").rstrip())
+        await asyncio.sleep(0)
+
+
+class LegacyInvoker(Invoker):
+    """Invoker using the legacy per-line stdio loop."""
+
+    async def _log_stdio(
+        self,
+        reader: asyncio.StreamReader,
+        logger: structlog.BoundLogger = log,
+    ) -> None:
+        await _legacy_log_stdio(reader, logger)
+
+
+def _measure(invoker: Invoker, code: str) -> float:
+    start = time.perf_counter()
+    invoker.run_and_log("-c", code)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Run the comparison and print lines/s for both implementations."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--line-length", type=int, default=80)
+    opts = parser.parse_args()
+
+    default_logging_config(level=logging.INFO)
+    devnull = open(os.devnull, "w")  # noqa: SIM115
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(devnull)
+
+    code = EMITTER.format(length=opts.line_length, lines=opts.lines)
+    for name, invoker in (
+        ("per-line", LegacyInvoker(sys.executable)),
+        ("chunked", Invoker(sys.executable)),
+    ):
+        elapsed = _measure(invoker, code)
+        print(f"{name:>10}: {opts.lines / elapsed:>12,.0f} lines/s ({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare events/s of the JSON logging configurations of default_logging_config.
+
+Each configuration is measured in a fresh interpreter, since structlog and
+stdlib logging can only be configured once per process, with stderr sent to
+/dev/null.
+
+Usage:
+    python benchmarks/logging_renderers.py [--events N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+
+CONFIGURATIONS = {
+    "stdlib json": {"MELTANO_LOG_JSON": "true"},
+    "fast json": {"MELTANO_LOG_JSON": "true", "LOG_FAST_JSON": "true"},
+    "fast json, background": {
+        "MELTANO_LOG_JSON": "true",
+        "LOG_FAST_JSON": "true",
+        "LOG_BACKGROUND": "true",
+    },
+}
+
+WORKER = """
+import sys
+import time
+
+import structlog
+
+from meltano.edk.logging import pass_through_logging_config
+
+pass_through_logging_config()
+log = structlog.get_logger()
+events = int(sys.argv[1])
+
+start = time.perf_counter()
+for n in range(events):
+    log.info("benchmark event", n=n, stream="stdout", payload="x" * 64)
+print(time.perf_counter() - start)
+"""
+
+
+def _measure(env: dict[str, str], events: int) -> float:
+    with open(os.devnull, "wb") as devnull:
+        p = subprocess.run(
+            [sys.executable, "-c", WORKER, str(events)],
+            env={**os.environ, "LOG_TIMESTAMPS": "true", "LOG_LEVELS": "true", **env},
+            stdout=subprocess.PIPE,
+            stderr=devnull,
+            text=True,
+            check=True,
+        )
+    return float(p.stdout)
+
+
+def main() -> None:
+    """Run every configuration and print its events/s."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=200_000)
+    opts = parser.parse_args()
+
+    for name, env in CONFIGURATIONS.items():
+        elapsed = _measure(env, opts.events)
+        print(f"{name:>22}: {opts.events / elapsed:>12,.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
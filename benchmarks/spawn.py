@@ -0,0 +1,49 @@
+"""Measure how many short-lived subprocesses an Invoker spawns per second.
+
+Compares the default spawn path against `fast_spawn=True`, for both the
+blocking `run` and the asyncio based `run_and_log`.
+
+Usage:
+    python benchmarks/spawn.py [--spawns N] [--bin BINARY]
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import time
+
+from meltano.edk.process import Invoker
+
+
+def _measure(invoker: Invoker, method: str, spawns: int) -> float:
+    start = time.perf_counter()
+    for _ in range(spawns):
+        if method == "run":
+            invoker.run(stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            invoker.run_and_log()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Run the comparison and print spawns/s for every combination."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--spawns", type=int, default=500)
+    parser.add_argument("--bin", default="true")
+    opts = parser.parse_args()
+
+    for method in ("run", "run_and_log"):
+        for fast_spawn in (False, True):
+            invoker = Invoker(opts.bin, fast_spawn=fast_spawn)
+            _measure(invoker, method, 10)  # warm up
+            elapsed = _measure(invoker, method, opts.spawns)
+            mode = "fast" if fast_spawn else "default"
+            print(
+                f"{method:>12} {mode:>8}: {opts.spawns / elapsed:>8.0f} spawns/s "
+                f"({elapsed / opts.spawns * 1e6:.0f} us/spawn)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""Stand-in for a Python CLI that is slow to start, used by the benchmarks.
+
+Importing it costs `STANDIN_IMPORT_TIME` seconds (0.5 by default), like a CLI
+that pulls in a large dependency tree.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+
+time.sleep(float(os.environ.get("STANDIN_IMPORT_TIME", "0.5")))
+
+
+def main() -> None:
+    """Echo the command line arguments."""
+    print(*sys.argv[1:])
+
+
+if __name__ == "__main__":
+    main()
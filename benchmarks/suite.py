@@ -0,0 +1,338 @@
+"""Benchmark the EDK hot paths and compare the results against stored baselines.
+
+Every case runs in a fresh interpreter, with its stderr sent to /dev/null, so
+that logging can be configured per case and peak RSS is not shared between
+cases. Output is produced by the synthetic child process in `loadgen.py`.
+
+Metrics ending in `_per_s` are better when higher, all others (latencies and
+peak RSS) when lower. A metric worse than its baseline by more than the
+tolerance is reported as a regression and makes the suite exit with status 1.
+
+Baselines hold absolute timings, which only mean something on the machine
+they were recorded on. They are not committed: record one locally with `--save`
+before making a change, compare against it afterwards, and record it again after
+changing hardware or Python version. The suite is a tool for local comparisons,
+not a CI gate.
+
+Usage:
+    python benchmarks/suite.py [--case NAME ...] [--scale FACTOR]
+        [--tolerance FRACTION] [--baseline PATH] [--save]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import typing as t
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+import structlog
+
+HERE = Path(__file__).parent
+LOADGEN = str(HERE / "loadgen.py")
+DEFAULT_BASELINE = HERE / "baseline.json"
+LINE_LENGTH = 100
+
+# ru_maxrss is reported in bytes on macOS and in kilobytes everywhere else.
+_MAXRSS_SCALE = 1 if sys.platform == "darwin" else 1024
+
+Metrics: t.TypeAlias = dict[str, float]
+
+
+def _peak_rss_mb(who: int | None = None) -> float:
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_SELF if who is None else who)
+    return round(usage.ru_maxrss * _MAXRSS_SCALE / 2**20, 1)
+
+
+def _throughput(elapsed: float, lines: int, line_length: int = LINE_LENGTH) -> Metrics:
+    return {
+        "lines_per_s": round(lines / elapsed),
+        "mb_per_s": round(lines * (line_length + 1) / elapsed / 2**20, 1),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _configure_logging(**kwargs: t.Any) -> None:
+    from meltano.edk.logging import default_logging_config
+
+    default_logging_config(level=logging.INFO, **kwargs)
+
+
+def case_run_and_log(scale: float) -> Metrics:
+    """Log the stdout and stderr of a subprocess with `run_and_log`."""
+    from meltano.edk.process import Invoker
+
+    _configure_logging()
+    lines = int(100_000 * scale)
+    start = time.perf_counter()
+    Invoker(sys.executable).run_and_log(
+        LOADGEN, "--stdout-lines", str(lines), "--stderr-lines", str(lines)
+    )
+    return _throughput(time.perf_counter() - start, 2 * lines)
+
+
+def case_run_and_log_latency(scale: float) -> Metrics:
+    """Measure the delay between a line being written and it being handled."""
+    from meltano.edk.process import Invoker
+
+    delays: list[float] = []
+
+    class _LatencyRecorder:
+        def feed(self, lines: list[bytes], logger: structlog.BoundLogger) -> None:
+            now = time.monotonic()
+            delays.extend(now - float(line.split(b" ", 1)[0]) for line in lines)
+
+        def close(self, logger: structlog.BoundLogger) -> None:
+            pass
+
+    _configure_logging()
+    lines = int(2_000 * scale)
+    Invoker(sys.executable, stdout_classifier=_LatencyRecorder).run_and_log(
+        LOADGEN, "--stdout-lines", str(lines), "--rate", "2000"
+    )
+    quantiles = statistics.quantiles(delays, n=100)
+    return {
+        "latency_p50_ms": round(quantiles[49] * 1000, 2),
+        "latency_p99_ms": round(quantiles[98] * 1000, 2),
+    }
+
+
+def case_run_capture(scale: float) -> Metrics:
+    """Capture the stdout of a subprocess in memory with `run`."""
+    from meltano.edk.process import Invoker
+
+    lines = int(500_000 * scale)
+    start = time.perf_counter()
+    Invoker(sys.executable).run(LOADGEN, "--stdout-lines", str(lines))
+    return _throughput(time.perf_counter() - start, lines)
+
+
+def _logging_case(scale: float, **kwargs: t.Any) -> Metrics:
+    _configure_logging(**kwargs)
+    log = structlog.get_logger()
+    events = int(100_000 * scale)
+    start = time.perf_counter()
+    for n in range(events):
+        log.info("benchmark event", n=n, stream="stdout", payload="x" * 64)
+    elapsed = time.perf_counter() - start
+    return {"events_per_s": round(events / elapsed), "peak_rss_mb": _peak_rss_mb()}
+
+
+def case_logging_console(scale: float) -> Metrics:
+    """Render events with the default console renderer."""
+    return _logging_case(scale)
+
+
+def case_logging_json(scale: float) -> Metrics:
+    """Render events with the stdlib JSON renderer."""
+    return _logging_case(scale, json_format=True)
+
+
+def case_logging_fast_json(scale: float) -> Metrics:
+    """Render events with the fast JSON renderer."""
+    return _logging_case(scale, json_format=True, fast_json=True)
+
+
+def case_describe_formatted(scale: float) -> Metrics:
+    """Format the description of an extension in every supported format."""
+    from meltano.edk import models
+    from meltano.edk.extension import DescribeFormat, ExtensionBase
+
+    class _Extension(ExtensionBase):
+        def invoke(self, command_name: str | None, *command_args: t.Any) -> None:
+            pass
+
+        def describe(self) -> models.Describe:
+            return models.Describe(
+                commands=[
+                    models.ExtensionCommand(name="benchmark_extension"),
+                    models.InvokerCommand(name="benchmark_invoker"),
+                ]
+            )
+
+    extension = _Extension()
+    calls = int(2_000 * scale)
+    start = time.perf_counter()
+    for _ in range(calls):
+        for fmt in DescribeFormat:
+            extension.describe_formatted(fmt)
+    elapsed = time.perf_counter() - start
+    return {"calls_per_s": round(calls * len(DescribeFormat) / elapsed)}
+
+
+PASS_THROUGH_SHIM = """
+import sys
+
+from meltano.edk.logging import pass_through_logging_config
+from meltano.edk.process import Invoker
+
+pass_through_logging_config()
+Invoker(sys.executable).run_and_log("-c", "pass")
+"""
+
+
+def case_pass_through_cold_start(scale: float) -> Metrics:
+    """Start a pass-through shim wrapping a trivial command, from scratch."""
+    times = []
+    for _ in range(max(int(10 * scale), 2)):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", PASS_THROUGH_SHIM], check=True)
+        times.append(time.perf_counter() - start)
+    return {
+        "latency_p50_ms": round(statistics.median(times) * 1000, 1),
+        "peak_rss_mb": _peak_rss_mb(
+            resource.RUSAGE_CHILDREN if resource is not None else None
+        ),
+    }
+
+
+# Modules imported by the pass-through shim and the extension it instantiates.
+INVOKE_PATH = ("meltano.edk.extension", "meltano.edk.logging", "meltano.edk.process")
+
+
+def _import_times(*modules: str) -> dict[str, tuple[int, int]]:
+    """Import modules in a fresh interpreter and collect `-X importtime` timings.
+
+    Returns:
+        The self and cumulative import time, in microseconds, of every module
+        that was imported.
+    """
+    code = "; ".join(f"import {module}" for module in modules)
+    p = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = {}
+    for line in p.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def case_import_invoke_path(scale: float) -> Metrics:
+    """Time spent in the EDK's own modules when importing the invoke path."""
+    times = []
+    for _ in range(max(int(5 * scale), 1)):
+        timings = _import_times(*INVOKE_PATH)
+        times.append(
+            sum(
+                self_us
+                for name, (self_us, _) in timings.items()
+                if name.startswith("meltano.edk")
+            )
+        )
+    return {"self_time_ms": round(statistics.median(times) / 1000, 2)}
+
+
+def case_import_extension(scale: float) -> Metrics:
+    """Import the extension module, with everything it imports."""
+    times = [
+        _import_times("meltano.edk.extension")["meltano.edk.extension"][1]
+        for _ in range(max(int(5 * scale), 1))
+    ]
+    return {"cumulative_ms": round(statistics.median(times) / 1000, 2)}
+
+
+CASES: dict[str, t.Callable[[float], Metrics]] = {
+    name.removeprefix("case_"): case
+    for name, case in globals().items()
+    if name.startswith("case_")
+}
+
+
+def _run_case(name: str, scale: float) -> Metrics:
+    with open(os.devnull, "wb") as devnull:
+        p = subprocess.run(
+            [sys.executable, __file__, "--run-case", name, "--scale", str(scale)],
+            stdout=subprocess.PIPE,
+            stderr=devnull,
+            check=True,
+        )
+    return t.cast(Metrics, json.loads(p.stdout))
+
+
+def _regressed(metric: str, value: float, baseline: float, tolerance: float) -> bool:
+    if metric.endswith("_per_s"):
+        return value < baseline * (1 - tolerance)
+    return value > baseline * (1 + tolerance)
+
+
+def _environment() -> dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def main() -> None:
+    """Run the cases, compare them with the baseline and report regressions."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--case", action="append", choices=sorted(CASES))
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    opts = parser.parse_args()
+
+    if opts.run_case:
+        print(json.dumps(CASES[opts.run_case](opts.scale)))
+        return
+
+    stored = json.loads(opts.baseline.read_text()) if opts.baseline.exists() else {}
+    baselines: dict[str, Metrics] = stored.get("cases", {})
+    if not stored and not opts.save:
+        print(f"no baseline at {opts.baseline}, record one on this machine with --save")
+    elif stored and stored.get("environment") != _environment():
+        print(f"warning: {opts.baseline} was recorded on {stored.get('environment')}")
+
+    results: dict[str, Metrics] = {}
+    regressions = 0
+    for name in opts.case or CASES:
+        results[name] = _run_case(name, opts.scale)
+        for metric, value in results[name].items():
+            baseline = baselines.get(name, {}).get(metric)
+            status = ""
+            if baseline is not None:
+                status = f"baseline {baseline:>12,}"
+                if _regressed(metric, value, baseline, opts.tolerance):
+                    status += "  REGRESSION"
+                    regressions += 1
+            print(f"{name:>24} {metric:>16}: {value:>12,} {status}")
+
+    if opts.save:
+        baselines.update(results)
+        opts.baseline.write_text(
+            json.dumps(
+                {"environment": _environment(), "cases": baselines},
+                indent=2,
+                sort_keys=True,
+            )
+            + "\n"
+        )
+        print(f"baseline saved to {opts.baseline}")
+    elif regressions:
+        sys.exit(f"{regressions} metric(s) regressed by more than {opts.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
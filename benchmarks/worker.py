@@ -0,0 +1,55 @@
+"""Compare cold spawns of a slow-to-start CLI against a warm persistent Worker.
+
+The worker timing includes its own startup, paid once for all the calls.
+
+Usage:
+    python benchmarks/worker.py [--calls N] [--import-time SECONDS]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+from meltano.edk.process import Invoker
+from meltano.edk.worker import Worker
+
+STANDIN = Path(__file__).with_name("standin_cli.py")
+
+
+def main() -> None:
+    """Run the comparison and print calls/s for both modes."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--import-time", type=float, default=0.5)
+    opts = parser.parse_args()
+
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(STANDIN.parent),
+        "STANDIN_IMPORT_TIME": str(opts.import_time),
+    }
+    invoker = Invoker(sys.executable, env=env)
+    start = time.perf_counter()
+    for n in range(opts.calls):
+        invoker.run(str(STANDIN), "call", str(n))
+    cold = time.perf_counter() - start
+
+    with Worker.python_entry_point("standin_cli:main", env=env) as worker:
+        start = time.perf_counter()
+        for n in range(opts.calls):
+            worker.run("call", str(n))
+        warm = time.perf_counter() - start
+
+    for name, elapsed in (("cold", cold), ("warm", warm)):
+        print(
+            f"{name:>6}: {opts.calls / elapsed:>8.1f} calls/s "
+            f"({elapsed / opts.calls * 1000:.1f} ms/call)"
+        )
+
+
+if __name__ == "__main__":
+    main()
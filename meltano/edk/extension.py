@@ -2,19 +2,22 @@
 
 from __future__ import annotations
 
+import atexit
 import dataclasses
-import json
+import os
 import sys
+import typing as t
 from abc import ABCMeta, abstractmethod
 from enum import Enum
 
-import structlog
-import yaml
-from devtools.prettier import pformat
-
-from meltano.edk import models
+from meltano.edk import models, profiling
 from meltano.edk.types import ExecArg
 
+if t.TYPE_CHECKING:
+    import asyncio
+
+    import structlog
+
 
 class DescribeFormat(str, Enum):
     """The currently supported Describe output formats."""
@@ -24,6 +27,82 @@ class DescribeFormat(str, Enum):
     yaml = "yaml"
 
 
+# Default file name of the describe manifest, stored next to the extension package.
+DESCRIBE_MANIFEST = "describe.manifest.json"
+
+
+def _source_fingerprint(sources: t.Iterable[str | os.PathLike[str]]) -> str:
+    """Fingerprint source files by their path, size and modification time.
+
+    Args:
+        sources: Source files, or directories whose Python files are included.
+
+    Returns:
+        A digest that changes whenever one of the files changes.
+    """
+    import hashlib
+
+    paths: list[str] = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths.extend(
+                os.path.join(root, name)
+                for root, _, names in os.walk(source)
+                for name in names
+                if name.endswith(".py")
+            )
+        else:
+            paths.append(os.fspath(source))
+
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def load_describe_manifest(
+    path: str | os.PathLike[str],
+    version: str,
+    sources: t.Sequence[str | os.PathLike[str]] = (),
+) -> dict[str, str] | None:
+    """Load pre-rendered describe output from a manifest.
+
+    Reading the manifest does not require importing or instantiating the
+    extension, which makes it suitable as a fast path for `describe`.
+
+    Args:
+        path: The path of the manifest.
+        version: The version of the extension package that is installed.
+        sources: Source files of the extension, or directories of them, that
+            the manifest was written from. Editable installs keep their version
+            when the code changes, so the manifest is also invalidated when
+            these change.
+
+    Returns:
+        The describe output keyed by `DescribeFormat` value, or None if the
+        manifest is missing, unreadable or was written by another version or
+        from other sources.
+    """
+    import json
+
+    try:
+        with open(path, "rb") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(manifest, dict) or manifest.get("version") != version:
+        return None
+    if sources and manifest.get("sources") != _source_fingerprint(sources):
+        return None
+    formats = manifest.get("formats")
+    return formats if isinstance(formats, dict) else None
+
+
 class ExtensionBase(metaclass=ABCMeta):
     """Basic extension interface that must be implemented by all extensions."""
 
@@ -45,6 +124,8 @@ class ExtensionBase(metaclass=ABCMeta):
 
         This method is called on-demand by the user to initialize the extension.
         Extensions are not required to implement this method, and may no-op.
+        Generated files can be written with `meltano.edk.files.FileMaterializer`,
+        passing `force` through so that a forced initialization rewrites them.
 
         Args:
             force: If True, force initialization.
@@ -94,17 +175,57 @@ class ExtensionBase(metaclass=ABCMeta):
         Returns:
             str: The formatted description.
         """
+        # The serializers are imported here rather than at the module level, so
+        # that invoking the extension does not pay for importing them.
         if output_format == DescribeFormat.text:
+            from devtools.prettier import pformat
+
             return pformat(self.describe())
         elif output_format == DescribeFormat.json:
+            import json
+
             return json.dumps(dataclasses.asdict(self.describe()), indent=2)
         elif output_format == DescribeFormat.yaml:
+            import yaml
+
             return yaml.dump(
                 dataclasses.asdict(self.describe()),
                 sort_keys=False,
                 indent=2,
             )
 
+    def write_describe_manifest(
+        self,
+        path: str | os.PathLike[str],
+        version: str,
+        sources: t.Sequence[str | os.PathLike[str]] = (),
+    ) -> None:
+        """Pre-render the describe output in every format to a manifest.
+
+        The manifest is written atomically, and is only valid for the given
+        package version and sources, see `load_describe_manifest`.
+
+        Args:
+            path: The path of the manifest.
+            version: The version of the extension package that is installed.
+            sources: Source files of the extension, or directories of them.
+        """
+        import json
+
+        from meltano.edk.files import _atomic_write, _default_mode
+
+        manifest = {
+            "version": version,
+            "sources": _source_fingerprint(sources),
+            "formats": {
+                fmt.value: self.describe_formatted(fmt) for fmt in DescribeFormat
+            },
+        }
+        # With the permissions of any other file the extension writes.
+        _atomic_write(
+            os.path.abspath(path), json.dumps(manifest).encode(), _default_mode()
+        )
+
     def pass_through_invoker(
         self,
         logger: structlog.BoundLogger,
@@ -125,25 +246,223 @@ class ExtensionBase(metaclass=ABCMeta):
             command_args=command_args,
         )
         try:
-            self.pre_invoke(None, *command_args)
-        except Exception:
-            logger.exception(
-                "pre_invoke failed with uncaught exception, please report to maintainer"
-            )
-            sys.exit(1)
+            try:
+                with profiling.phase("pre_invoke"):
+                    self.pre_invoke(None, *command_args)
+            except Exception:
+                logger.exception(
+                    "pre_invoke failed with uncaught exception, please report to maintainer"  # noqa: E501
+                )
+                sys.exit(1)
+
+            try:
+                with profiling.phase("invoke"):
+                    self.invoke(None, *command_args)
+            except Exception:
+                logger.exception(
+                    "invoke failed with uncaught exception, please report to maintainer"
+                )
+                sys.exit(1)
+
+            try:
+                with profiling.phase("post_invoke"):
+                    self.post_invoke(None, *command_args)
+            except Exception:
+                logger.exception(
+                    "post_invoke failed with uncaught exception, please report to maintainer"  # noqa: E501
+                )
+                sys.exit(1)
+        finally:
+            profiler = profiling.get_profiler()
+            if profiler is not None:
+                profiler.finish(logger)
+
+
+class AsyncExtensionBase(ExtensionBase):
+    """Extension interface with asynchronous lifecycle hooks.
+
+    The hooks of a pass-through invocation all run on a single event loop, so
+    work started by one can carry on while the next one runs, e.g. `apre_invoke`
+    can start rendering config in a task and return right away, and `ainvoke`
+    can start the wrapped CLI with `Invoker.arun_and_log` while awaiting the
+    task only when it needs the config.
+
+    The synchronous hooks of `ExtensionBase` are implemented on top of the
+    asynchronous ones, so the extension can still be driven like any other. They
+    share an event loop that lives as long as the extension, so the above works
+    across them too. It is closed by `close_loop`, at exit at the latest.
+    """
+
+    #: Factory for the event loop the hooks run on, defaults to the asyncio one.
+    loop_factory: t.Callable[[], asyncio.AbstractEventLoop] | None = None
+    _loop: asyncio.AbstractEventLoop | None = None
+    _closes_at_exit = False
+
+    async def apre_invoke(self, invoke_name: str | None, *invoke_args: ExecArg) -> None:
+        """Called before the extension is invoked.
+
+        Args:
+            invoke_name: The name of the command that will be passed to invoke.
+            *invoke_args: The arguments that will be passed to invoke.
+        """
+        pass
+
+    @abstractmethod
+    async def ainvoke(self, command_name: str | None, *command_args: ExecArg) -> None:
+        """Invoke method.
+
+        This method is called when the extension is invoked.
+
+        Args:
+            command_name: The name of the command to invoke.
+            *command_args: The arguments to pass to the command.
+        """
+        pass
+
+    async def apost_invoke(
+        self,
+        invoked_name: str | None,
+        *invoked_args: ExecArg,
+    ) -> None:
+        """Called after the extension is invoked.
+
+        Args:
+            invoked_name: The name of the command that was invoked.
+            *invoked_args: The arguments passed to the command that was invoked.
+        """
+        pass
+
+    def _run(self, coro: t.Coroutine[t.Any, t.Any, None]) -> None:
+        """Run a coroutine on the event loop of the extension.
 
+        Args:
+            coro: The coroutine to run.
+        """
+        import asyncio
+
+        if self._loop is None:
+            self._loop = (self.loop_factory or asyncio.new_event_loop)()
+            if not self._closes_at_exit:
+                # Once, even if the loop is closed and recreated later on.
+                atexit.register(self.close_loop)
+                self._closes_at_exit = True
+        asyncio.set_event_loop(self._loop)
         try:
-            self.invoke(None, *command_args)
-        except Exception:
-            logger.exception(
-                "invoke failed with uncaught exception, please report to maintainer"
-            )
-            sys.exit(1)
+            self._loop.run_until_complete(coro)
+        finally:
+            asyncio.set_event_loop(None)
+
+    def close_loop(self) -> None:
+        """Close the event loop of the hooks, cancelling the tasks left on it."""
+        import asyncio
+
+        loop, self._loop = self._loop, None
+        if loop is None or loop.is_closed():
+            return
+        tasks = asyncio.all_tasks(loop)
+        if tasks:
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+    def pre_invoke(self, invoke_name: str | None, *invoke_args: ExecArg) -> None:
+        """Run `apre_invoke` on the event loop of the extension.
+
+        Args:
+            invoke_name: The name of the command that will be passed to invoke.
+            *invoke_args: The arguments that will be passed to invoke.
+        """
+        self._run(self.apre_invoke(invoke_name, *invoke_args))
+
+    def invoke(self, command_name: str | None, *command_args: ExecArg) -> None:
+        """Run `ainvoke` on the event loop of the extension.
+
+        Args:
+            command_name: The name of the command to invoke.
+            *command_args: The arguments to pass to the command.
+        """
+        self._run(self.ainvoke(command_name, *command_args))
+
+    def post_invoke(self, invoked_name: str | None, *invoked_args: ExecArg) -> None:
+        """Run `apost_invoke` on the event loop of the extension.
+
+        Args:
+            invoked_name: The name of the command that was invoked.
+            *invoked_args: The arguments passed to the command that was invoked.
+        """
+        self._run(self.apost_invoke(invoked_name, *invoked_args))
+
+    async def apass_through_invoker(
+        self,
+        logger: structlog.BoundLogger,
+        *command_args: ExecArg,
+    ) -> None:
+        """Pass-through invoker, running every hook on the running event loop.
 
+        Note this method will hard exit the process if an unhandled exception is
+        encountered.
+
+        Args:
+            logger: The logger to use in the event an exception needs to be logged.
+            *command_args: The arguments to pass to the command.
+        """
+        logger.debug(
+            "pass through invoker called",
+            command_args=command_args,
+        )
+        hooks = (
+            ("pre_invoke", self.apre_invoke),
+            ("invoke", self.ainvoke),
+            ("post_invoke", self.apost_invoke),
+        )
         try:
-            self.post_invoke(None, *command_args)
+            for name, hook in hooks:
+                await self._run_hook(logger, name, hook, *command_args)
+        finally:
+            profiler = profiling.get_profiler()
+            if profiler is not None:
+                profiler.finish(logger)
+
+    async def _run_hook(
+        self,
+        logger: structlog.BoundLogger,
+        name: str,
+        hook: t.Callable[..., t.Awaitable[None]],
+        *command_args: ExecArg,
+    ) -> None:
+        """Await a lifecycle hook, exiting the process if it fails.
+
+        Args:
+            logger: The logger to use in the event an exception needs to be logged.
+            name: The name of the hook.
+            hook: The hook.
+            *command_args: The arguments to pass to the hook.
+        """
+        try:
+            with profiling.phase(name):
+                await hook(None, *command_args)
         except Exception:
             logger.exception(
-                "post_invoke failed with uncaught exception, please report to maintainer"  # noqa: E501
+                f"{name} failed with uncaught exception, please report to maintainer"
             )
             sys.exit(1)
+
+    def pass_through_invoker(
+        self,
+        logger: structlog.BoundLogger,
+        *command_args: ExecArg,
+    ) -> None:
+        """Pass-through invoker, running every hook on the event loop of the extension.
+
+        The loop is closed once the invocation completes.
+
+        Args:
+            logger: The logger to use in the event an exception needs to be logged.
+            *command_args: The arguments to pass to the command.
+        """
+        try:
+            self._run(self.apass_through_invoker(logger, *command_args))
+        finally:
+            self.close_loop()
@@ -0,0 +1,262 @@
+"""Incremental materialization of the files an extension generates.
+
+Rewriting a file with the content it already has still bumps its mtime, which
+invalidates the caches of tools watching it, such as dbt's partial parsing.
+`FileMaterializer` only writes files whose content changed, and keeps a
+manifest of the files it manages so that files which are no longer generated
+get removed:
+
+    def initialize(self, force: bool = False) -> None:
+        with FileMaterializer(self.project_dir, force=force) as files:
+            files.write("profiles.yml", render_profiles())
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import typing as t
+from dataclasses import asdict, dataclass
+
+import structlog
+
+log = structlog.get_logger()
+
+# Default file name of the manifest, stored in the root directory.
+MATERIALIZE_MANIFEST = ".meltano-edk-files.json"
+
+
+@dataclass(slots=True)
+class ManagedFile:
+    """What the manifest records about a file it manages."""
+
+    sha256: str
+    size: int
+    mtime_ns: int
+
+
+def _hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _atomic_write(path: str, content: bytes, mode: int) -> None:
+    """Replace the content of a file, never leaving it partially written.
+
+    Args:
+        path: The path of the file.
+        content: The new content.
+        mode: The permissions of the file.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _default_mode() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+class FileMaterializer:
+    """Write generated files under a root directory only when they change.
+
+    A file is left untouched when its content is already the intended one.
+    That is checked against the manifest when the file's size and mtime still
+    match it, and against the content on disk otherwise. Changed files are
+    written atomically.
+
+    On leaving the context, managed files that were not written during it are
+    removed, and the manifest is updated. If the context exits with an error,
+    nothing is removed.
+    """
+
+    def __init__(
+        self,
+        root: str | os.PathLike[str],
+        force: bool = False,
+        manifest: str = MATERIALIZE_MANIFEST,
+    ) -> None:
+        """Create a new materializer.
+
+        Args:
+            root: The directory the files are written to.
+            force: If true, write every file even if it is unchanged, e.g. for
+                `initialize(force=True)`.
+            manifest: File name of the manifest, relative to the root.
+        """
+        self.root = os.path.abspath(root)
+        self.force = force
+        self.manifest_path = os.path.join(self.root, manifest)
+        self.written: list[str] = []
+        self.unchanged: list[str] = []
+        self.removed: list[str] = []
+        self._previous = self._load_manifest()
+        self._files: dict[str, ManagedFile] = {}
+
+    def __enter__(self) -> FileMaterializer:
+        """Use the materializer as a context manager.
+
+        Returns:
+            The materializer itself.
+        """
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, *exc_info: object) -> None:
+        """Remove stale files and save the manifest.
+
+        Args:
+            exc_type: The type of the exception raised in the context, if any.
+            exc_info: The exception raised in the context, if any.
+        """
+        if exc_type is None:
+            self.remove_stale()
+        else:
+            # Keep managing the files we did not get to write.
+            for name, managed in self._previous.items():
+                self._files.setdefault(name, managed)
+        self.save_manifest()
+
+    def _load_manifest(self) -> dict[str, ManagedFile]:
+        try:
+            with open(self.manifest_path, "rb") as f:
+                files = json.load(f)["files"]
+            return {name: ManagedFile(**entry) for name, entry in files.items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+
+    def _resolve(self, name: str | os.PathLike[str]) -> tuple[str, str]:
+        """Resolve the path of a file relative to the root.
+
+        Args:
+            name: The path of the file, relative to the root.
+
+        Returns:
+            The normalized relative path and the absolute path of the file.
+
+        Raises:
+            ValueError: If the path points outside of the root.
+        """
+        path = os.path.abspath(os.path.join(self.root, name))
+        relative = os.path.relpath(path, self.root)
+        if relative.startswith(os.pardir) or os.path.isabs(relative):
+            raise ValueError(f"{name} is outside of {self.root}")
+        return relative.replace(os.sep, "/"), path
+
+    def _is_current(self, path: str, managed: ManagedFile | None, digest: str) -> bool:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+        if (
+            managed is not None
+            and managed.size == stat.st_size
+            and managed.mtime_ns == stat.st_mtime_ns
+        ):
+            return managed.sha256 == digest
+        with open(path, "rb") as f:
+            return _hash(f.read()) == digest
+
+    def write(
+        self,
+        name: str | os.PathLike[str],
+        content: str | bytes,
+        mode: int | None = None,
+    ) -> bool:
+        """Materialize a file, unless it already has the intended content.
+
+        Args:
+            name: The path of the file, relative to the root.
+            content: The intended content, text is encoded as UTF-8.
+            mode: Permissions of the file when it is written, defaults to those
+                of the existing file, or to the umask for a new one.
+
+        Returns:
+            Whether the file was written.
+        """
+        relative, path = self._resolve(name)
+        data = content.encode() if isinstance(content, str) else content
+        digest = _hash(data)
+
+        if not self.force and self._is_current(
+            path, self._previous.get(relative), digest
+        ):
+            written = False
+            self.unchanged.append(relative)
+        else:
+            if mode is None:
+                try:
+                    mode = os.stat(path).st_mode & 0o7777
+                except FileNotFoundError:
+                    mode = _default_mode()
+            _atomic_write(path, data, mode)
+            written = True
+            self.written.append(relative)
+
+        stat = os.stat(path)
+        self._files[relative] = ManagedFile(digest, stat.st_size, stat.st_mtime_ns)
+        return written
+
+    def remove_stale(self) -> list[str]:
+        """Remove the managed files that were not written by this materializer.
+
+        Returns:
+            The paths of the removed files, relative to the root.
+        """
+        for name in sorted(set(self._previous) - set(self._files)):
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(os.path.join(self.root, name))
+            self.removed.append(name)
+        self._previous = {}
+        return self.removed
+
+    def save_manifest(self) -> None:
+        """Save the manifest, if the set of managed files changed."""
+        files = {name: asdict(managed) for name, managed in sorted(self._files.items())}
+        data = json.dumps({"files": files}, indent=2).encode() + b"\n"
+        try:
+            with open(self.manifest_path, "rb") as f:
+                if f.read() == data:
+                    return
+        except FileNotFoundError:
+            pass
+        _atomic_write(self.manifest_path, data, _default_mode())
+        log.debug(
+            "materialized files",
+            root=self.root,
+            written=self.written,
+            unchanged=len(self.unchanged),
+            removed=self.removed,
+        )
+
+
+def materialize(
+    root: str | os.PathLike[str],
+    files: t.Mapping[str, str | bytes],
+    force: bool = False,
+) -> FileMaterializer:
+    """Materialize a set of files in one go, removing the ones no longer in it.
+
+    Args:
+        root: The directory the files are written to.
+        files: The content of every file, by path relative to the root.
+        force: If true, write every file even if it is unchanged.
+
+    Returns:
+        The materializer, listing what was written, unchanged and removed.
+    """
+    with FileMaterializer(root, force=force) as materializer:
+        for name, content in files.items():
+            materializer.write(name, content)
+    return materializer
@@ -2,13 +2,27 @@
 
 from __future__ import annotations
 
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
 import sys
-from collections.abc import Callable
+import threading
+import time
+from collections.abc import Callable, MutableMapping
+from typing import Any, BinaryIO
 
 import structlog
 
+from meltano.edk.profiling import profiling_from_env
+
+try:
+    import orjson  # type: ignore[import-not-found]
+except ImportError:
+    orjson = None
+
 LEVELS = {  # noqa: WPS407
     "debug": logging.DEBUG,
     "info": logging.INFO,
@@ -19,6 +33,347 @@ LEVELS = {  # noqa: WPS407
 
 DEFAULT_LEVEL = "info"
 
+# Maximum number of records buffered by the background log writer.
+DEFAULT_QUEUE_SIZE = 10_000
+
+
+class BlockingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that waits for room in a bounded queue instead of failing.
+
+    When the writer falls behind, the logging thread is slowed down rather than
+    records being dropped.
+    """
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Enqueue a record, blocking while the queue is full.
+
+        Args:
+            record: The record to enqueue.
+        """
+        self.queue.put(record)  # type: ignore[attr-defined]
+
+
+class BlockingQueueListener(logging.handlers.QueueListener):
+    """Queue listener that waits for room in a bounded queue when stopping."""
+
+    def enqueue_sentinel(self) -> None:
+        """Enqueue the sentinel stopping the listener, blocking while it's full."""
+        self.queue.put(self._sentinel)  # type: ignore[attr-defined]
+
+
+class BackgroundWriter:
+    """Binary file wrapper that performs its writes on a background thread.
+
+    Writes block once `queue_size` of them are pending. Pending writes are
+    coalesced, and written out at exit at the latest. Once the file can no
+    longer be written to, e.g. because the reader of a pipe went away, the rest
+    of the output is dropped rather than blocking the logging threads.
+    """
+
+    def __init__(self, file: BinaryIO, queue_size: int = DEFAULT_QUEUE_SIZE) -> None:
+        """Create a new writer and start its thread.
+
+        Args:
+            file: The binary file to write to.
+            queue_size: Maximum number of writes waiting to be performed.
+        """
+        self.file = file
+        self.broken = False
+        self._queue: queue.Queue[bytes | None] = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(
+            target=self._run, name="meltano-edk-log-writer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, data: bytes) -> None:
+        """Queue data to be written.
+
+        Args:
+            data: The data to write.
+        """
+        if not self.broken and self._thread.is_alive():
+            self._queue.put(data)
+
+    def flush(self) -> None:
+        """Do nothing, the background thread flushes after every batch of writes."""
+
+    def close(self) -> None:
+        """Write out all pending data and stop the background thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            data = self._queue.get()
+            if data is None:
+                return
+            chunks = [data]
+            while True:
+                try:
+                    data = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if data is None:
+                    self._write(chunks)
+                    return
+                chunks.append(data)
+            self._write(chunks)
+
+    def _write(self, chunks: list[bytes]) -> None:
+        if self.broken:
+            return
+        try:
+            self.file.write(b"".join(chunks))
+            self.file.flush()
+        except (OSError, ValueError):
+            # Keep draining the queue, so that writers never block on it.
+            self.broken = True
+
+
+# Parse with orjson when it is installed, it is several times faster than json.
+_loads: Callable[[str | bytes], Any] = orjson.loads if orjson else json.loads
+
+
+def _json_bytes(obj: Any, **kwargs: Any) -> bytes:  # noqa: ANN401
+    """Serialize to JSON bytes with the fastest serializer available.
+
+    Args:
+        obj: The object to serialize.
+        **kwargs: Keyword arguments for the serializer.
+
+    Returns:
+        The JSON document.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, **kwargs)
+    return json.dumps(obj, **kwargs).encode()
+
+
+class LogSampler:
+    """Decides which events of a high-volume source to log.
+
+    Events are first sampled 1-in-`sample_every`, and the remaining ones are
+    rate limited by a token bucket that refills at `rate` events per second and
+    holds at most `burst` events. Suppressed events are counted, so that they
+    can be reported every `summary_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        rate: float | None = None,
+        burst: float | None = None,
+        sample_every: int = 1,
+        summary_interval: float = 10.0,
+        name: str | None = None,
+    ) -> None:
+        """Create a new sampler.
+
+        Args:
+            rate: Maximum sustained number of events per second, unlimited if None.
+            burst: Maximum number of events let through at once, defaults to `rate`.
+            sample_every: Only consider one event out of this many.
+            summary_interval: Minimum number of seconds between two reports of
+                suppressed events.
+            name: Name of the source the events come from.
+        """
+        self.rate = rate
+        self.burst = max(burst or rate or 1, 1)
+        self.sample_every = sample_every
+        self.summary_interval = summary_interval
+        self.name = name
+        self.suppressed = 0
+        self._seen = 0
+        self._tokens = self.burst
+        self._refilled = self._last_summary = time.monotonic()
+
+    def allow(self) -> bool:
+        """Decide whether the next event should be logged.
+
+        Returns:
+            True if the event should be logged.
+        """
+        self._seen += 1
+        if self.sample_every > 1 and (self._seen - 1) % self.sample_every:
+            self.suppressed += 1
+            return False
+
+        if self.rate is not None:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._refilled) * self.rate
+            )
+            self._refilled = now
+            if self._tokens < 1:
+                self.suppressed += 1
+                return False
+            self._tokens -= 1
+
+        return True
+
+    def pop_suppressed(self, force: bool = False) -> int:
+        """Return the number of events suppressed since the last report, if one is due.
+
+        Args:
+            force: If True, report regardless of the summary interval.
+
+        Returns:
+            The number of suppressed events to report, 0 if there is nothing to
+            report yet.
+        """
+        now = time.monotonic()
+        if not self.suppressed or (
+            not force and now - self._last_summary < self.summary_interval
+        ):
+            return 0
+        suppressed, self.suppressed = self.suppressed, 0
+        self._last_summary = now
+        return suppressed
+
+
+# The event entry `Invoker` tags the lines of a subprocess with, once a
+# `RateLimiter` needs it, so that they are otherwise rendered as they are.
+_stream_key: str | None = None
+
+
+def _bind_stream(logger: Any, stream: str) -> Any:  # noqa: ANN401
+    """Tag the lines a logger logs with the stream they come from, if needed.
+
+    Args:
+        logger: The logger of the lines.
+        stream: The name of the stream, e.g. "stderr".
+
+    Returns:
+        The logger, bound to the stream if a `RateLimiter` groups events by it.
+    """
+    if _stream_key is None:
+        return logger
+    return logger.bind(**{_stream_key: stream})
+
+
+class RateLimiter:
+    """structlog processor that samples and rate limits events per source.
+
+    Events are grouped by the value of their `key` entry (`stdio_stream` by
+    default, which `Invoker` sets on the lines it logs once a limiter has been
+    created), and each group is
+    limited by its own `LogSampler`. Events without that entry, warnings and
+    errors are never suppressed. Every `summary_interval` seconds, a suppressed
+    event is replaced with a "N lines suppressed" summary event, and `flush`
+    reports what was suppressed since the last one.
+    """
+
+    ALWAYS_LOGGED = frozenset({"warning", "warn", "error", "exception", "critical"})
+
+    def __init__(
+        self,
+        rate: float | None = None,
+        burst: float | None = None,
+        sample_every: int = 1,
+        summary_interval: float = 10.0,
+        key: str = "stdio_stream",
+    ) -> None:
+        """Create a new rate limiter.
+
+        Args:
+            rate: Maximum sustained number of events per second and group,
+                unlimited if None.
+            burst: Maximum number of events let through at once per group,
+                defaults to `rate`.
+            sample_every: Only consider one event out of this many per group.
+            summary_interval: Minimum number of seconds between two summaries of
+                suppressed events per group.
+            key: The event entry used to group events.
+        """
+        global _stream_key
+        _stream_key = self.key = key
+        self._sampler_args = (rate, burst, sample_every, summary_interval)
+        self._samplers: dict[Any, LogSampler] = {}
+        self._flushing = False
+
+    def __call__(
+        self,
+        logger: Any,  # noqa: ANN401
+        method_name: str,
+        event_dict: MutableMapping[str, Any],
+    ) -> MutableMapping[str, Any]:
+        """Let an event through, replace it with a summary, or drop it.
+
+        Args:
+            logger: The wrapped logger.
+            method_name: The name of the logging method that was called.
+            event_dict: The event.
+
+        Returns:
+            The event, or a summary of the suppressed events.
+
+        Raises:
+            DropEvent: If the event is suppressed.
+        """
+        if (
+            self._flushing
+            or method_name in self.ALWAYS_LOGGED
+            or self.key not in event_dict
+        ):
+            return event_dict
+
+        group = event_dict[self.key]
+        sampler = self._samplers.get(group)
+        if sampler is None:
+            sampler = self._samplers[group] = LogSampler(*self._sampler_args)
+
+        if sampler.allow():
+            return event_dict
+
+        suppressed = sampler.pop_suppressed()
+        if not suppressed:
+            raise structlog.DropEvent
+
+        # Keep what earlier processors added, e.g. the timestamp and level.
+        summary = {k: v for k, v in event_dict.items() if k in {"timestamp", "level"}}
+        summary.update(event=f"{suppressed} lines suppressed", suppressed=suppressed)
+        summary[self.key] = group
+        return summary
+
+    def flush(self) -> None:
+        """Log how many events were suppressed since the last summary, per group.
+
+        `default_logging_config` calls it at exit, so that no count is lost.
+        """
+        logger = structlog.get_logger()
+        self._flushing = True
+        try:
+            for group, sampler in self._samplers.items():
+                suppressed = sampler.pop_suppressed(force=True)
+                if suppressed:
+                    logger.info(
+                        f"{suppressed} lines suppressed",
+                        suppressed=suppressed,
+                        **{self.key: group},
+                    )
+        finally:
+            self._flushing = False
+
+
+def _background_handler(handler: logging.Handler, queue_size: int) -> logging.Handler:
+    """Move the output of a handler to a background thread.
+
+    The thread is stopped, after writing out every queued record, at exit.
+
+    Args:
+        handler: The handler doing the actual output.
+        queue_size: Maximum number of records waiting to be written.
+
+    Returns:
+        The handler to attach to loggers.
+    """
+    records: queue.Queue[logging.LogRecord] = queue.Queue(maxsize=queue_size)
+    listener = BlockingQueueListener(records, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return BlockingQueueHandler(records)
+
 
 def strtobool(val: str) -> bool:
     """Convert a string representation of truth to true (1) or false (0).
@@ -66,6 +421,11 @@ def default_logging_config(
     timestamps: bool = False,
     levels: bool = False,
     json_format: bool = False,
+    background: bool = False,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    fast_json: bool = False,
+    rate_limit: float | None = None,
+    sample_every: int = 1,
 ) -> None:
     """default/demo structlog configuration.
 
@@ -74,23 +434,106 @@ def default_logging_config(
         timestamps: include timestamps in the log.
         levels: include levels in the log.
         json_format: if True, use JSON format, otherwise use human-readable format.
+        background: if True, write logs from a background thread, so that slow
+            writes to stderr do not block the caller (e.g. the event loop
+            draining a subprocess). Pending logs are flushed at exit.
+        queue_size: maximum number of logs waiting to be written in background
+            mode, logging blocks once it is reached.
+        fast_json: if True and `json_format` is set, render structlog events
+            straight to bytes (using orjson when it is installed) and write them
+            to stderr without going through stdlib logging.
+        rate_limit: if set, the maximum number of info and debug events logged per
+            second and `stdio_stream`, see `RateLimiter`.
+        sample_every: if greater than 1, only log one info or debug event out of
+            this many per `stdio_stream`.
     """
     processors: list[Callable] = []
     if timestamps:
         processors.append(structlog.processors.TimeStamper(fmt="iso"))
     if levels:
         processors.append(structlog.processors.add_log_level)
+    limiter = None
+    if rate_limit is not None or sample_every > 1:
+        limiter = RateLimiter(rate=rate_limit, sample_every=sample_every)
+        processors.append(limiter)
+
+    if json_format and fast_json:
+        _fast_json_config(processors, level, background, queue_size)
+        background = False
+    else:
+        _stdlib_config(processors, json_format)
+
+    handler: logging.Handler = logging.StreamHandler(sys.stderr)
+    # Like basicConfig, leave an existing configuration of the root logger alone.
+    if background and not logging.root.handlers:
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        handler = _background_handler(handler, queue_size)
+
+    logging.basicConfig(
+        format="%(message)s",
+        handlers=[handler],
+        level=level,
+    )
+    if limiter is not None:
+        # Registered last to run first at exit, before the background writers stop.
+        atexit.register(limiter.flush)
+
+
+def _fast_json_config(
+    processors: list[Callable],
+    level: int,
+    background: bool,
+    queue_size: int,
+) -> None:
+    """Configure structlog to render JSON bytes straight to stderr.
+
+    Args:
+        processors: processors to run before rendering.
+        level: logging level.
+        background: if True, write from a background thread.
+        queue_size: maximum number of logs waiting to be written in background
+            mode.
+    """
+    output: BinaryIO | BackgroundWriter = sys.stderr.buffer
+    if background:
+        output = BackgroundWriter(sys.stderr.buffer, queue_size)
+
+    structlog.configure(
+        processors=[
+            *processors,
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            structlog.processors.UnicodeDecoder(),
+            structlog.processors.JSONRenderer(serializer=_json_bytes),
+        ],
+        # Level filtering is compiled into the bound logger's methods, below the
+        # level they are no-ops.
+        wrapper_class=structlog.make_filtering_bound_logger(level),
+        logger_factory=structlog.BytesLoggerFactory(file=output),  # type: ignore[arg-type]
+        cache_logger_on_first_use=True,
+    )
 
+
+def _stdlib_config(processors: list[Callable], json_format: bool) -> None:
+    """Configure structlog to render events and hand them to stdlib logging.
+
+    Args:
+        processors: processors to run before rendering.
+        json_format: if True, use JSON format, otherwise use human-readable format.
+    """
     renderer: structlog.processors.JSONRenderer | structlog.dev.ConsoleRenderer = (
         structlog.processors.JSONRenderer()
         if json_format
         else structlog.dev.ConsoleRenderer(colors=False)
     )
 
+    processors = [
+        # If log level is too low, abort pipeline and throw away log entry.
+        structlog.stdlib.filter_by_level,
+        *processors,
+    ]
     processors.extend(
         [
-            # If log level is too low, abort pipeline and throw away log entry.
-            structlog.stdlib.filter_by_level,
             # If the "stack_info" key in the event dict is true, remove it and
             # render the current stack trace in the "stack" key.
             structlog.processors.StackInfoRenderer(),
@@ -121,27 +564,34 @@ def default_logging_config(
         cache_logger_on_first_use=True,
     )
 
-    logging.basicConfig(
-        format="%(message)s",
-        stream=sys.stderr,
-        level=level,
-    )
-
 
 def pass_through_logging_config() -> None:
     """Pass-through logging configuration.
 
     Setups a logging config using the LOG_LEVEL, LOG_TIMESTAMPS, LOG_LEVELS,
-    and MELTANO_LOG_JSON env vars.
+    MELTANO_LOG_JSON, LOG_FAST_JSON, LOG_BACKGROUND, LOG_QUEUE_SIZE,
+    LOG_RATE_LIMIT and LOG_SAMPLE_EVERY env vars, and enables profiling if the
+    MELTANO_EDK_PROFILE env var requests it, see `meltano.edk.profiling`.
     """
     log_level = os.environ.get("LOG_LEVEL", "INFO")
     log_timestamps = os.environ.get("LOG_TIMESTAMPS", "False")
     log_levels = os.environ.get("LOG_LEVELS", "False")
     meltano_log_json = os.environ.get("MELTANO_LOG_JSON", "False")
+    log_fast_json = os.environ.get("LOG_FAST_JSON", "False")
+    log_background = os.environ.get("LOG_BACKGROUND", "False")
+    log_queue_size = os.environ.get("LOG_QUEUE_SIZE", str(DEFAULT_QUEUE_SIZE))
+    log_rate_limit = os.environ.get("LOG_RATE_LIMIT")
+    log_sample_every = os.environ.get("LOG_SAMPLE_EVERY", "1")
 
     default_logging_config(
         level=parse_log_level(log_level),
         timestamps=strtobool(log_timestamps),
         levels=strtobool(log_levels),
         json_format=strtobool(meltano_log_json),
+        background=strtobool(log_background),
+        queue_size=int(log_queue_size),
+        fast_json=strtobool(log_fast_json),
+        rate_limit=float(log_rate_limit) if log_rate_limit else None,
+        sample_every=int(log_sample_every),
     )
+    profiling_from_env()
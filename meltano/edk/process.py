@@ -3,186 +3,2907 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import dataclasses
+import functools
+import inspect
+import io
+import itertools
+import locale
+import mmap
 import os
+import shutil
 import signal
 import subprocess
 import sys
+import tempfile
+import time
 import typing as t
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
 
 import structlog
 
+from meltano.edk.logging import LogSampler, _bind_stream, _loads
 from meltano.edk.types import ExecArg
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
 log = structlog.get_logger()
 
+# Size of the reads used when draining the pipes of a subprocess.
+DEFAULT_CHUNK_SIZE = 2**16
+# Maximum number of lines emitted before yielding back to the event loop.
+DEFAULT_BATCH_SIZE = 256
+# Maximum time, in seconds, a complete line may wait in a batch before it is logged.
+DEFAULT_FLUSH_INTERVAL = 0.05
+# Maximum number of lines and bytes of output kept around to diagnose failures.
+DEFAULT_TAIL_LINES = 100
+DEFAULT_TAIL_BYTES = 2**16
+# Size past which captured output is moved from memory to a temporary file.
+DEFAULT_SPILL_THRESHOLD = 2**24
+# Time, in seconds, a subprocess is given to exit after SIGTERM before SIGKILL.
+DEFAULT_KILL_GRACE = 5.0
+# Maximum size, in bytes, of a line of output handed to the logs or a classifier.
+DEFAULT_MAX_LINE_SIZE = 2**20
+# Number of chunks of output queued for each sink a stream is copied to, and time,
+# in seconds, a sink may keep its queue full before it is detached.
+DEFAULT_SINK_QUEUE_SIZE = 64
+DEFAULT_SINK_TIMEOUT = 30.0
+# Number of bytes buffered by file sinks before they are written.
+DEFAULT_SINK_BUFFER_SIZE = 2**20
+
+# Keys holding the message and the level of JSON log lines, in order of preference:
+# structlog and python-json-logger, pino and zap, Google Cloud Logging.
+_JSON_EVENT_KEYS = ("event", "message", "msg")
+_JSON_LEVEL_KEYS = ("level", "levelname", "severity")
+# Levels of JSON log lines, by their lowercase name or their pino number, mapped to
+# our own.
+_JSON_NUMERIC_LEVELS = {
+    10: "debug",
+    20: "debug",
+    30: "info",
+    40: "warning",
+    50: "error",
+    60: "critical",
+}
+# Fields of JSON log lines that clash with the arguments of our logger methods, they
+# are re-emitted with a `child_` prefix.
+_JSON_RESERVED_KEYS = frozenset({"self", "event", "exc_info", "stack_info"})
+_JSON_LEVELS = {
+    "trace": "debug",
+    "debug": "debug",
+    "info": "info",
+    "notice": "info",
+    "warn": "warning",
+    "warning": "warning",
+    "err": "error",
+    "error": "error",
+    "critical": "critical",
+    "fatal": "critical",
+    "panic": "critical",
+    "alert": "critical",
+    "emergency": "critical",
+}
+
+# ru_maxrss is reported in bytes on macOS and in kilobytes everywhere else.
+_MAXRSS_SCALE = 1 if sys.platform == "darwin" else 1024
+
+T = t.TypeVar("T")
+LoopFactory: t.TypeAlias = t.Callable[[], asyncio.AbstractEventLoop]
+# Input fed to a subprocess: a file descriptor or a file object, or chunks of input.
+# Descriptors, unbuffered binary files and seekable buffered binary files opened
+# with `open()` are handed to the subprocess directly, other file objects are read
+# and fed to it.
+StdinSource: t.TypeAlias = (
+    "int | t.IO[t.Any] | t.Iterable[bytes | str] | t.AsyncIterable[bytes | str]"
+)
+
+# Subprocesses a SIGINT is currently forwarded to, per event loop.
+_sigint_targets: dict[asyncio.AbstractEventLoop, set[asyncio.subprocess.Process]] = {}
+
+
+class StreamClassifier(t.Protocol):
+    """Interprets the lines of an output stream in place of plain logging."""
+
+    def feed(self, lines: list[bytes], logger: structlog.BoundLogger) -> None:
+        """Handle a batch of lines.
+
+        Args:
+            lines: The raw lines, without their line terminators.
+            logger: The logger to emit events to.
+        """
+
+    def close(self, logger: structlog.BoundLogger) -> None:
+        """Handle the end of the stream.
+
+        Args:
+            logger: The logger to emit events to.
+        """
+
+
+class LongLinePolicy(Enum):
+    """What is done with output lines longer than the maximum line size."""
+
+    truncate = "truncate"
+    split = "split"
+
+
+def _char_boundary(data: bytes, start: int, pos: int) -> int:
+    """Move a cut position back to the start of the UTF-8 character it falls in.
+
+    Args:
+        data: The data to cut.
+        start: The position the cut may not move back to.
+        pos: The cut position.
+
+    Returns:
+        The adjusted cut position.
+    """
+    end = pos
+    while end > pos - 3 and data[end] & 0xC0 == 0x80:
+        end -= 1
+    return end if end > start else pos
+
+
+class _LineAssembler:
+    """Assembles chunks of a stream into lines of bounded size.
+
+    Lines longer than `max_line_size` are either split into several lines or
+    truncated, in which case the rest of the line is skipped without being
+    buffered and its original length is recorded in `truncated`. Cuts are made
+    on UTF-8 character boundaries, so that every line decodes on its own.
+    """
+
+    def __init__(self, max_line_size: int, policy: LongLinePolicy) -> None:
+        self.max_line_size = max_line_size
+        self.split = policy == LongLinePolicy.split
+        self.partial = b""
+        # Length so far of the truncated line being skipped, if any.
+        self.overflow = 0
+        self.truncated: list[int] = []
+
+    def feed(self, data: bytes) -> list[bytes]:
+        """Add a chunk of the stream.
+
+        Args:
+            data: The chunk.
+
+        Returns:
+            The lines completed by the chunk, without their line terminators.
+        """
+        if self.overflow:
+            end = data.find(b"\n")
+            if end < 0:
+                self.overflow += len(data)
+                return []
+            self.truncated.append(self.overflow + end)
+            self.overflow = 0
+            data = data[end + 1 :]
+
+        size = len(self.partial) + len(data)
+        lines = (self.partial + data).split(b"\n")
+        self.partial = lines.pop()
+        if size <= self.max_line_size:
+            # No line can be too long, skip checking them one by one.
+            return lines
+
+        bounded: list[bytes] = []
+        for line in lines:
+            if len(line) <= self.max_line_size:
+                bounded.append(line)
+            elif self.split:
+                bounded.extend(self._split(line))
+            else:
+                bounded.append(self._cut(line))
+                self.truncated.append(len(line))
+
+        if len(self.partial) > self.max_line_size:
+            if self.split:
+                *pieces, self.partial = self._split(self.partial)
+                bounded.extend(pieces)
+            else:
+                bounded.append(self._cut(self.partial))
+                self.overflow = len(self.partial)
+                self.partial = b""
+        return bounded
+
+    def finish(self) -> list[bytes]:
+        """Handle the end of the stream.
+
+        Returns:
+            The last line, if the stream did not end with a line terminator.
+        """
+        if self.overflow:
+            self.truncated.append(self.overflow)
+            self.overflow = 0
+        partial, self.partial = self.partial, b""
+        return [partial] if partial else []
+
+    def report_truncated(self, logger: structlog.BoundLogger) -> None:
+        """Log the original length of the lines truncated since the last report.
+
+        Args:
+            logger: The logger to emit the warnings to.
+        """
+        for length in self.truncated:
+            logger.warning(
+                "output line truncated",
+                line_length=length,
+                max_line_size=self.max_line_size,
+            )
+        self.truncated.clear()
+
+    def _cut(self, line: bytes) -> bytes:
+        return line[: _char_boundary(line, 0, self.max_line_size)]
+
+    def _split(self, line: bytes) -> list[bytes]:
+        pieces = []
+        start = 0
+        while len(line) - start > self.max_line_size:
+            end = _char_boundary(line, start, start + self.max_line_size)
+            pieces.append(line[start:end])
+            start = end
+        pieces.append(line[start:])
+        return pieces
+
+
+def _log_structured(line: str, logger: structlog.BoundLogger) -> None:
+    """Log a line, re-emitting its fields and level if it is a JSON log event.
+
+    Args:
+        line: The decoded line.
+        logger: The logger to emit the line to.
+    """
+    line = line.rstrip()
+    if line.startswith("{") and line.endswith("}"):
+        try:
+            fields = _loads(line)
+        except ValueError:
+            fields = None
+        if isinstance(fields, dict):
+            event_key = next((key for key in _JSON_EVENT_KEYS if key in fields), None)
+            if event_key is not None:
+                event = fields.pop(event_key)
+                method = _json_level(fields)
+                for key in _JSON_RESERVED_KEYS.intersection(fields):
+                    fields[f"child_{key}"] = fields.pop(key)
+                try:
+                    getattr(logger, method)(event, **fields)
+                except TypeError:
+                    pass
+                else:
+                    return
+    logger.info(line)
+
+
+def _json_level(fields: dict[str, t.Any]) -> str:
+    """Pop the level of a JSON log event, mapped to our own.
+
+    Args:
+        fields: The fields of the event.
+
+    Returns:
+        The name of the logger method to emit the event with, `info` if the
+        event has no level we know of, in which case it is left in the fields.
+    """
+    for key in _JSON_LEVEL_KEYS:
+        value = fields.get(key)
+        if isinstance(value, int) and not isinstance(value, bool):
+            level = _JSON_NUMERIC_LEVELS.get(value)
+        else:
+            level = _JSON_LEVELS.get(str(value).lower())
+        if level is not None:
+            del fields[key]
+            return level
+    return "info"
+
+
+class _LineLogger:
+    """Logs every line of a stream as an event, optionally sampled."""
+
+    def __init__(
+        self, sampler: LogSampler | None = None, structured: bool = False
+    ) -> None:
+        self.sampler = sampler
+        self.structured = structured
+
+    def feed(self, lines: list[bytes], logger: structlog.BoundLogger) -> None:
+        # Decode the whole batch at once rather than line by line. Lines never
+        # end in the middle of a character, see `_LineAssembler`, so invalid
+        # bytes are only ever the subprocess' own and are replaced.
+        decoded = b"\n".join(lines).decode("utf-8", errors="replace").split("\n")
+        sampler = self.sampler
+        if self.structured:
+            for line in decoded:
+                if sampler is None or sampler.allow():
+                    _log_structured(line, logger)
+            self._report_suppressed(logger)
+            return
+
+        if sampler is None:
+            for line in decoded:
+                logger.info(line.rstrip())
+            return
+
+        for line in decoded:
+            if sampler.allow():
+                logger.info(line.rstrip())
+        self._report_suppressed(logger)
+
+    def close(self, logger: structlog.BoundLogger) -> None:
+        self._report_suppressed(logger, force=True)
+
+    def _report_suppressed(
+        self, logger: structlog.BoundLogger, force: bool = False
+    ) -> None:
+        if self.sampler is None:
+            return
+        suppressed = self.sampler.pop_suppressed(force)
+        if suppressed:
+            logger.info(
+                f"{suppressed} lines suppressed",
+                suppressed=suppressed,
+                stdio_stream=self.sampler.name,
+            )
+
+
+def preferred_loop_factory() -> LoopFactory | None:
+    """Return the fastest available event loop factory.
+
+    Returns:
+        `uvloop.new_event_loop` if uvloop is installed, otherwise None, which
+        selects the default asyncio event loop.
+    """
+    try:
+        import uvloop  # type: ignore[import-not-found]
+    except ImportError:
+        return None
+    return t.cast(LoopFactory, uvloop.new_event_loop)
+
+
+def _run_coroutine(
+    coro: t.Coroutine[t.Any, t.Any, T],
+    loop_factory: LoopFactory | None = None,
+) -> T:
+    """Run a coroutine to completion on a new event loop.
+
+    Args:
+        coro: The coroutine to run.
+        loop_factory: Factory for the event loop, defaults to the asyncio one.
+
+    Returns:
+        The result of the coroutine.
+    """
+    if loop_factory is None:
+        return asyncio.run(coro)
+    if sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=loop_factory) as runner:
+            return runner.run(coro)
+
+    loop = loop_factory()
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(coro)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def _iterate(
+    agen: t.AsyncGenerator[T, None],
+    loop_factory: LoopFactory | None = None,
+) -> t.Iterator[T]:
+    """Iterate over an async generator from synchronous code, on a new event loop.
+
+    The loop only runs while the next item is being produced, so a consumer
+    that stops pulling items also stops the generator.
+
+    Args:
+        agen: The async generator to iterate over.
+        loop_factory: Factory for the event loop, defaults to the asyncio one.
+
+    Yields:
+        The items produced by the generator.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        raise RuntimeError("cannot be called from a running event loop")
+
+    loop = (loop_factory or asyncio.new_event_loop)()
+    try:
+        asyncio.set_event_loop(loop)
+        while True:
+            try:
+                item = loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        loop.run_until_complete(agen.aclose())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def _group_kwargs() -> dict[str, t.Any]:
+    """Build the keyword arguments starting a subprocess in its own process group.
+
+    Returns:
+        The keyword arguments to pass to `subprocess` or asyncio, none on Windows.
+    """
+    # In its own group, the subprocess can be terminated as a whole.
+    if sys.platform == "win32":
+        return {}
+    if sys.version_info >= (3, 11):
+        return {"process_group": 0}
+    return {"start_new_session": True}
+
+
+def _signal_group(
+    p: asyncio.subprocess.Process | subprocess.Popen,
+    sig: signal.Signals,
+) -> None:
+    """Send a signal to the process group a subprocess leads.
+
+    Args:
+        p: The subprocess, started in its own process group.
+        sig: The signal to send.
+    """
+    try:
+        if sys.platform == "win32":
+            p.kill() if sig == signal.SIGKILL else p.terminate()
+        else:
+            os.killpg(p.pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+async def _terminate(
+    p: asyncio.subprocess.Process,
+    grace: float,
+    logger: structlog.BoundLogger = log,
+) -> None:
+    """Terminate the process group of a subprocess, killing it if it lingers.
+
+    Args:
+        p: The subprocess, started in its own process group.
+        grace: Seconds the group is given to exit after SIGTERM.
+        logger: The logger to report the escalation to.
+    """
+    _signal_group(p, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(p.wait(), grace)
+    except asyncio.TimeoutError:
+        logger.warning("subprocess killed", pid=p.pid, signal="SIGKILL", grace=grace)
+        _signal_group(p, signal.SIGKILL)
+        await p.wait()
+
+
+class _Watchdog:
+    """Terminates a subprocess that is still running once its timeout expires."""
+
+    def __init__(
+        self,
+        p: asyncio.subprocess.Process,
+        cmd: str,
+        timeout: float | None,
+        grace: float,
+        logger: structlog.BoundLogger = log,
+    ) -> None:
+        self.fired = False
+        self._task = (
+            asyncio.create_task(self._run(p, cmd, timeout, grace, logger))
+            if timeout is not None
+            else None
+        )
+
+    async def _run(
+        self,
+        p: asyncio.subprocess.Process,
+        cmd: str,
+        timeout: float,
+        grace: float,
+        logger: structlog.BoundLogger,
+    ) -> None:
+        await asyncio.sleep(timeout)
+        self.fired = True
+        logger.warning(
+            "subprocess limit exceeded",
+            cmd=cmd,
+            pid=p.pid,
+            limit="timeout",
+            timeout=timeout,
+        )
+        await _terminate(p, grace, logger)
+
+    def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+
+def _send_sigint(targets: set[asyncio.subprocess.Process]) -> None:
+    for p in targets:
+        p.send_signal(signal.SIGINT)
+
+
+@contextlib.contextmanager
+def _forward_sigint(p: asyncio.subprocess.Process) -> t.Iterator[None]:
+    """Forward SIGINT received by the current process to a subprocess.
+
+    A single handler is installed per event loop, shared by all subprocesses
+    running on it, and removed again once the last of them is done.
+
+    Args:
+        p: The subprocess to forward SIGINT to.
+
+    Yields:
+        None
+    """
+    # Windows does not support add_signal_handler
+    # https://docs.python.org/3/library/asyncio-platforms.html
+    if sys.platform == "win32":
+        yield
+        return
+
+    loop = asyncio.get_running_loop()
+    targets = _sigint_targets.get(loop)
+    if targets is None:
+        targets = set()
+        try:
+            loop.add_signal_handler(signal.SIGINT, _send_sigint, targets)
+        except RuntimeError:
+            # Signal handlers can only be installed from the main thread.
+            yield
+            return
+        _sigint_targets[loop] = targets
+
+    targets.add(p)
+    try:
+        yield
+    finally:
+        targets.discard(p)
+        if not targets:
+            del _sigint_targets[loop]
+            loop.remove_signal_handler(signal.SIGINT)
+
+
+def _stdout_target(
+    target: int | t.BinaryIO,
+) -> tuple[int | None, t.BinaryIO | None]:
+    """Determine how to forward the stdout of a subprocess to a target.
+
+    Args:
+        target: File descriptor or binary file object to forward stdout to.
+
+    Returns:
+        The file descriptor to hand to the subprocess if the target has one,
+        otherwise the file object to copy the output to.
+    """
+    if isinstance(target, int):
+        return target, None
+    try:
+        fd = target.fileno()
+    except (AttributeError, OSError):
+        return None, target
+    # Anything we buffered must land before the subprocess' output.
+    target.flush()
+    return fd, None
+
+
+async def _iterate_chunks(
+    source: t.Iterable[bytes | str] | t.AsyncIterable[bytes | str],
+) -> t.AsyncIterator[bytes | str]:
+    if isinstance(source, t.AsyncIterable):
+        async for chunk in source:
+            yield chunk
+    else:
+        for chunk in source:
+            yield chunk
+
+
+def _partial_reader(file: t.IO[t.Any], size: int) -> t.Callable[[], bytes | str]:
+    """Return a function reading the data of a file as it becomes available.
+
+    `read(size)` on a buffered pipe waits until `size` bytes or the end of the
+    input arrived, which would hold back the input of a subprocess until its
+    producer exits.
+
+    Args:
+        file: The file object.
+        size: Maximum size of a read.
+
+    Returns:
+        A function returning the next chunk, empty at the end of the file.
+    """
+    if hasattr(file, "read1"):
+        return functools.partial(file.read1, size)
+    if isinstance(file, io.TextIOBase):
+        # Returns at the end of a line, without bypassing what is buffered.
+        return functools.partial(file.readline, size)
+    try:
+        return functools.partial(os.read, file.fileno(), size)
+    except (OSError, ValueError, AttributeError):
+        return functools.partial(file.read, size)
+
+
+async def _read_chunks(file: t.IO[t.Any], size: int) -> t.AsyncIterator[bytes | str]:
+    # Read from a thread, files may be slow or block, e.g. pipes and sockets.
+    read = _partial_reader(file, size)
+    while chunk := await asyncio.to_thread(read):
+        yield chunk
+
+
+def _plain_fd(file: t.IO[t.Any]) -> int | None:
+    """Return the descriptor to hand to a subprocess in place of a file object.
+
+    Only files whose descriptor yields the same bytes as reading the file object
+    have one: unbuffered binary files, and seekable buffered ones, whose
+    descriptor is moved to the position of the file object to make up for the
+    data it has buffered ahead.
+
+    Args:
+        file: The file object.
+
+    Returns:
+        The descriptor, or None if the file object must be read instead.
+    """
+    try:
+        if type(file) is io.FileIO:
+            return file.fileno()
+        if (
+            type(file) is io.BufferedReader
+            and type(file.raw) is io.FileIO
+            and file.seekable()
+        ):
+            fd = file.fileno()
+            os.lseek(fd, file.tell(), os.SEEK_SET)
+            return fd
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _stdin_source(
+    stdin: StdinSource | None,
+    chunk_size: int,
+) -> tuple[int | None, t.AsyncIterator[bytes | str] | None]:
+    """Determine how to feed input to a subprocess.
+
+    Args:
+        stdin: The input.
+        chunk_size: Size of the reads from file objects without a descriptor.
+
+    Returns:
+        The file descriptor to hand to the subprocess, or the chunks to write to
+        its stdin, or neither if there is no input.
+    """
+    if stdin is None or isinstance(stdin, int):
+        return stdin, None
+    if isinstance(stdin, (bytes, str)):
+        return None, _iterate_chunks([stdin])
+    if hasattr(stdin, "read"):
+        file = t.cast(t.IO[t.Any], stdin)
+        fd = _plain_fd(file)
+        if fd is not None:
+            return fd, None
+        return None, _read_chunks(file, chunk_size)
+    return None, _iterate_chunks(
+        t.cast(t.Iterable[bytes | str] | t.AsyncIterable[bytes | str], stdin)
+    )
+
+
+def _encode_env(env: dict[str, t.Any]) -> dict[t.Any, t.Any]:
+    """Encode an env the way `subprocess` does before every spawn on POSIX.
+
+    Args:
+        env: The env.
+
+    Returns:
+        The env with its keys and values encoded to bytes, or a copy of it on
+        Windows, where it is passed as text.
+    """
+    if sys.platform == "win32":
+        return dict(env)
+    return {os.fsencode(key): os.fsencode(value) for key, value in env.items()}
+
+
+def _decode_text(data: bytes | None) -> str | None:
+    """Decode captured output the way `subprocess.run(..., text=True)` does.
+
+    Args:
+        data: The captured output.
+
+    Returns:
+        The decoded output with universal newlines, or None if nothing was captured.
+    """
+    if data is None:
+        return None
+    text = data.decode(locale.getpreferredencoding(False))
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+@dataclass(slots=True)
+class StreamStats:
+    """Volume of output produced on a stream of a subprocess.
+
+    A trailing line without a line terminator counts as a line.
+    """
+
+    byte_count: int = 0
+    line_count: int = 0
+
+    def count(self, data: bytes) -> None:
+        """Account for a chunk of output.
+
+        Args:
+            data: The output, in any number of complete or partial lines.
+        """
+        self.byte_count += len(data)
+        self.line_count += data.count(b"\n")
+
+
+@dataclass(slots=True)
+class InvocationStats:
+    """Resource usage and throughput of a subprocess invocation.
+
+    CPU times and max RSS are derived from `getrusage(RUSAGE_CHILDREN)` taken
+    before and after the invocation. CPU times are only approximate when other
+    subprocesses of the extension exit in the meantime, e.g. with `InvokerPool`,
+    as they are accounted for too.
+
+    `getrusage` only reports the peak RSS of the largest subprocess that ever
+    exited, so max RSS is only known when the invocation raised that peak, and
+    None otherwise. It may then be the peak of a concurrent subprocess.
+
+    These are None on platforms without the `resource` module.
+    """
+
+    wall_time: float = 0.0
+    user_time: float | None = None
+    system_time: float | None = None
+    max_rss: int | None = None
+    streams: dict[str, StreamStats] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class ResourceLimits:
+    """Limits applied to a subprocess, and the subprocesses it starts, on POSIX.
+
+    A subprocess exceeding its CPU time receives SIGXCPU, which is reported as a
+    `subprocess limit exceeded` event, and SIGKILL one second later if it keeps
+    running. Allocations beyond the address space limit fail in the subprocess.
+
+    On Linux, the limits are applied right after the subprocess started, so the
+    subprocesses it starts before that, if any, escape them.
+    """
+
+    #: Maximum size of the address space, in bytes (RLIMIT_AS).
+    memory: int | None = None
+    #: Maximum CPU time, in seconds (RLIMIT_CPU).
+    cpu_time: int | None = None
+    #: Increment added to the niceness of the subprocess.
+    nice: int | None = None
+
+    def apply(self) -> None:
+        """Apply the limits to the current process.
+
+        Meant to run in the child, as the `preexec_fn` of the subprocess, where
+        `apply_to` is not available. `preexec_fn` is not safe when the parent
+        runs threads, e.g. the background log writer or a `FileSink`, as the
+        child may deadlock before it starts.
+        """
+        if self.memory is not None:
+            resource.setrlimit(resource.RLIMIT_AS, (self.memory, self.memory))
+        if self.cpu_time is not None:
+            resource.setrlimit(resource.RLIMIT_CPU, (self.cpu_time, self.cpu_time + 1))
+        if self.nice:
+            os.nice(self.nice)
+
+    def apply_to(self, pid: int) -> None:
+        """Apply the limits to a process right after it was started, on Linux.
+
+        Unlike `apply`, this is safe with threads, and does not prevent
+        `subprocess` from spawning with `posix_spawn` or `vfork`. The process
+        runs without the limits for the time it takes to apply them.
+
+        Args:
+            pid: The process ID.
+        """
+        try:
+            if self.memory is not None:
+                resource.prlimit(pid, resource.RLIMIT_AS, (self.memory, self.memory))
+            if self.cpu_time is not None:
+                resource.prlimit(
+                    pid, resource.RLIMIT_CPU, (self.cpu_time, self.cpu_time + 1)
+                )
+            if self.nice:
+                niceness = os.getpriority(os.PRIO_PROCESS, pid) + self.nice
+                os.setpriority(os.PRIO_PROCESS, pid, niceness)
+        except ProcessLookupError:
+            # It exited already.
+            pass
+
+
+# Whether limits can be applied to a running process, rather than in the child.
+_PRLIMIT = hasattr(resource, "prlimit")
+
+
+class _UsageMeter:
+    """Measures the resources consumed by subprocesses between start and stop."""
+
+    def __init__(self) -> None:
+        self._wall = time.perf_counter()
+        self._usage = resource.getrusage(resource.RUSAGE_CHILDREN) if resource else None
+
+    def stop(self, streams: dict[str, StreamStats]) -> InvocationStats:
+        stats = InvocationStats(
+            wall_time=time.perf_counter() - self._wall,
+            streams=streams,
+        )
+        if resource and self._usage:
+            usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+            stats.user_time = usage.ru_utime - self._usage.ru_utime
+            stats.system_time = usage.ru_stime - self._usage.ru_stime
+            if usage.ru_maxrss > self._usage.ru_maxrss:
+                stats.max_rss = usage.ru_maxrss * _MAXRSS_SCALE
+        return stats
+
+
+class _TailText(str):
+    """Text of an `OutputTail`, which `log_subprocess_error` knows is bounded."""
+
+    __slots__ = ()
+
+
+class OutputTail:
+    """Ring buffer holding the last lines of an output stream.
+
+    At most `max_lines` lines and `max_bytes` bytes are kept, a single line
+    longer than `max_bytes` is truncated, so memory use is bounded no matter how
+    much output goes through.
+    """
+
+    def __init__(
+        self,
+        max_lines: int = DEFAULT_TAIL_LINES,
+        max_bytes: int = DEFAULT_TAIL_BYTES,
+    ) -> None:
+        """Create a new tail buffer.
+
+        Args:
+            max_lines: Maximum number of lines to keep.
+            max_bytes: Maximum number of bytes to keep.
+        """
+        self.max_bytes = max_bytes
+        self._lines: deque[bytes] = deque(maxlen=max_lines)
+        self._size = 0
+
+    def extend(self, lines: list[bytes]) -> None:
+        """Add lines to the buffer, evicting the oldest ones.
+
+        Args:
+            lines: The raw lines, without their line terminators.
+        """
+        maxlen = self._lines.maxlen
+        if maxlen is not None and len(lines) > maxlen:
+            lines = lines[-maxlen:]
+        for line in lines:
+            line = line[: self.max_bytes]
+            if maxlen is not None and len(self._lines) == maxlen:
+                self._size -= len(self._lines[0])
+            self._lines.append(line)
+            self._size += len(line)
+            while self._size > self.max_bytes:
+                self._size -= len(self._lines.popleft())
+
+    def text(self) -> str:
+        """Return the buffered lines.
+
+        Returns:
+            The lines, decoded as UTF-8 with invalid bytes replaced.
+        """
+        return _TailText(b"\n".join(self._lines).decode("utf-8", errors="replace"))
+
+
+class CapturedOutput:
+    """Output of a subprocess, kept in memory up to a threshold then on disk.
+
+    The output is written to a `tempfile.SpooledTemporaryFile`, so it only
+    occupies memory until it grows past `spill_threshold` bytes, and can then be
+    read back through `buffer`, which memory maps it, or line by line by
+    iterating over it. Close it, or use it as a context manager, to release the
+    temporary file.
+    """
+
+    def __init__(self, spill_threshold: int = DEFAULT_SPILL_THRESHOLD) -> None:
+        """Create a new, empty capture.
+
+        Args:
+            spill_threshold: Number of bytes past which the output is moved to
+                a temporary file.
+        """
+        self.spill_threshold = spill_threshold
+        # Owned by the capture, released by `close`.
+        self.file = tempfile.SpooledTemporaryFile(max_size=spill_threshold)  # noqa: SIM115
+        self.size = 0
+        self._maps: list[mmap.mmap] = []
+
+    def __len__(self) -> int:
+        """Return the size of the output.
+
+        Returns:
+            The number of bytes captured.
+        """
+        return self.size
+
+    def __iter__(self) -> t.Iterator[bytes]:
+        """Iterate over the lines of the output, reading them from the start.
+
+        Yields:
+            The raw lines, without their line terminators.
+        """
+        self.file.seek(0)
+        for line in self.file:
+            yield line.removesuffix(b"\n")
+
+    def __enter__(self) -> CapturedOutput:
+        """Use the capture as a context manager.
+
+        Returns:
+            The capture itself.
+        """
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Close the capture when leaving the context.
+
+        Args:
+            exc_info: The exception raised in the context, if any.
+        """
+        self.close()
+
+    @property
+    def spilled(self) -> bool:
+        """Whether the output was moved to a temporary file."""
+        return self.size > self.spill_threshold
+
+    def write(self, data: bytes) -> int:
+        """Append output to the capture.
+
+        Args:
+            data: The output.
+
+        Returns:
+            The number of bytes written.
+        """
+        self.size += len(data)
+        return self.file.write(data)
+
+    async def awrite(self, data: bytes) -> int:
+        """Append output to the capture without blocking the event loop on disk.
+
+        Writes that keep the output in memory are performed right away, the
+        others, including the one moving the output to disk, in a thread.
+
+        Args:
+            data: The output.
+
+        Returns:
+            The number of bytes written.
+        """
+        if self.size + len(data) <= self.spill_threshold:
+            return self.write(data)
+        return await asyncio.to_thread(self.write, data)
+
+    def flush(self) -> None:
+        """Flush the output written so far."""
+        self.file.flush()
+
+    def buffer(self) -> bytes | mmap.mmap:
+        """Return the output as a bytes-like object, without loading it from disk.
+
+        Returns:
+            A read-only memory map of the temporary file if the output was
+            spilled to disk, the output itself otherwise.
+        """
+        if not self.spilled:
+            return self.getvalue()
+        self.file.flush()
+        mapped = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return mapped
+
+    def getvalue(self) -> bytes:
+        """Read the whole output into memory.
+
+        Returns:
+            The output.
+        """
+        self.file.seek(0)
+        return self.file.read()
+
+    def text(self, encoding: str = "utf-8", errors: str = "strict") -> str:
+        """Read and decode the whole output.
+
+        Args:
+            encoding: The encoding of the output.
+            errors: How to handle decoding errors.
+
+        Returns:
+            The decoded output.
+        """
+        return self.getvalue().decode(encoding, errors)
+
+    def close(self) -> None:
+        """Release the memory maps and the temporary file."""
+        for mapped in self._maps:
+            mapped.close()
+        self._maps.clear()
+        self.file.close()
+
+
+def _captured_stats(
+    stdout: str | bytes | None,
+    stderr: str | bytes | None,
+) -> dict[str, StreamStats]:
+    """Compute the output volume of captured streams.
+
+    Args:
+        stdout: The captured stdout, if any.
+        stderr: The captured stderr, if any.
+
+    Returns:
+        The stats of each stream that was captured.
+    """
+    streams = {}
+    for name, data in (("stdout", stdout), ("stderr", stderr)):
+        if data is None:
+            continue
+        raw = data.encode() if isinstance(data, str) else data
+        streams[name] = stats = StreamStats()
+        stats.count(raw)
+        if raw and not raw.endswith(b"\n"):
+            stats.line_count += 1
+    return streams
+
+
+class Sink(t.Protocol):
+    """Receives the raw output of a stream, see `Invoker.arun_and_tee`."""
+
+    async def write(self, data: bytes) -> None:
+        """Handle a chunk of output.
+
+        Args:
+            data: The output, in any number of complete or partial lines.
+        """
+
+    async def close(self) -> None:
+        """Handle the end of the stream."""
+
+
+class FileSink:
+    """Writes a stream to a file, a file descriptor or a binary file object.
+
+    Output is buffered up to `buffer_size` bytes, and written from a worker
+    thread so that a slow disk never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        target: str | os.PathLike[str] | int | t.BinaryIO,
+        buffer_size: int = DEFAULT_SINK_BUFFER_SIZE,
+    ) -> None:
+        """Create a new file sink.
+
+        Args:
+            target: Path of the file to create, or file descriptor or binary file
+                object to write to. File descriptors and file objects are left
+                open once the stream ends.
+            buffer_size: Number of bytes buffered before they are written.
+        """
+        self.file: t.BinaryIO
+        self._owned = True
+        if isinstance(target, int):
+            self.file = os.fdopen(target, "wb", closefd=False)
+        elif isinstance(target, (str, os.PathLike)):
+            self.file = open(target, "wb")  # noqa: SIM115 - closed by close()
+        else:
+            self.file = target
+            self._owned = False
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
+
+    async def write(self, data: bytes) -> None:
+        """Buffer a chunk of output, writing the buffer once it is full.
+
+        Args:
+            data: The output.
+        """
+        self._buffer += data
+        if len(self._buffer) >= self.buffer_size:
+            await self._flush()
+
+    async def close(self) -> None:
+        """Write the rest of the output and flush the file."""
+        await self._flush()
+        await asyncio.to_thread(self.file.flush)
+        if self._owned:
+            self.file.close()
+
+    async def _flush(self) -> None:
+        if self._buffer:
+            data = bytes(self._buffer)
+            self._buffer.clear()
+            await asyncio.to_thread(self.file.write, data)
+
+
+class LoggerSink:
+    """Logs a stream line by line, as `Invoker.run_and_log` does."""
+
+    def __init__(
+        self,
+        logger: structlog.BoundLogger = log,
+        classifier: StreamClassifier | None = None,
+        max_line_size: int = DEFAULT_MAX_LINE_SIZE,
+        long_lines: LongLinePolicy | str = LongLinePolicy.truncate,
+    ) -> None:
+        """Create a new logger sink.
+
+        Args:
+            logger: The logger to emit the lines to.
+            classifier: Classifier to hand the lines to, e.g.
+                `singer.SingerClassifier()`, defaults to logging them.
+            max_line_size: Maximum size, in bytes, of the lines.
+            long_lines: Whether longer lines are truncated or split.
+        """
+        self.logger = logger
+        self.classifier = classifier or _LineLogger()
+        self._lines = _LineAssembler(max_line_size, LongLinePolicy(long_lines))
+
+    async def write(self, data: bytes) -> None:
+        """Log the lines completed by a chunk of output.
+
+        Args:
+            data: The output.
+        """
+        self._feed(self._lines.feed(data))
+
+    async def close(self) -> None:
+        """Log the last line, if it was not terminated."""
+        self._feed(self._lines.finish())
+        self.classifier.close(self.logger)
+
+    def _feed(self, lines: list[bytes]) -> None:
+        if lines:
+            self.classifier.feed(lines, self.logger)
+        self._lines.report_truncated(self.logger)
+
+
+class CallbackSink:
+    """Hands a stream to a function, e.g. to parse progress reports."""
+
+    def __init__(
+        self,
+        callback: t.Callable[[bytes], t.Awaitable[None] | None],
+        lines: bool = False,
+        max_line_size: int = DEFAULT_MAX_LINE_SIZE,
+    ) -> None:
+        """Create a new callback sink.
+
+        Args:
+            callback: Function, or coroutine function, called with the output.
+            lines: If true, call it once per line, without its line terminator,
+                rather than once per chunk read from the pipe.
+            max_line_size: Maximum size, in bytes, of the lines, longer lines
+                being split.
+        """
+        self.callback = callback
+        self._lines = (
+            _LineAssembler(max_line_size, LongLinePolicy.split) if lines else None
+        )
+
+    async def write(self, data: bytes) -> None:
+        """Call the callback with a chunk of output, or the lines it completed.
+
+        Args:
+            data: The output.
+        """
+        if self._lines is None:
+            await self._call(data)
+            return
+        for line in self._lines.feed(data):
+            await self._call(line)
+
+    async def close(self) -> None:
+        """Call the callback with the last line, if it was not terminated."""
+        if self._lines is not None:
+            for line in self._lines.finish():
+                await self._call(line)
+
+    async def _call(self, data: bytes) -> None:
+        result = self.callback(data)
+        if inspect.isawaitable(result):
+            await result
+
+
+class _SinkFeed:
+    """Feeds a sink from a bounded queue, in a task of its own."""
+
+    def __init__(self, sink: Sink, queue_size: int) -> None:
+        self.sink = sink
+        self.queue: asyncio.Queue[bytes | None] = asyncio.Queue(queue_size)
+        self.detached = False
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        try:
+            while (data := await self.queue.get()) is not None:
+                await self.sink.write(data)
+        finally:
+            await self.sink.close()
+
+    async def put(self, data: bytes | None, timeout: float | None) -> bool:
+        """Queue a chunk of output, or the end of the stream.
+
+        Args:
+            data: The chunk, or None at the end of the stream.
+            timeout: Maximum time, in seconds, to wait for room in the queue.
+
+        Returns:
+            Whether it was queued, False if the sink failed or is too slow.
+        """
+        if self.task.done():
+            return False
+        if not self.queue.full():
+            self.queue.put_nowait(data)
+            return True
+        try:
+            await asyncio.wait_for(self.queue.put(data), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def detach(self) -> None:
+        """Stop feeding the sink, closing it once its current write completes."""
+        self.detached = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def join(self, timeout: float | None) -> bool:
+        """Wait for the sink to handle its queue and close.
+
+        Args:
+            timeout: Maximum time, in seconds, to wait.
+
+        Returns:
+            Whether it completed in time, the task is cancelled otherwise.
+        """
+        try:
+            await asyncio.wait_for(self.task, timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+class InvocationResult(subprocess.CompletedProcess):
+    """The outcome of a subprocess invocation.
+
+    A `subprocess.CompletedProcess` that additionally carries the id the
+    invocation was tagged with, if any, and its resource usage.
+    """
+
+    def __init__(
+        self,
+        args: t.Sequence[ExecArg],
+        returncode: int,
+        stdout: str | bytes | CapturedOutput | None = None,
+        stderr: str | bytes | None = None,
+        invocation_id: str | None = None,
+        stats: InvocationStats | None = None,
+    ) -> None:
+        """Create a new invocation result.
+
+        Args:
+            args: The arguments used to launch the subprocess.
+            returncode: The exit status of the subprocess.
+            stdout: The captured stdout, if any.
+            stderr: The captured stderr, if any.
+            invocation_id: The id the invocation was tagged with.
+            stats: Resource usage and throughput of the invocation.
+        """
+        super().__init__(args, returncode, stdout=stdout, stderr=stderr)
+        self.invocation_id = invocation_id
+        self.stats = stats or InvocationStats()
+
+
+def log_subprocess_error(
+    cmd: str, err: subprocess.CalledProcessError, error_message: str
+) -> None:
+    """Log a subprocess error, replaying its output to the logger if it's available.
+
+    Stdout is only replayed when it is a tail kept by the invoker, e.g. with
+    `tail_stdout=True`.
+
+    Args:
+        cmd: the command that was run.
+        err: the error that was raised.
+        error_message: the error message to log.
+    """
+    replay = [("stderr", err.stderr)]
+    # Only replay stdout when it is a bounded tail, and not e.g. all the output
+    # captured by `Invoker.run()`.
+    if isinstance(err.output, _TailText):
+        replay.insert(0, ("stdout", err.output))
+    for stdio_stream, output in replay:
+        if isinstance(output, bytes):
+            output = output.decode("utf-8", errors="replace")
+        if output:
+            for line in output.split("\n"):
+                log.warning(line, cmd=cmd, stdio_stream=stdio_stream)
+    log.error(
+        f"error invoking {cmd}",
+        returncode=err.returncode,
+        error_message=error_message,
+    )
+
+
+class Invoker:
+    """Invoker utility class for invoking subprocesses."""
+
+    def __init__(
+        self,
+        bin: str,
+        cwd: str | None = None,
+        env: dict[str, t.Any] | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        loop_factory: LoopFactory | None = None,
+        stdout_classifier: t.Callable[[], StreamClassifier] | None = None,
+        log_stats: bool = False,
+        max_lines_per_second: float | None = None,
+        sample_every: int = 1,
+        tail_lines: int = DEFAULT_TAIL_LINES,
+        tail_bytes: int = DEFAULT_TAIL_BYTES,
+        tail_stdout: bool = False,
+        fast_spawn: bool = False,
+        timeout: float | None = None,
+        kill_grace: float = DEFAULT_KILL_GRACE,
+        limits: ResourceLimits | None = None,
+        max_line_size: int = DEFAULT_MAX_LINE_SIZE,
+        long_lines: LongLinePolicy | str = LongLinePolicy.truncate,
+        structured_logs: bool = False,
+        sink_queue_size: int = DEFAULT_SINK_QUEUE_SIZE,
+        sink_timeout: float | None = DEFAULT_SINK_TIMEOUT,
+    ) -> None:
+        """Minimal invoker for running subprocesses.
+
+        Args:
+            bin: The path/name of the binary to run.
+            cwd: The working directory to run from.
+            env: Env to use when calling Popen, defaults to current os.environ if None.
+            chunk_size: Maximum number of bytes read from a pipe at once.
+            batch_size: Maximum number of lines logged before yielding to the
+                event loop.
+            flush_interval: Maximum time, in seconds, complete lines are held
+                back while a batch fills up.
+            loop_factory: Factory for the event loop used by the blocking `run_*`
+                methods, e.g. `preferred_loop_factory()` to use uvloop when it
+                is installed. Defaults to the asyncio event loop.
+            stdout_classifier: Factory for a classifier that handles stdout in
+                place of logging every line, e.g. `singer.SingerClassifier`. A
+                new classifier is created for every invocation.
+            log_stats: If true, log the resource usage and throughput of every
+                invocation as a single event once the subprocess exits.
+            max_lines_per_second: If set, rate limit the lines logged per stream,
+                with the number of suppressed lines logged periodically.
+            sample_every: If greater than 1, only log one line out of this many
+                per stream.
+            tail_lines: Number of trailing stderr lines kept in memory while the
+                output is streamed, and attached to the `CalledProcessError`
+                raised when the subprocess fails. 0 disables it.
+            tail_bytes: Maximum number of trailing stderr bytes kept in memory.
+            tail_stdout: If true, also keep the trailing lines of stdout when it
+                is logged.
+            fast_spawn: If true, lower the cost of every spawn for invokers that
+                run many short-lived subprocesses: the binary is resolved on the
+                PATH and the env is encoded only once, on the first spawn, and
+                file descriptors are not closed in the child (they are not
+                inheritable by default anyway), which lets `subprocess` use
+                `posix_spawn` when no `cwd` is set. Changes made to `popen_env`
+                after the first spawn are ignored.
+            timeout: If set, maximum wall-clock time, in seconds, of every
+                invocation. The subprocess is then started in its own process
+                group, which is sent SIGTERM once the timeout expires, then
+                SIGKILL if it is still running `kill_grace` seconds later, and a
+                `subprocess.TimeoutExpired` is raised.
+            kill_grace: Seconds between SIGTERM and SIGKILL on timeout.
+            limits: Resource limits applied to every subprocess: right after it
+                starts on Linux, otherwise from a `preexec_fn`, see
+                `ResourceLimits.apply`.
+            max_line_size: Maximum size, in bytes, of the lines of output that
+                are logged or handed to the stdout classifier. Memory used to
+                assemble lines is bounded by it, whatever the output.
+            long_lines: Whether longer lines are truncated, with their original
+                length logged as a warning, or split into several lines.
+            structured_logs: If true, lines that are JSON log events, e.g. from
+                an extension logging with MELTANO_LOG_JSON, are re-emitted as
+                structured events: their message, level and fields are merged
+                into the event rather than logged as a string. Other lines are
+                logged as usual.
+            sink_queue_size: Number of chunks of output queued for each sink
+                of `arun_and_tee`, bounding the memory a slow sink can use.
+            sink_timeout: Maximum time, in seconds, reading a stream waits for a
+                sink whose queue is full. The sink is then detached and gets no
+                more output, so that it cannot stall the subprocess. None waits
+                indefinitely.
+
+        Raises:
+            NotImplementedError: If limits are set on a platform without the
+                `resource` module.
+        """
+        if limits is not None and resource is None:
+            raise NotImplementedError("Resource limits are not supported on Windows.")
+        self.bin = bin
+        self.cwd = cwd
+        self.popen_env = env or os.environ.copy()
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.loop_factory = loop_factory
+        self.stdout_classifier = stdout_classifier
+        self.log_stats = log_stats
+        self.max_lines_per_second = max_lines_per_second
+        self.sample_every = sample_every
+        self.tail_lines = tail_lines
+        self.tail_bytes = tail_bytes
+        self.tail_stdout = tail_stdout
+        self.fast_spawn = fast_spawn
+        self.timeout = timeout
+        self.kill_grace = kill_grace
+        self.limits = limits
+        self.max_line_size = max_line_size
+        self.long_lines = LongLinePolicy(long_lines)
+        self.structured_logs = structured_logs
+        self.sink_queue_size = sink_queue_size
+        self.sink_timeout = sink_timeout
+        self._executable: str | None = None
+        self._env_block: dict[t.Any, t.Any] | None = None
+
+    @property
+    def executable(self) -> str:
+        """The binary that is spawned, resolved once in fast spawn mode."""
+        if not self.fast_spawn:
+            return self.bin
+        if self._executable is None:
+            path = self.popen_env.get("PATH")
+            self._executable = shutil.which(self.bin, path=path) or self.bin
+        return self._executable
+
+    def _spawn_kwargs(self) -> dict[str, t.Any]:
+        """Build the keyword arguments shared by every spawn of the invoker.
+
+        Returns:
+            The keyword arguments to pass to `subprocess` or asyncio.
+        """
+        kwargs: dict[str, t.Any] = {"cwd": self.cwd, "env": self.popen_env}
+        if self.fast_spawn:
+            if self._env_block is None:
+                self._env_block = _encode_env(self.popen_env)
+            kwargs.update(env=self._env_block, close_fds=False)
+        if self.timeout is not None:
+            kwargs.update(_group_kwargs())
+        if self.limits is not None and not _PRLIMIT:
+            kwargs["preexec_fn"] = self.limits.apply
+        return kwargs
+
+    def _limit(
+        self,
+        p: asyncio.subprocess.Process | subprocess.Popen,
+        group: bool,
+    ) -> None:
+        """Apply the resource limits of the invoker to a new subprocess, on Linux.
+
+        If they cannot be applied, e.g. a negative `nice` without the privilege
+        to, the subprocess is killed rather than left running without them. The
+        caller still has to reap it.
+
+        Args:
+            p: The subprocess.
+            group: Whether the subprocess leads its own process group, which is
+                killed as a whole.
+        """
+        if self.limits is None or not _PRLIMIT:
+            return
+        try:
+            self.limits.apply_to(p.pid)
+        except BaseException:
+            if group:
+                _signal_group(p, signal.SIGKILL)
+            else:
+                with contextlib.suppress(ProcessLookupError):
+                    p.kill()
+            raise
+
+    async def _supervise(
+        self,
+        p: asyncio.subprocess.Process,
+        logger: structlog.BoundLogger = log,
+    ) -> _Watchdog:
+        """Start enforcing the limits and the timeout of the invoker on a subprocess.
+
+        Args:
+            p: The subprocess.
+            logger: The logger to report a timeout to.
+
+        Returns:
+            The watchdog, to cancel once the subprocess has exited.
+        """
+        try:
+            self._limit(p, group=self.timeout is not None)
+        except BaseException:
+            await p.wait()
+            raise
+        return _Watchdog(p, self.bin, self.timeout, self.kill_grace, logger)
+
+    def _check_timeout(self, watchdog: _Watchdog, result: InvocationResult) -> None:
+        """Raise if the watchdog of an invocation terminated it.
+
+        Args:
+            watchdog: The watchdog of the invocation.
+            result: The result of the invocation.
+
+        Raises:
+            TimeoutExpired: If the subprocess was terminated on timeout.
+        """
+        if watchdog.fired:
+            raise subprocess.TimeoutExpired(
+                self.bin,
+                t.cast(float, self.timeout),
+                output=result.stdout,
+                stderr=result.stderr,
+            )
+
+    def run(
+        self,
+        *args: ExecArg,
+        stdout: None | int | t.IO = subprocess.PIPE,
+        stderr: None | int | t.IO = subprocess.PIPE,
+        text: bool = True,
+        **kwargs: t.Any,
+    ) -> InvocationResult:
+        """Run a subprocess. Simple wrapper around subprocess.run.
+
+        Note that output from stdout and stderr is NOT logged automatically. Especially
+        useful when you want to run a command, but don't care about its output and only
+        care about its return code.
+
+        stdout and stderr by default are set up to use subprocess.PIPE. If you do not
+        want to capture io from the subprocess use subprocess.DEVNULL to discard it.
+
+        The Invoker's at env and cwd are used when calling `subprocess.run`. If you want
+        to override these you're likely better served using `subprocess.run` directly.
+
+        Lastly note that this method is blocking AND `subprocess.run` is called with
+        `check=True`. This means that if the subprocess fails a `CalledProcessError`
+        will be raised.
+
+        Args:
+            *args: The arguments to pass to the subprocess.
+            stdout: The stdout stream to use.
+            stderr: The stderr stream to use.
+            text: If true, decode stdin, stdout and stderr using the system default.
+            **kwargs: Additional keyword arguments to pass to subprocess.run.
+
+        Returns:
+            The completed process, along with its resource usage.
+
+        Raises:
+            CalledProcessError: If the subprocess failed.
+            TimeoutExpired: If the subprocess was terminated on timeout.
+        """
+        meter = _UsageMeter()
+        if self.timeout is None and (self.limits is None or not _PRLIMIT):
+            result = subprocess.run(
+                [self.executable, *args],
+                **self._spawn_kwargs(),
+                stdout=stdout,
+                stderr=stderr,
+                check=True,
+                text=text,
+                **kwargs,
+            )
+        else:
+            result = self._run_supervised(
+                [self.executable, *args],
+                **self._spawn_kwargs(),
+                stdout=stdout,
+                stderr=stderr,
+                text=text,
+                **kwargs,
+            )
+        return self._complete(
+            result.args,
+            result.returncode,
+            meter,
+            _captured_stats(result.stdout, result.stderr),
+            stdout=result.stdout,
+            stderr=result.stderr,
+        )
+
+    def _run_supervised(
+        self,
+        args: list[ExecArg],
+        input: str | bytes | None = None,
+        capture_output: bool = False,
+        timeout: float | None = None,
+        **kwargs: t.Any,
+    ) -> subprocess.CompletedProcess:
+        """Run a subprocess like `subprocess.run(check=True)`, enforcing the limits.
+
+        Unlike `subprocess.run`, which kills only the subprocess on timeout, its
+        whole process group is sent SIGTERM, then SIGKILL after `kill_grace`.
+
+        Args:
+            args: The arguments used to launch the subprocess.
+            input: Data to send to the stdin of the subprocess.
+            capture_output: If true, capture stdout and stderr, as with
+                `subprocess.run`.
+            timeout: Timeout of this invocation, the shortest of it and the
+                timeout of the invoker applies.
+            **kwargs: Additional keyword arguments to pass to `subprocess.Popen`.
+
+        Returns:
+            The completed process.
+
+        Raises:
+            ValueError: If output is both captured and redirected.
+            CalledProcessError: If the subprocess failed.
+            TimeoutExpired: If the subprocess was terminated on timeout.
+        """
+        group = timeout is not None or self.timeout is not None
+        if timeout is not None and self.timeout is None:
+            kwargs.update(_group_kwargs())
+        timeouts = [value for value in (self.timeout, timeout) if value is not None]
+        timeout = min(timeouts) if timeouts else None
+        if input is not None:
+            kwargs["stdin"] = subprocess.PIPE
+        if capture_output:
+            if kwargs.get("stdout") is not None or kwargs.get("stderr") is not None:
+                raise ValueError(
+                    "stdout and stderr arguments may not be used with capture_output."
+                )
+            kwargs["stdout"] = kwargs["stderr"] = subprocess.PIPE
+        with subprocess.Popen(args, **kwargs) as process:
+            # Leaving the context reaps the subprocess if this kills it.
+            self._limit(process, group)
+            try:
+                out, err = process.communicate(input, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                log.warning(
+                    "subprocess limit exceeded",
+                    cmd=self.bin,
+                    pid=process.pid,
+                    limit="timeout",
+                    timeout=timeout,
+                )
+                _signal_group(process, signal.SIGTERM)
+                try:
+                    out, err = process.communicate(timeout=self.kill_grace)
+                except subprocess.TimeoutExpired:
+                    log.warning(
+                        "subprocess killed",
+                        pid=process.pid,
+                        signal="SIGKILL",
+                        grace=self.kill_grace,
+                    )
+                    _signal_group(process, signal.SIGKILL)
+                    out, err = process.communicate()
+                raise subprocess.TimeoutExpired(
+                    process.args, t.cast(float, timeout), output=out, stderr=err
+                ) from None
+
+        returncode = t.cast(int, process.returncode)
+        if returncode:
+            raise subprocess.CalledProcessError(
+                returncode, process.args, output=out, stderr=err
+            )
+        return subprocess.CompletedProcess(process.args, returncode, out, err)
+
+    async def arun(
+        self,
+        *args: ExecArg,
+        stdout: None | int | t.IO = subprocess.PIPE,
+        stderr: None | int | t.IO = subprocess.PIPE,
+        text: bool = True,
+        **kwargs: t.Any,
+    ) -> InvocationResult:
+        """Run a subprocess on the running event loop. Async counterpart of `run`.
+
+        Output is captured, NOT logged, and a `CalledProcessError` is raised if
+        the subprocess fails, exactly like `run`.
+
+        Args:
+            *args: The arguments to pass to the subprocess.
+            stdout: The stdout stream to use.
+            stderr: The stderr stream to use.
+            text: If true, decode stdout and stderr using the system default.
+            **kwargs: Additional keyword arguments to pass to
+                `asyncio.create_subprocess_exec`.
+
+        Returns:
+            The completed process, along with its resource usage.
+
+        Raises:
+            CalledProcessError: If the subprocess failed.
+            TimeoutExpired: If the subprocess was terminated on timeout.
+        """
+        meter = _UsageMeter()
+        p = await asyncio.create_subprocess_exec(
+            self.executable,
+            *args,
+            **self._spawn_kwargs(),
+            stdout=stdout,
+            stderr=stderr,
+            **kwargs,
+        )
+        watchdog = await self._supervise(p)
+        try:
+            with _forward_sigint(p):
+                out, err = await p.communicate()
+        finally:
+            watchdog.cancel()
+
+        output: str | bytes | None = out
+        errors: str | bytes | None = err
+        if text:
+            output = _decode_text(out)
+            errors = _decode_text(err)
+
+        popen_args = [self.bin, *args]
+        returncode = t.cast(int, p.returncode)
+        if watchdog.fired:
+            raise subprocess.TimeoutExpired(
+                popen_args, t.cast(float, self.timeout), output=output, stderr=errors
+            )
+        if returncode:
+            raise subprocess.CalledProcessError(
+                returncode, popen_args, output=output, stderr=errors
+            )
+        return self._complete(
+            popen_args,
+            returncode,
+            meter,
+            _captured_stats(out, err),
+            stdout=output,
+            stderr=errors,
+        )
+
+    def _complete(
+        self,
+        args: t.Sequence[ExecArg],
+        returncode: int,
+        meter: _UsageMeter,
+        streams: dict[str, StreamStats],
+        logger: structlog.BoundLogger = log,
+        stdout: str | bytes | None = None,
+        stderr: str | bytes | None = None,
+    ) -> InvocationResult:
+        """Build the result of an invocation, logging its stats if enabled.
+
+        Args:
+            args: The arguments used to launch the subprocess.
+            returncode: The exit status of the subprocess.
+            meter: The meter started right before the subprocess was launched.
+            streams: The output volume of each stream.
+            logger: The logger to emit the stats to.
+            stdout: The captured stdout, if any.
+            stderr: The captured stderr, if any.
+
+        Returns:
+            The result of the invocation.
+        """
+        result = InvocationResult(
+            args, returncode, stdout=stdout, stderr=stderr, stats=meter.stop(streams)
+        )
+        if (
+            self.limits is not None
+            and self.limits.cpu_time is not None
+            and returncode == -signal.SIGXCPU
+        ):
+            logger.warning(
+                "subprocess limit exceeded",
+                cmd=self.bin,
+                limit="cpu_time",
+                cpu_time=self.limits.cpu_time,
+            )
+        if self.log_stats:
+            logger.info(
+                "invocation stats",
+                cmd=self.bin,
+                returncode=returncode,
+                **dataclasses.asdict(result.stats),
+            )
+        return result
+
+    def _line_logger(self, stream_name: str) -> _LineLogger:
+        """Create the handler logging the lines of a stream.
+
+        Args:
+            stream_name: The name of the stream.
+
+        Returns:
+            A line logger, sampled if the invoker is configured to.
+        """
+        if self.max_lines_per_second is None and self.sample_every <= 1:
+            return _LineLogger(structured=self.structured_logs)
+        return _LineLogger(
+            LogSampler(
+                rate=self.max_lines_per_second,
+                sample_every=self.sample_every,
+                name=stream_name,
+            ),
+            structured=self.structured_logs,
+        )
+
+    async def _log_stdio(
+        self,
+        reader: asyncio.streams.StreamReader,
+        logger: structlog.BoundLogger = log,
+        classifier: StreamClassifier | None = None,
+        stats: StreamStats | None = None,
+        tail: OutputTail | None = None,
+    ) -> None:
+        """Log the output of a stream.
+
+        The stream is read in chunks of up to `chunk_size` bytes which are split
+        into lines of at most `max_line_size` bytes in bulk. Complete lines are
+        logged in batches of `batch_size`, or once the oldest of them has waited
+        `flush_interval` seconds, and the event loop is only yielded to once per
+        batch. Truncated lines are reported once they have been logged.
+
+        Args:
+            reader: The stream reader to read from.
+            logger: The logger to emit the lines to.
+            classifier: Classifier to hand the lines to, defaults to logging them.
+            stats: Stats to account the output of the stream to.
+            tail: Buffer to keep the last lines of the stream in.
+        """
+        stats = stats or StreamStats()
+        classifier = classifier or _LineLogger(structured=self.structured_logs)
+        loop = asyncio.get_running_loop()
+        assembler = _LineAssembler(self.max_line_size, self.long_lines)
+        batch: list[bytes] = []
+        deadline: float | None = None
+        eof = False
+        last = b""
+
+        while not eof:
+            timeout = None if deadline is None else max(deadline - loop.time(), 0)
+            try:
+                data = await asyncio.wait_for(reader.read(self.chunk_size), timeout)
+            except asyncio.TimeoutError:
+                data = None
+
+            if data:
+                batch.extend(assembler.feed(data))
+                # Count the lines of the output, not the pieces long ones are
+                # split into.
+                stats.count(data)
+                last = data
+            elif data is not None:
+                eof = True
+                batch.extend(assembler.finish())
+                if last and not last.endswith(b"\n"):
+                    stats.line_count += 1
+
+            if batch and deadline is None:
+                deadline = loop.time() + self.flush_interval
+
+            if batch and (
+                eof
+                or len(batch) >= self.batch_size
+                or loop.time() >= t.cast(float, deadline)
+            ):
+                if tail is not None:
+                    tail.extend(batch)
+                for start in range(0, len(batch), self.batch_size):
+                    classifier.feed(batch[start : start + self.batch_size], logger)
+                    await asyncio.sleep(0)
+                batch = []
+                deadline = None
+
+            if not batch:
+                assembler.report_truncated(logger)
+
+        classifier.close(logger)
+
+    async def _feed_stdin(
+        self,
+        writer: asyncio.StreamWriter,
+        chunks: t.AsyncIterator[bytes | str],
+    ) -> None:
+        """Write input to the stdin of a subprocess, then close it.
+
+        Every chunk is only written once the subprocess has consumed enough of
+        the previous ones for the pipe buffer to drain, so input is never read
+        faster than the subprocess processes it. Text is encoded as UTF-8.
+
+        Args:
+            writer: The stdin of the subprocess.
+            chunks: The input.
+        """
+        try:
+            async for chunk in chunks:
+                writer.write(chunk.encode() if isinstance(chunk, str) else chunk)
+                await writer.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # The subprocess exited without reading all of its input.
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(BrokenPipeError, ConnectionResetError):
+                await writer.wait_closed()
+
+    async def _forward_stdio(
+        self,
+        reader: asyncio.streams.StreamReader,
+        target: t.BinaryIO,
+        stats: StreamStats | None = None,
+    ) -> None:
+        """Copy the raw bytes of a stream to a binary file object.
+
+        Args:
+            reader: The stream reader to read from.
+            target: The binary file object to write to.
+            stats: Stats to account the output of the stream to.
+        """
+        stats = stats or StreamStats()
+        data = b""
+        while True:
+            chunk = await reader.read(self.chunk_size)
+            if not chunk:
+                break
+            data = chunk
+            if isinstance(target, CapturedOutput):
+                await target.awrite(data)
+            else:
+                target.write(data)
+            stats.count(data)
+        target.flush()
+        if data and not data.endswith(b"\n"):
+            stats.line_count += 1
+
+    async def _tee_stdio(
+        self,
+        reader: asyncio.streams.StreamReader,
+        sinks: t.Sequence[Sink],
+        stream_name: str,
+        logger: structlog.BoundLogger = log,
+        stats: StreamStats | None = None,
+        tail: OutputTail | None = None,
+    ) -> None:
+        """Copy the raw bytes of a stream to several sinks.
+
+        Every sink is fed from a queue of up to `sink_queue_size` chunks by a
+        task of its own, so sinks run concurrently and at their own pace. A sink
+        that fails, or whose queue stays full for `sink_timeout` seconds, is
+        detached: it is logged, and the other sinks carry on. The first error
+        raised by a sink is re-raised once the stream has ended.
+
+        Args:
+            reader: The stream reader to read from.
+            sinks: The sinks to copy the stream to.
+            stream_name: The name of the stream.
+            logger: The logger to report detached sinks to.
+            stats: Stats to account the output of the stream to.
+            tail: Buffer to keep the last lines of the stream in.
+        """
+        stats = stats or StreamStats()
+        tail_lines = (
+            _LineAssembler(self.tail_bytes, LongLinePolicy.truncate)
+            if tail is not None
+            else None
+        )
+        feeds = [_SinkFeed(sink, self.sink_queue_size) for sink in sinks]
+
+        def _detach(feed: _SinkFeed) -> None:
+            logger.warning(
+                "output sink detached",
+                stdio_stream=stream_name,
+                sink=type(feed.sink).__name__,
+                reason="failed" if feed.task.done() else "too slow",
+            )
+            feed.detach()
+
+        data = b""
+        while chunk := await reader.read(self.chunk_size):
+            data = chunk
+            stats.count(data)
+            if tail_lines is not None:
+                t.cast(OutputTail, tail).extend(tail_lines.feed(data))
+            for feed in feeds:
+                if not feed.detached and not await feed.put(data, self.sink_timeout):
+                    _detach(feed)
+        if data and not data.endswith(b"\n"):
+            stats.line_count += 1
+        if tail_lines is not None:
+            t.cast(OutputTail, tail).extend(tail_lines.finish())
+
+        for feed in feeds:
+            if not feed.detached and not await feed.put(None, self.sink_timeout):
+                _detach(feed)
+        joined = await asyncio.gather(
+            *(feed.join(self.sink_timeout) for feed in feeds), return_exceptions=True
+        )
+        for feed, result in zip(feeds, joined, strict=True):
+            if isinstance(result, Exception):
+                raise result
+            if not result:
+                logger.warning(
+                    "output sink cancelled",
+                    stdio_stream=stream_name,
+                    sink=type(feed.sink).__name__,
+                )
+
+    async def _exec(
+        self,
+        sub_command: str | None = None,
+        *args: ExecArg,
+        stdin: StdinSource | None = None,
+        stdout: int = asyncio.subprocess.PIPE,
+        forward_to: t.BinaryIO | None = None,
+        sinks: t.Mapping[str, t.Sequence[Sink]] | None = None,
+        logger: structlog.BoundLogger = log,
+        handed_over: list[int] | None = None,
+    ) -> InvocationResult:
+        popen_args: list[ExecArg] = []
+        if sub_command:
+            popen_args.append(sub_command)
+        if args:
+            popen_args.extend(args)
+
+        try:
+            kwargs = self._spawn_kwargs()
+            stdin_fd, feed = _stdin_source(stdin, self.chunk_size)
+            if stdin_fd is not None:
+                kwargs["stdin"] = stdin_fd
+            elif feed is not None:
+                kwargs["stdin"] = asyncio.subprocess.PIPE
+            meter = _UsageMeter()
+            p = await asyncio.create_subprocess_exec(
+                self.executable,
+                *popen_args,
+                stdout=stdout,
+                stderr=asyncio.subprocess.PIPE,
+                **kwargs,
+            )
+        finally:
+            # The subprocess holds its own copies of the descriptors now, or
+            # failed to spawn and the other stages must see their pipes close.
+            # They are removed from the list, which the caller closes if this
+            # never runs.
+            while handed_over:
+                os.close(handed_over.pop())
+        watchdog = await self._supervise(p, logger)
+
+        pumps: list[t.Coroutine[t.Any, t.Any, None]] = []
+        streams: dict[str, StreamStats] = {}
+        tails: dict[str, OutputTail] = {}
+
+        if feed is not None:
+            pumps.append(self._feed_stdin(t.cast(asyncio.StreamWriter, p.stdin), feed))
+
+        sinks = sinks or {}
+        if p.stderr:
+            streams["stderr"] = stderr_stats = StreamStats()
+            if self.tail_lines:
+                tails["stderr"] = OutputTail(self.tail_lines, self.tail_bytes)
+            if "stderr" in sinks:
+                pumps.append(
+                    self._tee_stdio(
+                        p.stderr,
+                        sinks["stderr"],
+                        "stderr",
+                        logger,
+                        stderr_stats,
+                        tails.get("stderr"),
+                    )
+                )
+            else:
+                pumps.append(
+                    self._log_stdio(
+                        p.stderr,
+                        _bind_stream(logger, "stderr"),
+                        self._line_logger("stderr"),
+                        stderr_stats,
+                        tails.get("stderr"),
+                    )
+                )
+
+        if p.stdout:
+            streams["stdout"] = stdout_stats = StreamStats()
+            if "stdout" in sinks:
+                if self.tail_lines and self.tail_stdout:
+                    tails["stdout"] = OutputTail(self.tail_lines, self.tail_bytes)
+                pumps.append(
+                    self._tee_stdio(
+                        p.stdout,
+                        sinks["stdout"],
+                        "stdout",
+                        logger,
+                        stdout_stats,
+                        tails.get("stdout"),
+                    )
+                )
+            elif forward_to is not None:
+                pumps.append(self._forward_stdio(p.stdout, forward_to, stdout_stats))
+            else:
+                classifier = (
+                    self.stdout_classifier()
+                    if self.stdout_classifier
+                    else self._line_logger("stdout")
+                )
+                if self.tail_lines and self.tail_stdout:
+                    tails["stdout"] = OutputTail(self.tail_lines, self.tail_bytes)
+                pumps.append(
+                    self._log_stdio(
+                        p.stdout,
+                        _bind_stream(logger, "stdout"),
+                        classifier,
+                        stdout_stats,
+                        tails.get("stdout"),
+                    )
+                )
+
+        try:
+            with _forward_sigint(p):
+                results = await asyncio.gather(
+                    *[asyncio.create_task(pump) for pump in pumps],
+                    return_exceptions=True,
+                )
+
+                for r in results:  # raise first exception if any
+                    if isinstance(r, Exception):
+                        raise r
+
+                await p.wait()
+        finally:
+            watchdog.cancel()
+
+        result = self._complete(
+            [self.bin, *popen_args],
+            t.cast(int, p.returncode),
+            meter,
+            streams,
+            logger,
+            stdout=tails["stdout"].text() if "stdout" in tails else None,
+            stderr=tails["stderr"].text() if "stderr" in tails else None,
+        )
+        self._check_timeout(watchdog, result)
+        return result
+
+    async def arun_and_log(
+        self,
+        sub_command: str | None = None,
+        *args: ExecArg,
+        stdin: StdinSource | None = None,
+    ) -> InvocationResult:
+        """Run a subprocess on the running event loop, streaming output to the logger.
+
+        Async counterpart of `run_and_log`, for use from code that already runs
+        inside an event loop.
+
+        Args:
+            sub_command: The subcommand to run.
+            *args: The arguments to pass to the subprocess.
+            stdin: Input fed to the subprocess while its output is read, see
+                `StdinSource`. Defaults to inheriting the stdin of the extension.
+
+        Returns:
+            The result of the invocation, along with its resource usage.
+
+        Raises:
+            CalledProcessError: If the subprocess failed.
+            TimeoutExpired: If the subprocess was terminated on timeout.
+        """
+        result = await self._exec(sub_command, *args, stdin=stdin)
+        if result.returncode:
+            raise subprocess.CalledProcessError(
+                result.returncode,
+                cmd=self.bin,
+                output=result.stdout,
+                stderr=result.stderr,
+            )
+        return result
+
+    def run_and_log(
+        self,
+        sub_command: str | None = None,
+        *args: ExecArg,
+        stdin: StdinSource | None = None,
+    ) -> InvocationResult:
+        """Run a subprocess and stream the output to the logger.
+
+        Note that output from stdout and stderr IS logged. Best used when you want
+        to run a command and stream the output to a user.
+
+        This method blocks on a new event loop and cannot be called from a running
+        one, use `arun_and_log` instead in that case.
+
+        Args:
+            sub_command: The subcommand to run.
+            *args: The arguments to pass to the subprocess.
+            stdin: Input fed to the subprocess while its output is read, see
+                `StdinSource`. Defaults to inheriting the stdin of the extension.
+
+        Returns:
+            The result of the invocation, along with its resource usage.
 
-def log_subprocess_error(
-    cmd: str, err: subprocess.CalledProcessError, error_message: str
-) -> None:
-    """Log a subprocess error, replaying stderr to the logger if it's available.
+        Raises:
+            CalledProcessError: If the subprocess failed.
+            TimeoutExpired: If the subprocess was terminated on timeout.
+        """
+        return _run_coroutine(
+            self.arun_and_log(sub_command, *args, stdin=stdin), self.loop_factory
+        )
 
-    Args:
-        cmd: the command that was run.
-        err: the error that was raised.
-        error_message: the error message to log.
-    """
-    if err.stderr:
-        for line in err.stderr.split("\n"):
-            log.warning(line, cmd=cmd, stdio_stream="stderr")
-    log.error(
-        f"error invoking {cmd}",
-        returncode=err.returncode,
-        error_message=error_message,
-    )
+    async def arun_and_forward(
+        self,
+        sub_command: str | None = None,
+        *args: ExecArg,
+        stdout: int | t.BinaryIO | None = None,
+        stdin: StdinSource | None = None,
+    ) -> InvocationResult:
+        """Run a subprocess, forwarding its stdout unchanged and logging its stderr.
 
+        Use this instead of `arun_and_log` when the stdout of the wrapped CLI is a
+        data stream (e.g. Singer messages emitted by a tap) rather than log output.
 
-class Invoker:
-    """Invoker utility class for invoking subprocesses."""
+        When the target exposes a file descriptor it is handed directly to the
+        subprocess, so the bytes never pass through the extension at all. Targets
+        without a file descriptor (e.g. `io.BytesIO`) are fed through large
+        buffered copies instead. No decoding or line splitting is done either way.
 
-    def __init__(
+        Args:
+            sub_command: The subcommand to run.
+            *args: The arguments to pass to the subprocess.
+            stdout: File descriptor or binary file object to forward stdout to,
+                defaults to the stdout of the current process.
+            stdin: Input fed to the subprocess while its output is read, see
+                `StdinSource`. Defaults to inheriting the stdin of the extension.
+
+        Returns:
+            The result of the invocation, along with its resource usage. Stdout
+            is not accounted for when it was handed to the subprocess.
+
+        Raises:
+            CalledProcessError: If the subprocess failed.
+            TimeoutExpired: If the subprocess was terminated on timeout.
+        """
+        fd, forward_to = _stdout_target(sys.stdout.buffer if stdout is None else stdout)
+        if fd is None:
+            result = await self._exec(
+                sub_command, *args, stdin=stdin, forward_to=forward_to
+            )
+        else:
+            result = await self._exec(sub_command, *args, stdin=stdin, stdout=fd)
+
+        if result.returncode:
+            raise subprocess.CalledProcessError(
+                result.returncode,
+                cmd=self.bin,
+                output=result.stdout,
+                stderr=result.stderr,
+            )
+        return result
+
+    def run_and_forward(
         self,
-        bin: str,
-        cwd: str | None = None,
-        env: dict[str, t.Any] | None = None,
-    ) -> None:
-        """Minimal invoker for running subprocesses.
+        sub_command: str | None = None,
+        *args: ExecArg,
+        stdout: int | t.BinaryIO | None = None,
+        stdin: StdinSource | None = None,
+    ) -> InvocationResult:
+        """Blocking counterpart of `arun_and_forward`.
 
         Args:
-            bin: The path/name of the binary to run.
-            cwd: The working directory to run from.
-            env: Env to use when calling Popen, defaults to current os.environ if None.
+            sub_command: The subcommand to run.
+            *args: The arguments to pass to the subprocess.
+            stdout: File descriptor or binary file object to forward stdout to,
+                defaults to the stdout of the current process.
+            stdin: Input fed to the subprocess while its output is read, see
+                `StdinSource`. Defaults to inheriting the stdin of the extension.
+
+        Returns:
+            The result of the invocation, along with its resource usage.
         """
-        self.bin = bin
-        self.cwd = cwd
-        self.popen_env = env or os.environ.copy()
+        return _run_coroutine(
+            self.arun_and_forward(sub_command, *args, stdout=stdout, stdin=stdin),
+            self.loop_factory,
+        )
 
-    def run(
+    async def arun_and_tee(
         self,
+        sub_command: str | None = None,
         *args: ExecArg,
-        stdout: None | int | t.IO = subprocess.PIPE,
-        stderr: None | int | t.IO = subprocess.PIPE,
-        text: bool = True,
-        **kwargs: t.Any,
-    ) -> subprocess.CompletedProcess:
-        """Run a subprocess. Simple wrapper around subprocess.run.
-
-        Note that output from stdout and stderr is NOT logged automatically. Especially
-        useful when you want to run a command, but don't care about its output and only
-        care about its return code.
+        stdout: t.Sequence[Sink] = (),
+        stderr: t.Sequence[Sink] | None = None,
+        stdin: StdinSource | None = None,
+    ) -> InvocationResult:
+        """Run a subprocess, copying each of its output streams to several sinks.
 
-        stdout and stderr by default are set up to use subprocess.PIPE. If you do not
-        want to capture io from the subprocess use subprocess.DEVNULL to discard it.
+        This reads the output once however many consumers it has, e.g. to write
+        stdout to a file while logging it and parsing progress from it:
 
-        The Invoker's at env and cwd are used when calling `subprocess.run`. If you want
-        to override these you're likely better served using `subprocess.run` directly.
+            await invoker.arun_and_tee(
+                "run",
+                stdout=[
+                    FileSink("output.log"),
+                    LoggerSink(),
+                    CallbackSink(parse_progress, lines=True),
+                ],
+            )
 
-        Lastly note that this method is blocking AND `subprocess.run` is called with
-        `check=True`. This means that if the subprocess fails a `CalledProcessError`
-        will be raised.
+        See `sink_queue_size` and `sink_timeout` for how slow sinks are handled.
 
         Args:
+            sub_command: The subcommand to run.
             *args: The arguments to pass to the subprocess.
-            stdout: The stdout stream to use.
-            stderr: The stderr stream to use.
-            text: If true, decode stdin, stdout and stderr using the system default.
-            **kwargs: Additional keyword arguments to pass to subprocess.run.
+            stdout: The sinks stdout is copied to, it is discarded if there are
+                none.
+            stderr: The sinks stderr is copied to, defaults to logging it.
+            stdin: Input fed to the subprocess while its output is read, see
+                `StdinSource`. Defaults to inheriting the stdin of the extension.
 
         Returns:
-            The completed process.
+            The result of the invocation, along with its resource usage.
+
+        Raises:
+            CalledProcessError: If the subprocess failed.
+            TimeoutExpired: If the subprocess was terminated on timeout.
         """
-        return subprocess.run(
-            [self.bin, *args],
-            cwd=self.cwd,
-            env=self.popen_env,
-            stdout=stdout,
-            stderr=stderr,
-            check=True,
-            text=text,
-            **kwargs,
-        )
+        sinks = {"stdout": stdout}
+        if stderr is not None:
+            sinks["stderr"] = stderr
+        result = await self._exec(sub_command, *args, stdin=stdin, sinks=sinks)
+        if result.returncode:
+            raise subprocess.CalledProcessError(
+                result.returncode,
+                cmd=self.bin,
+                output=result.stdout,
+                stderr=result.stderr,
+            )
+        return result
 
-    @staticmethod
-    async def _log_stdio(reader: asyncio.streams.StreamReader) -> None:
-        """Log the output of a stream.
+    def run_and_tee(
+        self,
+        sub_command: str | None = None,
+        *args: ExecArg,
+        stdout: t.Sequence[Sink] = (),
+        stderr: t.Sequence[Sink] | None = None,
+        stdin: StdinSource | None = None,
+    ) -> InvocationResult:
+        """Blocking counterpart of `arun_and_tee`.
 
         Args:
-            reader: The stream reader to read from.
+            sub_command: The subcommand to run.
+            *args: The arguments to pass to the subprocess.
+            stdout: The sinks stdout is copied to, it is discarded if there are
+                none.
+            stderr: The sinks stderr is copied to, defaults to logging it.
+            stdin: Input fed to the subprocess while its output is read, see
+                `StdinSource`. Defaults to inheriting the stdin of the extension.
+
+        Returns:
+            The result of the invocation, along with its resource usage.
         """
-        while True:
-            if reader.at_eof():
-                break
-            data = await reader.readline()
-            log.info(data.decode("utf-8").rstrip())
-            await asyncio.sleep(0)
+        return _run_coroutine(
+            self.arun_and_tee(
+                sub_command, *args, stdout=stdout, stderr=stderr, stdin=stdin
+            ),
+            self.loop_factory,
+        )
 
-    async def _exec(
+    async def astream(
         self,
         sub_command: str | None = None,
         *args: ExecArg,
-    ) -> asyncio.subprocess.Process:
+        chunks: bool = False,
+        stdin: StdinSource | None = None,
+    ) -> t.AsyncIterator[bytes]:
+        """Run a subprocess, yielding its stdout as it is produced.
+
+        Stdout is only read as fast as the caller consumes it: once the pipe is
+        full the subprocess blocks on its writes, so arbitrarily large output is
+        processed in bounded memory. Lines longer than `max_line_size` are
+        handled according to `long_lines`, truncated ones being reported as
+        warnings. Stderr is logged meanwhile, as with
+        `arun_and_log`. Leaving the iteration early kills the subprocess.
+
+        Args:
+            sub_command: The subcommand to run.
+            *args: The arguments to pass to the subprocess.
+            chunks: If true, yield stdout in raw chunks of up to `chunk_size`
+                bytes instead of line by line.
+            stdin: Input fed to the subprocess while its output is read, see
+                `StdinSource`. Defaults to inheriting the stdin of the extension.
+
+        Yields:
+            The lines of stdout, without their line terminators, or raw chunks.
+
+        Raises:
+            CalledProcessError: If the subprocess failed, once stdout is exhausted.
+            TimeoutExpired: If the subprocess was terminated on timeout.
+        """
         popen_args: list[ExecArg] = []
         if sub_command:
             popen_args.append(sub_command)
         if args:
             popen_args.extend(args)
 
+        kwargs = self._spawn_kwargs()
+        stdin_fd, feed = _stdin_source(stdin, self.chunk_size)
+        if stdin_fd is not None:
+            kwargs["stdin"] = stdin_fd
+        elif feed is not None:
+            kwargs["stdin"] = asyncio.subprocess.PIPE
+        meter = _UsageMeter()
         p = await asyncio.create_subprocess_exec(
-            self.bin,
+            self.executable,
             *popen_args,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
-            cwd=self.cwd,
-            env=self.popen_env,
+            **kwargs,
         )
-
-        loop = asyncio.get_event_loop()
-        # Windows does not support add_signal_handler
-        # https://docs.python.org/3/library/asyncio-platforms.html
-        if sys.platform != "win32":
-            loop.add_signal_handler(
-                signal.SIGINT,
-                lambda s=signal.SIGINT: p.send_signal(s),  # type: ignore[misc]
+        watchdog = await self._supervise(p)
+        reader = t.cast(asyncio.StreamReader, p.stdout)
+        streams = {"stdout": StreamStats(), "stderr": StreamStats()}
+        tail = OutputTail(self.tail_lines, self.tail_bytes) if self.tail_lines else None
+        stderr_pump = asyncio.create_task(
+            self._log_stdio(
+                t.cast(asyncio.StreamReader, p.stderr),
+                _bind_stream(log, "stderr"),
+                classifier=self._line_logger("stderr"),
+                stats=streams["stderr"],
+                tail=tail,
+            )
+        )
+        feeder = None
+        if feed is not None:
+            feeder = asyncio.create_task(
+                self._feed_stdin(t.cast(asyncio.StreamWriter, p.stdin), feed)
             )
 
-        streams: list[asyncio.streams.StreamReader] = []
-
-        if p.stderr:
-            streams.append(p.stderr)
+        try:
+            with _forward_sigint(p):
+                assembler = _LineAssembler(self.max_line_size, self.long_lines)
+                last = b""
+                while data := await reader.read(self.chunk_size):
+                    streams["stdout"].count(data)
+                    last = data
+                    if chunks:
+                        yield data
+                        continue
+                    for line in assembler.feed(data):
+                        yield line
+                    assembler.report_truncated(log)
+                if last and not last.endswith(b"\n"):
+                    streams["stdout"].line_count += 1
+                for line in assembler.finish():
+                    yield line
+                assembler.report_truncated(log)
 
-        if p.stdout:
-            streams.append(p.stdout)
+                await stderr_pump
+                if feeder is not None:
+                    await feeder
+                await p.wait()
+        finally:
+            watchdog.cancel()
+            stderr_pump.cancel()
+            if feeder is not None:
+                feeder.cancel()
+            if p.returncode is None:
+                # The caller stopped early, e.g. by breaking out of the loop.
+                if self.timeout is not None:
+                    # Along with the subprocesses it started.
+                    _signal_group(p, signal.SIGKILL)
+                else:
+                    p.kill()
+                await p.wait()
 
-        results = await asyncio.gather(
-            *[asyncio.create_task(self._log_stdio(stream)) for stream in streams],
-            return_exceptions=True,
+        result = self._complete(
+            [self.bin, *popen_args],
+            t.cast(int, p.returncode),
+            meter,
+            streams,
+            stderr=tail.text() if tail else None,
         )
+        self._check_timeout(watchdog, result)
+        if result.returncode:
+            raise subprocess.CalledProcessError(
+                result.returncode, cmd=self.bin, stderr=result.stderr
+            )
 
-        for r in results:  # raise first exception if any
-            if isinstance(r, Exception):
-                raise r
+    def stream(
+        self,
+        sub_command: str | None = None,
+        *args: ExecArg,
+        chunks: bool = False,
+        stdin: StdinSource | None = None,
+    ) -> t.Iterator[bytes]:
+        """Blocking counterpart of `astream`.
 
-        await p.wait()
-        return p
+        The subprocess is driven on a new event loop that only runs while the
+        next line is requested, so this cannot be used from a running one.
 
-    def run_and_log(
+        Args:
+            sub_command: The subcommand to run.
+            *args: The arguments to pass to the subprocess.
+            chunks: If true, yield stdout in raw chunks of up to `chunk_size`
+                bytes instead of line by line.
+            stdin: Input fed to the subprocess while its output is read, see
+                `StdinSource`. Defaults to inheriting the stdin of the extension.
+
+        Returns:
+            An iterator over the lines of stdout, or over raw chunks.
+        """
+        return _iterate(
+            t.cast(
+                t.AsyncGenerator[bytes, None],
+                self.astream(sub_command, *args, chunks=chunks, stdin=stdin),
+            ),
+            self.loop_factory,
+        )
+
+    async def arun_and_capture(
         self,
         sub_command: str | None = None,
         *args: ExecArg,
-    ) -> None:
-        """Run a subprocess and stream the output to the logger.
+        spill_threshold: int = DEFAULT_SPILL_THRESHOLD,
+        stdin: StdinSource | None = None,
+    ) -> InvocationResult:
+        """Run a subprocess, capturing its stdout in bounded memory.
 
-        Note that output from stdout and stderr IS logged. Best used when you want
-        to run a command and stream the output to a user.
+        Stdout is captured into a `CapturedOutput`, which moves to a temporary
+        file once it grows past `spill_threshold` bytes, while stderr is logged.
+        Use this instead of `arun` for commands that may produce more output
+        than fits in memory, such as catalog discovery.
 
         Args:
             sub_command: The subcommand to run.
             *args: The arguments to pass to the subprocess.
+            spill_threshold: Number of bytes of stdout kept in memory before it
+                is moved to a temporary file.
+            stdin: Input fed to the subprocess while its output is read, see
+                `StdinSource`. Defaults to inheriting the stdin of the extension.
+
+        Returns:
+            The result of the invocation, with a `CapturedOutput` as stdout. It
+            should be closed once it is no longer needed.
 
         Raises:
             CalledProcessError: If the subprocess failed.
+            TimeoutExpired: If the subprocess was terminated on timeout.
         """
-        result = asyncio.run(self._exec(sub_command, *args))
+        capture = CapturedOutput(spill_threshold)
+        try:
+            result = await self._exec(
+                sub_command,
+                *args,
+                stdin=stdin,
+                forward_to=t.cast(t.BinaryIO, capture),
+            )
+        except BaseException:
+            capture.close()
+            raise
+
         if result.returncode:
+            capture.close()
             raise subprocess.CalledProcessError(
-                result.returncode, cmd=self.bin, stderr=None
+                result.returncode, cmd=self.bin, stderr=result.stderr
+            )
+        result.stdout = capture
+        return result
+
+    def run_and_capture(
+        self,
+        sub_command: str | None = None,
+        *args: ExecArg,
+        spill_threshold: int = DEFAULT_SPILL_THRESHOLD,
+        stdin: StdinSource | None = None,
+    ) -> InvocationResult:
+        """Blocking counterpart of `arun_and_capture`.
+
+        Args:
+            sub_command: The subcommand to run.
+            *args: The arguments to pass to the subprocess.
+            spill_threshold: Number of bytes of stdout kept in memory before it
+                is moved to a temporary file.
+            stdin: Input fed to the subprocess while its output is read, see
+                `StdinSource`. Defaults to inheriting the stdin of the extension.
+
+        Returns:
+            The result of the invocation, with a `CapturedOutput` as stdout.
+        """
+        return _run_coroutine(
+            self.arun_and_capture(
+                sub_command, *args, spill_threshold=spill_threshold, stdin=stdin
+            ),
+            self.loop_factory,
+        )
+
+
+class InvokerPool:
+    """Run many invocations concurrently on a single event loop."""
+
+    def __init__(
+        self,
+        max_concurrency: int | None = None,
+        loop_factory: LoopFactory | None = None,
+    ) -> None:
+        """Create a new pool.
+
+        Args:
+            max_concurrency: Maximum number of subprocesses running at the same
+                time, defaults to the number of CPUs.
+            loop_factory: Factory for the event loop used by `run_and_log`,
+                defaults to the asyncio event loop.
+        """
+        self.max_concurrency = max_concurrency or os.cpu_count() or 1
+        self.loop_factory = loop_factory
+        self._pending: list[tuple[str, Invoker, str | None, tuple[ExecArg, ...]]] = []
+        # Numbers the invocations across batches, so that default ids are unique.
+        self._submitted = itertools.count()
+
+    def submit(
+        self,
+        invoker: Invoker,
+        sub_command: str | None = None,
+        *args: ExecArg,
+        invocation_id: str | None = None,
+    ) -> str:
+        """Queue an invocation to be run by `run_and_log`.
+
+        Args:
+            invoker: The invoker to run the subprocess with.
+            sub_command: The subcommand to run.
+            *args: The arguments to pass to the subprocess.
+            invocation_id: Id to tag the invocation's log lines with, defaults to
+                the name of the binary and the number of invocations submitted to
+                the pool before it.
+
+        Returns:
+            The id of the invocation.
+        """
+        number = next(self._submitted)
+        if invocation_id is None:
+            invocation_id = f"{os.path.basename(invoker.bin)}-{number}"
+        self._pending.append((invocation_id, invoker, sub_command, args))
+        return invocation_id
+
+    async def _run_one(
+        self,
+        semaphore: asyncio.Semaphore,
+        invocation_id: str,
+        invoker: Invoker,
+        sub_command: str | None,
+        args: tuple[ExecArg, ...],
+    ) -> InvocationResult:
+        async with semaphore:
+            result = await invoker._exec(
+                sub_command,
+                *args,
+                logger=log.bind(invocation_id=invocation_id),
             )
+        result.invocation_id = invocation_id
+        return result
+
+    async def arun_and_log(self) -> list[InvocationResult]:
+        """Run all queued invocations, streaming their output to the logger.
+
+        Every log line is tagged with the `invocation_id` of the subprocess that
+        produced it. A failing subprocess does not stop the others, use
+        `InvocationResult.check_returncode` to turn a failure into an error.
+
+        Returns:
+            One result per queued invocation, in submission order.
+
+        Raises:
+            Exception: The first error raised while launching or draining a
+                subprocess, once all invocations have finished.
+        """
+        pending, self._pending = self._pending, []
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = await asyncio.gather(
+            *[self._run_one(semaphore, *invocation) for invocation in pending],
+            return_exceptions=True,
+        )
+        for r in results:  # raise first exception if any
+            if isinstance(r, BaseException):
+                raise r
+        return t.cast(list[InvocationResult], results)
+
+    def run_and_log(self) -> list[InvocationResult]:
+        """Blocking counterpart of `arun_and_log`.
+
+        Returns:
+            One result per queued invocation, in submission order.
+        """
+        return _run_coroutine(self.arun_and_log(), self.loop_factory)
+
+
+class PipelineError(subprocess.CalledProcessError):
+    """Raised when a stage of a `Pipeline` fails."""
+
+    def __init__(
+        self,
+        returncode: int,
+        cmd: str,
+        stderr: str | bytes | None,
+        results: list[InvocationResult],
+    ) -> None:
+        """Create a new error.
+
+        Args:
+            returncode: The exit status of the failed stage.
+            cmd: The binary of the failed stage.
+            stderr: The stderr tail of the failed stage.
+            results: The results of every stage, in order.
+        """
+        super().__init__(returncode, cmd, stderr=stderr)
+        self.results = results
+
+
+class Pipeline:
+    """Run invocations with the stdout of each connected to the stdin of the next.
+
+    Stages are connected by OS pipes handed directly to the subprocesses, as in
+    `tap | target`, so the data flowing between them never passes through the
+    extension. The stderr of every stage is logged, tagged with the stage's
+    `invocation_id`.
+    """
+
+    def __init__(self, loop_factory: LoopFactory | None = None) -> None:
+        """Create a new, empty pipeline.
+
+        Args:
+            loop_factory: Factory for the event loop used by `run_and_log`,
+                defaults to the asyncio event loop.
+        """
+        self.loop_factory = loop_factory
+        self._stages: list[tuple[str, Invoker, str | None, tuple[ExecArg, ...]]] = []
+
+    def add(
+        self,
+        invoker: Invoker,
+        sub_command: str | None = None,
+        *args: ExecArg,
+        invocation_id: str | None = None,
+    ) -> Pipeline:
+        """Append a stage reading the stdout of the previous one.
+
+        Args:
+            invoker: The invoker to run the stage with.
+            sub_command: The subcommand to run.
+            *args: The arguments to pass to the subprocess.
+            invocation_id: Id to tag the stage's log lines with, defaults to the
+                name of the binary and the position in the pipeline.
+
+        Returns:
+            The pipeline itself, to chain calls.
+        """
+        if invocation_id is None:
+            invocation_id = f"{os.path.basename(invoker.bin)}-{len(self._stages)}"
+        self._stages.append((invocation_id, invoker, sub_command, args))
+        return self
+
+    async def arun_and_log(
+        self,
+        stdout: int | t.BinaryIO | None = None,
+        stdin: StdinSource | None = None,
+    ) -> list[InvocationResult]:
+        """Run all stages concurrently until every one of them has exited.
+
+        When a stage fails, its neighbours are not stopped explicitly: the
+        upstream stages get a broken pipe and the downstream ones end of file, as
+        they would in a shell.
+
+        Args:
+            stdout: File descriptor or binary file object to forward the stdout
+                of the last stage to, by default it is logged.
+            stdin: Input fed to the first stage, see `StdinSource`.
+
+        Returns:
+            One result per stage, in order, with its exit status and timings.
+
+        Raises:
+            ValueError: If the pipeline has no stages.
+            PipelineError: If a stage failed. As with `pipefail`, the last
+                failing stage is reported, since the stages upstream of a failure
+                usually fail because of it.
+        """
+        if not self._stages:
+            raise ValueError("The pipeline has no stages.")
+
+        fd, forward_to = (None, None) if stdout is None else _stdout_target(stdout)
+        last = len(self._stages) - 1
+        # The pipe ends each stage hands to its subprocess, which it closes once
+        # the subprocess is spawned.
+        handed_over: list[list[int]] = [[] for _ in self._stages]
+        try:
+            for index in range(last):
+                read_fd, write_fd = os.pipe()
+                handed_over[index].append(write_fd)
+                handed_over[index + 1].append(read_fd)
+
+            execs = []
+            for index, (invocation_id, invoker, sub_command, args) in enumerate(
+                self._stages
+            ):
+                if index < last:
+                    stage_stdout = handed_over[index][-1]
+                else:
+                    stage_stdout = asyncio.subprocess.PIPE if fd is None else fd
+                execs.append(
+                    invoker._exec(
+                        sub_command,
+                        *args,
+                        stdin=handed_over[index][0] if index else stdin,
+                        stdout=stage_stdout,
+                        forward_to=forward_to if index == last else None,
+                        logger=log.bind(invocation_id=invocation_id),
+                        handed_over=handed_over[index],
+                    )
+                )
+
+            results = await asyncio.gather(*execs, return_exceptions=True)
+        finally:
+            # Those of the stages that failed to spawn, or never got to.
+            for fds in handed_over:
+                while fds:
+                    os.close(fds.pop())
+        for r in results:  # raise first exception if any
+            if isinstance(r, BaseException):
+                raise r
+
+        stages = t.cast(list[InvocationResult], results)
+        failed: tuple[Invoker, InvocationResult] | None = None
+        for (invocation_id, invoker, _, _), result in zip(
+            self._stages, stages, strict=True
+        ):
+            result.invocation_id = invocation_id
+            if result.returncode:
+                failed = (invoker, result)
+
+        if failed is not None:
+            invoker, result = failed
+            raise PipelineError(result.returncode, invoker.bin, result.stderr, stages)
+        return stages
+
+    def run_and_log(
+        self,
+        stdout: int | t.BinaryIO | None = None,
+        stdin: StdinSource | None = None,
+    ) -> list[InvocationResult]:
+        """Blocking counterpart of `arun_and_log`.
+
+        Args:
+            stdout: File descriptor or binary file object to forward the stdout
+                of the last stage to, by default it is logged.
+            stdin: Input fed to the first stage, see `StdinSource`.
+
+        Returns:
+            One result per stage, in order, with its exit status and timings.
+        """
+        return _run_coroutine(self.arun_and_log(stdout, stdin), self.loop_factory)
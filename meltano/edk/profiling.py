@@ -0,0 +1,208 @@
+"""Opt-in profiling of the extension lifecycle.
+
+Profiling is enabled without changing the extension, through the
+MELTANO_EDK_PROFILE env var read by `pass_through_logging_config` (or the
+`--profile` option of extensions generated from the template):
+
+- `timings` logs how long each phase of the invocation took, and how much time
+  was spent outside of them, e.g. in imports and in the EDK itself.
+- `cprofile` additionally runs the whole process under `cProfile` and dumps the
+  profile to a file in MELTANO_EDK_PROFILE_DIR, the temporary directory by
+  default, which can be inspected with `pstats` or `snakeviz`.
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextlib
+import os
+import sys
+import tempfile
+import time
+import typing as t
+from enum import Enum
+
+if t.TYPE_CHECKING:
+    import cProfile
+
+    import structlog
+
+PROFILE_ENV = "MELTANO_EDK_PROFILE"
+PROFILE_DIR_ENV = "MELTANO_EDK_PROFILE_DIR"
+
+
+class ProfileMode(str, Enum):
+    """What is recorded about an invocation."""
+
+    off = "off"
+    timings = "timings"
+    cprofile = "cprofile"
+
+
+class Profiler:
+    """Records the phases of an extension invocation, and optionally a profile."""
+
+    def __init__(
+        self,
+        mode: ProfileMode = ProfileMode.timings,
+        directory: str | None = None,
+    ) -> None:
+        """Start profiling the current process.
+
+        Args:
+            mode: What to record, see `ProfileMode`.
+            directory: Directory the cProfile output is written to, defaults to
+                the temporary directory.
+        """
+        self.mode = mode
+        self.directory = directory or tempfile.gettempdir()
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self.profile_path: str | None = None
+        self._finished = False
+        self._profile: cProfile.Profile | None = None
+        if mode == ProfileMode.cprofile:
+            import cProfile
+
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> t.Iterator[None]:
+        """Time a phase of the invocation.
+
+        Args:
+            name: The name of the phase, time spent in phases with the same name
+                adds up.
+
+        Yields:
+            None
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def finish(self, logger: structlog.BoundLogger | None = None) -> None:
+        """Stop profiling, dump the profile if any and log the timings.
+
+        Only the first call has an effect, later ones are ignored.
+
+        Args:
+            logger: The logger to emit the timings to, defaults to a new one.
+        """
+        if self._finished:
+            return
+        self._finished = True
+        if logger is None:
+            logger = _get_logger()
+
+        if self._profile is not None:
+            self._profile.disable()
+            os.makedirs(self.directory, exist_ok=True)
+            program = os.path.basename(sys.argv[0]) or "extension"
+            self.profile_path = os.path.join(
+                self.directory, f"{program}-{os.getpid()}-{int(time.time())}.prof"
+            )
+            self._profile.dump_stats(self.profile_path)
+            self._profile = None
+
+        total = time.perf_counter() - self.started
+        logger.info(
+            "extension profile",
+            phases={name: round(elapsed, 6) for name, elapsed in self.phases.items()},
+            outside_phases=round(total - sum(self.phases.values()), 6),
+            total=round(total, 6),
+            profile_path=self.profile_path,
+        )
+
+
+_profiler: Profiler | None = None
+
+
+def _get_logger() -> structlog.BoundLogger:
+    # Imported on demand, the extension module imports this one and must stay
+    # cheap to import when profiling is disabled.
+    import structlog
+
+    return structlog.get_logger()
+
+
+def configure_profiling(
+    mode: ProfileMode | str = ProfileMode.timings,
+    directory: str | None = None,
+) -> Profiler | None:
+    """Enable profiling for the rest of the process.
+
+    The profile is finished when the pass-through invoker returns, or when the
+    process exits for other commands. Calling this again once profiling is
+    enabled returns the active profiler.
+
+    Args:
+        mode: What to record, see `ProfileMode`.
+        directory: Directory the cProfile output is written to, defaults to the
+            temporary directory.
+
+    Returns:
+        The active profiler, or None if the mode is `off`.
+    """
+    global _profiler
+
+    mode = ProfileMode(mode)
+    if mode == ProfileMode.off or _profiler is not None:
+        return _profiler
+    _profiler = Profiler(mode, directory)
+    atexit.register(_profiler.finish)
+    return _profiler
+
+
+def profiling_from_env() -> Profiler | None:
+    """Enable profiling according to the MELTANO_EDK_PROFILE* env vars.
+
+    MELTANO_EDK_PROFILE is one of `off`, `timings` or `cprofile`, boolean values
+    being accepted as `off` and `timings`. Profiling stays disabled, with a
+    warning, for any other value.
+
+    Returns:
+        The active profiler, or None if profiling is not enabled.
+    """
+    mode = os.environ.get(PROFILE_ENV, "").strip().lower()
+    if mode in {"", "0", "false", "no"}:
+        return _profiler
+    if mode in {"1", "true", "yes"}:
+        mode = ProfileMode.timings
+    elif mode not in ProfileMode.__members__:
+        _get_logger().warning(
+            "invalid profiling mode, profiling disabled",
+            env_var=PROFILE_ENV,
+            value=mode,
+            valid=list(ProfileMode.__members__),
+        )
+        return _profiler
+    return configure_profiling(mode, os.environ.get(PROFILE_DIR_ENV))
+
+
+def get_profiler() -> Profiler | None:
+    """Return the active profiler.
+
+    Returns:
+        The active profiler, or None if profiling is not enabled.
+    """
+    return _profiler
+
+
+def phase(name: str) -> t.ContextManager[None]:
+    """Time a phase of the invocation, if profiling is enabled.
+
+    Args:
+        name: The name of the phase.
+
+    Returns:
+        A context manager timing the phase, which does nothing when profiling
+        is disabled.
+    """
+    if _profiler is None:
+        return contextlib.nullcontext()
+    return _profiler.phase(name)
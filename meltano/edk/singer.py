@@ -0,0 +1,144 @@
+"""Classification of Singer messages written to the stdout of a subprocess."""
+
+from __future__ import annotations
+
+import re
+import time
+import typing as t
+from collections import Counter
+
+import structlog
+
+from meltano.edk.logging import _loads
+
+# Singer messages are almost always serialized with "type" as their first key,
+# which lets us classify them without parsing.
+_TYPE_PREFIX = re.compile(rb'\{\s*"type"\s*:\s*"([A-Z_]+)"')
+_STREAM = re.compile(rb'"stream"\s*:\s*"([^"\\]*)"')
+# How far into a message we look for the stream name before parsing it.
+_STREAM_SEARCH_WINDOW = 512
+
+SINGER_MESSAGE_TYPES = frozenset(
+    {"RECORD", "SCHEMA", "STATE", "ACTIVATE_VERSION", "BATCH"}
+)
+
+
+class SingerClassifier:
+    """Summarize a Singer message stream instead of logging every message.
+
+    SCHEMA and STATE messages are logged as structured events, RECORD messages
+    are only counted per stream, with a rate summary logged every
+    `summary_interval` seconds and once more when the stream ends. Lines that
+    are not Singer messages are logged as-is.
+
+    Pass the class, or a `functools.partial` of it, as the `stdout_classifier`
+    of an `Invoker` so that every invocation gets its own counters.
+    """
+
+    def __init__(self, summary_interval: float = 10.0) -> None:
+        """Create a new classifier.
+
+        Args:
+            summary_interval: Seconds between two RECORD rate summaries.
+        """
+        self.summary_interval = summary_interval
+        self.message_counts: Counter[str] = Counter()
+        self.record_counts: Counter[str] = Counter()
+        self._started = time.monotonic()
+        self._last_summary = self._started
+        self._records_at_last_summary = 0
+
+    def _classify(self, line: bytes) -> tuple[str | None, str | None, t.Any]:
+        """Determine the message type and stream of a line.
+
+        Args:
+            line: The raw line.
+
+        Returns:
+            The message type, the stream and the parsed message. The type is None
+            if the line is not a Singer message, the message is None if it did
+            not need to be parsed.
+        """
+        match = _TYPE_PREFIX.match(line)
+        if match:
+            message_type = match.group(1).decode()
+            if message_type == "RECORD":
+                stream = _STREAM.search(line, 0, _STREAM_SEARCH_WINDOW)
+                if stream:
+                    return message_type, stream.group(1).decode(), None
+        elif not line.startswith(b"{"):
+            return None, None, None
+
+        try:
+            message = _loads(line)
+        except ValueError:
+            return None, None, None
+        if not isinstance(message, dict):
+            return None, None, None
+
+        message_type = message.get("type")
+        if message_type not in SINGER_MESSAGE_TYPES:
+            return None, None, None
+        return message_type, message.get("stream"), message
+
+    def feed(self, lines: list[bytes], logger: structlog.BoundLogger) -> None:
+        """Classify a batch of lines.
+
+        Args:
+            lines: The raw lines, without their line terminators.
+            logger: The logger to emit events to.
+        """
+        for line in lines:
+            message_type, stream, message = self._classify(line)
+            if message_type is None:
+                logger.info(line.decode("utf-8", errors="replace").rstrip())
+                continue
+
+            self.message_counts[message_type] += 1
+            if message_type == "RECORD":
+                self.record_counts[stream or ""] += 1
+            elif message_type == "SCHEMA":
+                logger.info(
+                    "singer schema",
+                    stream=stream,
+                    key_properties=message.get("key_properties"),
+                )
+            elif message_type == "STATE":
+                logger.info("singer state", value=message.get("value"))
+            else:
+                logger.debug("singer message", type=message_type, stream=stream)
+
+        now = time.monotonic()
+        if now - self._last_summary >= self.summary_interval:
+            self._log_summary(logger, now)
+
+    def close(self, logger: structlog.BoundLogger) -> None:
+        """Log the final summary once the stream has ended.
+
+        Args:
+            logger: The logger to emit events to.
+        """
+        self._log_summary(logger, time.monotonic(), final=True)
+
+    def _log_summary(
+        self,
+        logger: structlog.BoundLogger,
+        now: float,
+        final: bool = False,
+    ) -> None:
+        records = self.message_counts["RECORD"]
+        if final:
+            elapsed = now - self._started
+            new_records = records
+        else:
+            elapsed = now - self._last_summary
+            new_records = records - self._records_at_last_summary
+
+        logger.info(
+            "singer summary" if final else "singer records",
+            records=dict(self.record_counts),
+            messages=dict(self.message_counts),
+            records_per_second=round(new_records / elapsed, 1) if elapsed else None,
+        )
+        self._last_summary = now
+        self._records_at_last_summary = records
@@ -0,0 +1,378 @@
+"""Persistent workers keeping an expensive-to-start CLI warm across invocations.
+
+A `Worker` keeps a child process alive and sends it one command per call over
+its stdin, reading the result back from its stdout, as newline delimited JSON:
+
+    request:  {"args": ["arg1", "arg2"]}
+    response: {"returncode": 0, "stdout": "...", "stderr": "..."}
+
+Python CLIs can be served without any change by running this module in the
+child, which imports the CLI once and calls its console script entry point for
+every request, with `sys.argv` set to the arguments of the request:
+
+    python -m meltano.edk.worker package.module:main
+"""
+
+from __future__ import annotations
+
+import contextlib
+import importlib
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import traceback
+import typing as t
+
+import structlog
+
+from meltano.edk.process import (
+    DEFAULT_TAIL_BYTES,
+    DEFAULT_TAIL_LINES,
+    InvocationResult,
+    OutputTail,
+)
+from meltano.edk.types import ExecArg
+
+log = structlog.get_logger()
+
+# Time, in seconds, a worker is given to exit on its own once its stdin is closed.
+DEFAULT_SHUTDOWN_TIMEOUT = 5.0
+
+
+class WorkerCrashedError(subprocess.SubprocessError):
+    """Raised when a worker exits while a command is in flight."""
+
+    def __init__(self, cmd: str, returncode: int | None, stderr: str) -> None:
+        """Create a new error.
+
+        Args:
+            cmd: The command the worker was started with.
+            returncode: The exit status of the worker.
+            stderr: The last lines the worker wrote to stderr.
+        """
+        super().__init__(cmd, returncode, stderr)
+        self.cmd = cmd
+        self.returncode = returncode
+        self.stderr = stderr
+
+    def __str__(self) -> str:
+        """Describe the crash.
+
+        Returns:
+            The error message.
+        """
+        return f"Worker '{self.cmd}' exited with status {self.returncode}."
+
+
+class Worker:
+    """A warm child process serving commands over its stdin and stdout.
+
+    The child is started on the first call and reused by the following ones,
+    so its startup cost is only paid once. When it exits while a command is in
+    flight, a `WorkerCrashedError` is raised for that command and a new child is
+    started on the next call, up to `max_restarts` times. Commands are never
+    retried, as they may have had side effects.
+
+    Calls are serialized, use one worker per concurrent caller.
+    """
+
+    def __init__(
+        self,
+        bin: str,
+        *args: ExecArg,
+        cwd: str | None = None,
+        env: dict[str, t.Any] | None = None,
+        max_restarts: int = 3,
+        shutdown_timeout: float = DEFAULT_SHUTDOWN_TIMEOUT,
+    ) -> None:
+        """Create a new worker, without starting it.
+
+        Args:
+            bin: The path/name of the binary to run.
+            *args: The arguments to start the worker with.
+            cwd: The working directory to run from.
+            env: Env to use when calling Popen, defaults to current os.environ if None.
+            max_restarts: Number of times the worker is restarted after crashing
+                before giving up.
+            shutdown_timeout: Seconds the worker is given to exit once closed,
+                before it is killed.
+        """
+        self.bin = bin
+        self.args = args
+        self.cwd = cwd
+        self.popen_env = env or os.environ.copy()
+        self.max_restarts = max_restarts
+        self.shutdown_timeout = shutdown_timeout
+        self.restarts = 0
+        self._returncode: int | None = None
+        self._process: subprocess.Popen[bytes] | None = None
+        self._stderr_tail = OutputTail(DEFAULT_TAIL_LINES, DEFAULT_TAIL_BYTES)
+        self._stderr_thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def python_entry_point(
+        cls,
+        entry_point: str,
+        python: str = sys.executable,
+        **kwargs: t.Any,
+    ) -> Worker:
+        """Create a worker serving the entry point of a Python CLI.
+
+        Args:
+            entry_point: The console script entry point of the CLI, as
+                `package.module:function`.
+            python: The interpreter to run the worker with, it must be able to
+                import both the CLI and the EDK.
+            **kwargs: Additional keyword arguments to pass to the constructor.
+
+        Returns:
+            The worker.
+        """
+        return cls(python, "-m", "meltano.edk.worker", entry_point, **kwargs)
+
+    def __enter__(self) -> Worker:
+        """Use the worker as a context manager.
+
+        Returns:
+            The worker itself.
+        """
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Stop the worker when leaving the context.
+
+        Args:
+            exc_info: The exception raised in the context, if any.
+        """
+        self.close()
+
+    @property
+    def running(self) -> bool:
+        """Whether the child process is alive."""
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> None:
+        """Start the child process if it is not running yet.
+
+        Raises:
+            WorkerCrashedError: If the worker crashed more than `max_restarts`
+                times already.
+        """
+        if self.running:
+            return
+        if self._process is not None:
+            # The worker exited while idle.
+            self._crashed(self._process)
+        if self.restarts > self.max_restarts:
+            raise WorkerCrashedError(self.bin, self._returncode, self._tail())
+
+        self._process = subprocess.Popen(
+            [self.bin, *self.args],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=self.cwd,
+            env=self.popen_env,
+        )
+        self._stderr_tail = OutputTail(DEFAULT_TAIL_LINES, DEFAULT_TAIL_BYTES)
+        self._stderr_thread = threading.Thread(
+            target=self._log_stderr,
+            args=(self._process.stderr, self._stderr_tail),
+            daemon=True,
+        )
+        self._stderr_thread.start()
+
+    def _log_stderr(self, stderr: t.BinaryIO, tail: OutputTail) -> None:
+        """Log what the child process writes to stderr outside of commands.
+
+        Args:
+            stderr: The stderr of the child process.
+            tail: Buffer to keep the last lines of stderr in.
+        """
+        for raw in stderr:
+            line = raw.rstrip(b"\r\n")
+            tail.extend([line])
+            log.info(line.decode("utf-8", errors="replace"), cmd=self.bin)
+
+    def _tail(self) -> str:
+        if self._stderr_thread is not None:
+            self._stderr_thread.join(timeout=1)
+        return self._stderr_tail.text()
+
+    def run(self, *args: ExecArg, check: bool = True) -> InvocationResult:
+        """Run a command on the worker, starting it if needed.
+
+        Args:
+            *args: The arguments of the command.
+            check: If true, raise a `CalledProcessError` when the command fails.
+
+        Returns:
+            The result of the command, with its output as text.
+
+        Raises:
+            CalledProcessError: If the command failed and check is true.
+            WorkerCrashedError: If the worker exited before answering.
+        """
+        request = json.dumps(
+            {"args": [os.fsdecode(arg) for arg in args]}, separators=(",", ":")
+        ).encode()
+
+        with self._lock:
+            self.start()
+            process = t.cast("subprocess.Popen[bytes]", self._process)
+            stdin = t.cast(t.IO[bytes], process.stdin)
+            try:
+                stdin.write(request + b"\n")
+                stdin.flush()
+                response = t.cast(t.IO[bytes], process.stdout).readline()
+            except (BrokenPipeError, ConnectionResetError):
+                response = b""
+            if not response:
+                raise self._crashed(process)
+
+        message = json.loads(response)
+        result = InvocationResult(
+            [self.bin, *self.args, *args],
+            message["returncode"],
+            stdout=message["stdout"],
+            stderr=message["stderr"],
+        )
+        if check:
+            result.check_returncode()
+        return result
+
+    def _crashed(self, process: subprocess.Popen[bytes]) -> WorkerCrashedError:
+        """Record a crash of the worker, so that it is restarted on the next call.
+
+        Args:
+            process: The child process that exited.
+
+        Returns:
+            The error to raise for the command in flight.
+        """
+        returncode = self._returncode = process.wait()
+        for pipe in (process.stdin, process.stdout):
+            with contextlib.suppress(BrokenPipeError):
+                t.cast(t.IO[bytes], pipe).close()
+        self._process = None
+        self.restarts += 1
+        error = WorkerCrashedError(self.bin, returncode, self._tail())
+        log.warning(
+            "worker crashed",
+            cmd=self.bin,
+            returncode=returncode,
+            restarts=self.restarts,
+        )
+        return error
+
+    def close(self) -> None:
+        """Stop the child process, killing it if it does not exit in time."""
+        with self._lock:
+            process, self._process = self._process, None
+            if process is None:
+                return
+            with contextlib.suppress(BrokenPipeError):
+                t.cast(t.IO[bytes], process.stdin).close()
+            try:
+                process.wait(self.shutdown_timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            t.cast(t.IO[bytes], process.stdout).close()
+            if self._stderr_thread is not None:
+                self._stderr_thread.join()
+
+
+def _call(main: t.Callable[[], t.Any], args: list[str]) -> int:
+    """Call an entry point the way a console script would.
+
+    Args:
+        main: The entry point.
+        args: The command line arguments to call it with.
+
+    Returns:
+        The exit status.
+    """
+    argv = sys.argv
+    sys.argv = [argv[0], *args]
+    try:
+        code = main()
+    except SystemExit as exit:
+        code = exit.code
+    except Exception:
+        traceback.print_exc()
+        return 1
+    finally:
+        sys.argv = argv
+    if code is None or isinstance(code, int):
+        return code or 0
+    print(code, file=sys.stderr)
+    return 1
+
+
+def serve(
+    main: t.Callable[[], t.Any],
+    stdin: t.IO[str] | None = None,
+) -> None:
+    """Serve commands read from stdin until it is closed.
+
+    Every command calls `main` with `sys.argv` set to its arguments, and with
+    `sys.stdout` and `sys.stderr` captured into the response. The process' own
+    stdout is kept for the responses: anything written to file descriptor 1
+    directly, e.g. by a subprocess, ends up on stderr instead.
+
+    Args:
+        main: The entry point to call for every command.
+        stdin: Stream to read the commands from, defaults to sys.stdin.
+    """
+    stdin = stdin or sys.stdin
+    responses = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    for line in stdin:
+        request = json.loads(line)
+        out, err = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            returncode = _call(main, request["args"])
+        json.dump(
+            {
+                "returncode": returncode,
+                "stdout": out.getvalue(),
+                "stderr": err.getvalue(),
+            },
+            responses,
+            separators=(",", ":"),
+        )
+        responses.write("\n")
+        responses.flush()
+
+
+def _load_entry_point(entry_point: str) -> t.Callable[[], t.Any]:
+    """Import the function an entry point refers to.
+
+    Args:
+        entry_point: The entry point, as `package.module:function`.
+
+    Returns:
+        The function.
+    """
+    module_name, _, attr = entry_point.partition(":")
+    target: t.Any = importlib.import_module(module_name)
+    for name in (attr or "main").split("."):
+        target = getattr(target, name)
+    return t.cast(t.Callable[[], t.Any], target)
+
+
+def main() -> None:
+    """Serve the Python entry point given as the first command line argument."""
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m meltano.edk.worker package.module:function")
+    serve(_load_entry_point(sys.argv[1]))
+
+
+if __name__ == "__main__":
+    main()
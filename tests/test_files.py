@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from meltano.edk.files import MATERIALIZE_MANIFEST, FileMaterializer, materialize
+
+
+def _age(path: Path) -> int:
+    """Move the mtime of a file to the past, so that rewrites are detectable."""
+    mtime_ns = path.stat().st_mtime_ns - 10**10
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    return mtime_ns
+
+
+def test_unchanged_files_are_not_rewritten(tmp_path: Path):
+    materialize(tmp_path, {"profiles.yml": "a: 1\n", "sub/dir/b.txt": b"b"})
+    mtime_ns = _age(tmp_path / "profiles.yml")
+
+    with FileMaterializer(tmp_path) as files:
+        assert not files.write("profiles.yml", "a: 1\n")
+        assert files.write("sub/dir/b.txt", b"changed")
+    assert (tmp_path / "profiles.yml").stat().st_mtime_ns == mtime_ns
+    assert (tmp_path / "sub/dir/b.txt").read_bytes() == b"changed"
+    assert files.unchanged == ["profiles.yml"]
+    assert files.written == ["sub/dir/b.txt"]
+
+
+def test_external_edits_are_detected(tmp_path: Path):
+    materialize(tmp_path, {"a.txt": "generated"})
+    (tmp_path / "a.txt").write_text("edited by hand")
+
+    assert materialize(tmp_path, {"a.txt": "generated"}).written == ["a.txt"]
+    assert (tmp_path / "a.txt").read_text() == "generated"
+
+
+def test_force_rewrites_everything(tmp_path: Path):
+    materialize(tmp_path, {"a.txt": "a"})
+    mtime_ns = _age(tmp_path / "a.txt")
+
+    assert materialize(tmp_path, {"a.txt": "a"}, force=True).written == ["a.txt"]
+    assert (tmp_path / "a.txt").stat().st_mtime_ns != mtime_ns
+
+
+def test_stale_files_are_removed(tmp_path: Path):
+    materialize(tmp_path, {"a.txt": "a", "b.txt": "b"})
+    (tmp_path / "unmanaged.txt").write_text("keep")
+
+    assert materialize(tmp_path, {"a.txt": "a"}).removed == ["b.txt"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        MATERIALIZE_MANIFEST,
+        "a.txt",
+        "unmanaged.txt",
+    ]
+    manifest = json.loads((tmp_path / MATERIALIZE_MANIFEST).read_text())
+    assert list(manifest["files"]) == ["a.txt"]
+
+
+def test_nothing_is_removed_on_error(tmp_path: Path):
+    materialize(tmp_path, {"a.txt": "a", "b.txt": "b"})
+
+    with pytest.raises(RuntimeError), FileMaterializer(tmp_path) as files:
+        files.write("a.txt", "changed")
+        raise RuntimeError
+    assert (tmp_path / "b.txt").exists()
+    assert materialize(tmp_path, {"a.txt": "changed"}).removed == ["b.txt"]
+
+
+def test_mode_is_preserved(tmp_path: Path):
+    materialize(tmp_path, {"run.sh": "#!/bin/sh\n"})
+    (tmp_path / "run.sh").chmod(0o750)
+
+    materialize(tmp_path, {"run.sh": "#!/bin/sh\ntrue\n"})
+    assert (tmp_path / "run.sh").stat().st_mode & 0o777 == 0o750
+
+
+def test_paths_outside_of_root_are_rejected(tmp_path: Path):
+    with pytest.raises(ValueError, match="outside"):
+        FileMaterializer(tmp_path / "root").write("../escape.txt", "x")
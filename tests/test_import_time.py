@@ -0,0 +1,48 @@
+"""Guard the cold start cost of the modules used on the invoke path.
+
+Only which modules get imported is checked here, the import timings are
+measured by the `import_*` cases of `benchmarks/suite.py`.
+"""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+
+# Modules imported by the pass-through shim and the extension it instantiates.
+INVOKE_PATH = ("meltano.edk.extension", "meltano.edk.logging", "meltano.edk.process")
+
+# Dependencies only needed to describe an extension.
+DESCRIBE_ONLY = ("yaml", "devtools")
+
+# Dependencies the extension module must not import, as the CLI of an extension
+# imports it on every invocation, before logging is even configured.
+EXTENSION_LAZY = (*DESCRIBE_ONLY, "structlog")
+
+
+def _imported(*modules: str) -> set[str]:
+    """Import modules in a fresh interpreter.
+
+    Returns:
+        The top-level names of every module that ended up in `sys.modules`.
+    """
+    code = "; ".join(f"import {module}" for module in modules)
+    p = subprocess.run(
+        [sys.executable, "-c", f"import sys; {code}; print(*sys.modules)"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {name.split(".")[0] for name in p.stdout.split()}
+
+
+def test_package_import():
+    assert not _imported("meltano.edk") & set(EXTENSION_LAZY)
+
+
+def test_invoke_path_skips_describe_dependencies():
+    assert not _imported(*INVOKE_PATH) & set(DESCRIBE_ONLY)
+
+
+def test_extension_import():
+    assert not _imported("meltano.edk.extension") & set(EXTENSION_LAZY)
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+import structlog
+from structlog.testing import capture_logs
+
+from meltano.edk.logging import RateLimiter
+
+SCRIPT = """
+import structlog
+from meltano.edk.logging import pass_through_logging_config
+
+pass_through_logging_config()
+log = structlog.get_logger()
+for n in range(1000):
+    log.info("line", n=n)
+log.debug("hidden")
+"""
+
+
+def test_background_logging_flushes_at_exit():
+    env = {**os.environ, "LOG_BACKGROUND": "true", "LOG_QUEUE_SIZE": "10"}
+    p = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    )
+    lines = p.stderr.splitlines()
+    assert len(lines) == 1000
+    assert lines[0].startswith("line") and lines[0].endswith("n=0")
+    assert lines[-1].endswith("n=999")
+
+
+INVOKER_SCRIPT = """
+import sys
+from meltano.edk.logging import pass_through_logging_config
+from meltano.edk.process import Invoker
+
+pass_through_logging_config()
+Invoker(sys.executable).run_and_log("-c", "print('hello')")
+"""
+
+
+def test_subprocess_lines_rendering():
+    def stderr(**env: str) -> str:
+        return subprocess.run(
+            [sys.executable, "-c", INVOKER_SCRIPT],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={**os.environ, **env},
+        ).stderr
+
+    # Lines are only tagged with their stream when they are rate limited by it.
+    assert stderr() == "hello\n"
+    assert "stdio_stream=stdout" in stderr(LOG_RATE_LIMIT="100")
+
+
+def test_background_logging_closed_stderr():
+    env = {
+        **os.environ,
+        "MELTANO_LOG_JSON": "true",
+        "LOG_FAST_JSON": "true",
+        "LOG_BACKGROUND": "true",
+        "LOG_QUEUE_SIZE": "10",
+    }
+    p = subprocess.Popen(
+        [sys.executable, "-c", SCRIPT], stderr=subprocess.PIPE, env=env
+    )
+    assert p.stderr is not None
+    p.stderr.close()
+    # The extension exits instead of blocking on the full queue.
+    assert p.wait(timeout=30) is not None
+
+
+@pytest.mark.parametrize("background", ["false", "true"])
+def test_fast_json_logging(background: str):
+    env = {
+        **os.environ,
+        "MELTANO_LOG_JSON": "true",
+        "LOG_FAST_JSON": "true",
+        "LOG_LEVELS": "true",
+        "LOG_BACKGROUND": background,
+    }
+    p = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    )
+    events = [json.loads(line) for line in p.stderr.splitlines()]
+    assert len(events) == 1000
+    assert events[0] == {"event": "line", "n": 0, "level": "info"}
+    assert events[-1]["n"] == 999
+
+
+def _apply(limiter: RateLimiter, method_name: str, event_dict: dict) -> dict | None:
+    try:
+        return dict(limiter(None, method_name, event_dict))
+    except structlog.DropEvent:
+        return None
+
+
+def test_rate_limiter_sampling():
+    limiter = RateLimiter(sample_every=3, summary_interval=0)
+    passed = [
+        _apply(limiter, "info", {"event": n, "stdio_stream": "x"}) for n in range(7)
+    ]
+    summary = {"event": "1 lines suppressed", "suppressed": 1, "stdio_stream": "x"}
+    assert passed == [
+        {"event": 0, "stdio_stream": "x"},
+        summary,
+        summary,
+        {"event": 3, "stdio_stream": "x"},
+        summary,
+        summary,
+        {"event": 6, "stdio_stream": "x"},
+    ]
+
+    limiter = RateLimiter(sample_every=3, summary_interval=3600)
+    passed = [
+        _apply(limiter, "info", {"event": n, "stdio_stream": "x"}) for n in range(4)
+    ]
+    assert [event and event["event"] for event in passed] == [0, None, None, 3]
+
+
+def test_rate_limiter_token_bucket():
+    limiter = RateLimiter(rate=0.001, burst=2, summary_interval=3600)
+    methods = ("info", "info", "info", "warning", "debug", "error")
+    outcomes = [
+        _apply(limiter, m, {"event": "x", "stdio_stream": "x"}) is not None
+        for m in methods
+    ]
+    assert outcomes == [True, True, False, True, False, True]
+
+
+def test_rate_limiter_only_limits_streams():
+    limiter = RateLimiter(rate=0.001, burst=1, summary_interval=3600)
+    stderr = {"event": "line", "stdio_stream": "stderr"}
+    assert _apply(limiter, "info", dict(stderr)) is not None
+    assert _apply(limiter, "info", dict(stderr)) is None
+    assert _apply(limiter, "info", dict(stderr)) is None
+    # The extension's own events are not limited.
+    assert _apply(limiter, "info", {"event": "sync finished"}) is not None
+
+    with capture_logs() as logs:
+        limiter.flush()
+    assert logs == [
+        {
+            "event": "2 lines suppressed",
+            "suppressed": 2,
+            "stdio_stream": "stderr",
+            "log_level": "info",
+        }
+    ]
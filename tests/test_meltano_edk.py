@@ -1,12 +1,25 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
 import json
+import os
+from pathlib import Path
+from unittest.mock import patch
 
+import pytest
 import structlog
 import yaml
+from structlog.testing import capture_logs
 
 from meltano.edk import models
-from meltano.edk.extension import DescribeFormat, ExtensionBase
+from meltano.edk.extension import (
+    DESCRIBE_MANIFEST,
+    AsyncExtensionBase,
+    DescribeFormat,
+    ExtensionBase,
+    load_describe_manifest,
+)
 from meltano.edk.types import ExecArg
 
 
@@ -96,3 +109,124 @@ def test_pass_through():
         (None, ("test",)),
         (None, ("post", "test")),
     ]
+
+
+def test_describe_manifest(tmp_path: Path):
+    test = CustomExtension()
+    path = tmp_path / DESCRIBE_MANIFEST
+    assert load_describe_manifest(path, "1.0") is None
+
+    test.write_describe_manifest(path, "1.0")
+    formats = load_describe_manifest(path, "1.0")
+    assert formats == {
+        fmt.value: test.describe_formatted(fmt) for fmt in DescribeFormat
+    }
+    assert load_describe_manifest(path, "1.1") is None
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_describe_manifest_sources(tmp_path: Path):
+    test = CustomExtension()
+    package = tmp_path / "package"
+    package.mkdir()
+    source = package / "extension.py"
+    source.write_text("old")
+    path = tmp_path / DESCRIBE_MANIFEST
+
+    test.write_describe_manifest(path, "1.0", [package])
+    assert load_describe_manifest(path, "1.0", [package]) is not None
+
+    # An editable install keeps its version when its code changes.
+    source.write_text("new code")
+    assert load_describe_manifest(path, "1.0", [package]) is None
+
+
+def test_describe_manifest_file(tmp_path: Path):
+    path = tmp_path / DESCRIBE_MANIFEST
+    CustomExtension().write_describe_manifest(path, "1.0")
+    umask = os.umask(0)
+    os.umask(umask)
+    assert path.stat().st_mode & 0o777 == 0o666 & ~umask
+
+    path.write_text(json.dumps({"version": "1.0", "formats": ["text"]}))
+    assert load_describe_manifest(path, "1.0") is None
+
+
+class AsyncCustomExtension(AsyncExtensionBase):
+    def __init__(self) -> None:
+        super().__init__()
+        self.loops: set[asyncio.AbstractEventLoop] = set()
+        self.history: list[str] = []
+
+    async def apre_invoke(
+        self, invoke_name: str | None, *command_args: ExecArg
+    ) -> None:
+        self.loops.add(asyncio.get_running_loop())
+        self.prepared = asyncio.create_task(self._prepare())
+        self.history.append("pre")
+
+    async def _prepare(self) -> str:
+        await asyncio.sleep(0)
+        self.history.append("prepared")
+        return "config"
+
+    async def ainvoke(self, command_name: str | None, *command_args: ExecArg) -> None:
+        self.loops.add(asyncio.get_running_loop())
+        self.history.append("invoke started")
+        if command_args == ("fail",):
+            raise RuntimeError("boom")
+        self.history.append(await self.prepared)
+
+    async def apost_invoke(
+        self, invoked_name: str | None, *command_args: ExecArg
+    ) -> None:
+        self.loops.add(asyncio.get_running_loop())
+        self.history.append("post")
+
+    def describe(self) -> models.Describe:
+        return models.Describe(commands=[])
+
+
+def test_async_pass_through_invoker():
+    ext = AsyncCustomExtension()
+    ext.pass_through_invoker(structlog.get_logger(), "arg")
+    assert ext.history == ["pre", "invoke started", "prepared", "config", "post"]
+    assert len(ext.loops) == 1
+
+
+def test_async_pass_through_invoker_failure():
+    ext = AsyncCustomExtension()
+    with capture_logs() as logs, pytest.raises(SystemExit):
+        ext.pass_through_invoker(structlog.get_logger(), "fail")
+    assert logs[-1]["event"] == (
+        "invoke failed with uncaught exception, please report to maintainer"
+    )
+    assert "post" not in ext.history
+
+
+def test_async_sync_hooks():
+    ext = AsyncCustomExtension()
+    ext.pre_invoke(None)
+    # The task started by pre_invoke carries on in invoke.
+    ext.invoke(None)
+    ext.post_invoke(None)
+    assert sorted(ext.history[1:3]) == ["invoke started", "prepared"]
+    assert ext.history[0] == "pre"
+    assert ext.history[3:] == ["config", "post"]
+    assert len(ext.loops) == 1
+
+    loop = ext.loops.pop()
+    ext.close_loop()
+    assert loop.is_closed()
+
+
+def test_async_close_loop_registered_once():
+    ext = AsyncCustomExtension()
+    with patch.object(atexit, "register") as register:
+        ext.pre_invoke(None)
+        ext.close_loop()
+        # A new loop is created, but is closed by the same exit handler.
+        ext.pre_invoke(None)
+        ext.close_loop()
+    register.assert_called_once_with(ext.close_loop)
+    assert len(ext.loops) == 2
@@ -1,10 +1,34 @@
 import asyncio
+import gzip
+import io
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
 import typing as t
+from pathlib import Path
 from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
+from structlog.testing import capture_logs
 
-from meltano.edk.process import Invoker
+from meltano.edk.process import (
+    CallbackSink,
+    CapturedOutput,
+    FileSink,
+    Invoker,
+    InvokerPool,
+    LoggerSink,
+    LongLinePolicy,
+    OutputTail,
+    Pipeline,
+    PipelineError,
+    ResourceLimits,
+    StreamStats,
+    log_subprocess_error,
+)
 
 
 @pytest.fixture()
@@ -23,14 +47,8 @@ def process_mock_factory():
 @pytest.fixture()
 def process_mock(process_mock_factory: t.Callable[[str], Mock]) -> Mock:
     process = process_mock_factory("echo")
-    process.stdout.at_eof.side_effect = (False, False, False, True)
-    process.stdout.readline = AsyncMock(
-        side_effect=(b"SCHEMA\n", b"RECORD\n", b"STATE\n")
-    )
-    process.stderr.at_eof.side_effect = (False, False, False, True)
-    process.stderr.readline = AsyncMock(
-        side_effect=(b"Starting\n", b"Running\n", b"Done\n")
-    )
+    process.stdout.read = AsyncMock(side_effect=(b"SCHEMA\nRECORD\n", b"STATE\n", b""))
+    process.stderr.read = AsyncMock(side_effect=(b"Starting\nRun", b"ning\nDone", b""))
     process.sleep = AsyncMock()
     return process
 
@@ -55,3 +73,780 @@ def test_exec(process_mock: Mock):
             )
 
     asyncio.run(_test_exec())
+
+
+def test_exec_logs_lines(process_mock: Mock):
+    """Verify that output split across reads is logged one event per line."""
+
+    async def _test_exec() -> None:
+        inv = Invoker("echo", batch_size=2)
+        with patch("asyncio.create_subprocess_exec") as mock:
+            mock.return_value = process_mock
+            await inv._exec()
+
+    with capture_logs() as logs:
+        asyncio.run(_test_exec())
+
+    events = [entry["event"] for entry in logs]
+    assert sorted(events) == sorted(
+        ["Starting", "Running", "Done", "SCHEMA", "RECORD", "STATE"]
+    )
+    assert events.index("Starting") < events.index("Running") < events.index("Done")
+    assert events.index("SCHEMA") < events.index("RECORD") < events.index("STATE")
+
+
+def test_log_stdio_flush_interval():
+    """Verify complete lines are logged without waiting for the stream to end."""
+
+    async def _test_flush() -> list[str]:
+        inv = Invoker("echo", flush_interval=0.01)
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"first\n")
+        task = asyncio.create_task(inv._log_stdio(reader))
+        await asyncio.sleep(0.1)
+        flushed = [entry["event"] for entry in logs]
+        reader.feed_data(b"second")
+        reader.feed_eof()
+        await task
+        return flushed
+
+    with capture_logs() as logs:
+        flushed = asyncio.run(_test_flush())
+
+    assert flushed == ["first"]
+    assert [entry["event"] for entry in logs] == ["first", "second"]
+
+
+def _log_lines(inv: Invoker, *chunks: bytes) -> list[t.Any]:
+    async def _feed() -> None:
+        reader = asyncio.StreamReader()
+        for chunk in chunks:
+            reader.feed_data(chunk)
+        reader.feed_eof()
+        await inv._log_stdio(reader)
+
+    with capture_logs() as logs:
+        asyncio.run(_feed())
+    return logs
+
+
+def test_log_stdio_long_lines_truncated():
+    inv = Invoker("echo", chunk_size=4, max_line_size=8)
+    logs = _log_lines(inv, b"short\n", b"0123456789" * 3, b"abc\nnext\n", b"x" * 20)
+
+    assert [(entry["event"], entry.get("line_length")) for entry in logs] == [
+        ("short", None),
+        ("01234567", None),
+        ("next", None),
+        ("xxxxxxxx", None),
+        ("output line truncated", 33),
+        ("output line truncated", 20),
+    ]
+
+
+def test_log_stdio_long_lines_split():
+    inv = Invoker("echo", max_line_size=4, long_lines=LongLinePolicy.split)
+    # "é" is 2 bytes, lines are never cut in the middle of a character.
+    logs = _log_lines(inv, "abcé".encode(), "defg\n\xff\xfeok\n".encode("latin-1"))
+
+    assert [entry["event"] for entry in logs] == ["abc", "éde", "fg", "\ufffd\ufffdok"]
+
+
+def test_long_lines_split_stats():
+    inv = Invoker(sys.executable, max_line_size=4, long_lines=LongLinePolicy.split)
+    code = "import sys; sys.stdout.write('x' * 10 + '\\nshort\\n' + 'y' * 9)"
+    with capture_logs():
+        logged = inv.run_and_log("-c", code).stats.streams["stdout"]
+    result = inv.run_and_forward("-c", code, stdout=io.BytesIO())
+    forwarded = result.stats.streams["stdout"]
+
+    assert logged == forwarded == StreamStats(byte_count=26, line_count=3)
+
+
+def test_log_stdio_structured_logs():
+    inv = Invoker("echo", structured_logs=True)
+    logs = _log_lines(
+        inv,
+        b'{"event": "child started", "level": "debug", "timestamp": "now"}\n',
+        b'{"msg": "disk full", "level": "WARN", "free": 0}\n',
+        b'{"msg": "request failed", "level": 50, "self": "pid-1"}\n',
+        b'{"type": "RECORD", "record": {}}\n',
+        b"{not json}\n",
+    )
+
+    assert logs == [
+        {"event": "child started", "log_level": "debug", "timestamp": "now"},
+        {"event": "disk full", "log_level": "warning", "free": 0},
+        {"event": "request failed", "log_level": "error", "child_self": "pid-1"},
+        {"event": '{"type": "RECORD", "record": {}}', "log_level": "info"},
+        {"event": "{not json}", "log_level": "info"},
+    ]
+
+
+def test_run_and_forward_fd(tmp_path: Path):
+    """Verify stdout is handed to the subprocess when the target has a fd."""
+    inv = Invoker(sys.executable)
+    target = tmp_path / "out.bin"
+    with target.open("wb") as f:
+        inv.run_and_forward("-c", "import sys; sys.stdout.write('a\\nb\\n')", stdout=f)
+    assert target.read_bytes() == b"a\nb\n"
+
+
+def test_run_and_forward_buffer():
+    """Verify stdout is copied unchanged to targets without a fd."""
+    inv = Invoker(sys.executable)
+    payload = "x" * 100_000
+    target = io.BytesIO()
+    inv.run_and_forward(
+        "-c",
+        f"import sys; sys.stdout.write('{payload}\\n\\xff')",
+        stdout=target,
+    )
+    assert target.getvalue() == f"{payload}\n\xff".encode()
+
+
+def test_run_and_forward_failure():
+    inv = Invoker(sys.executable)
+    with pytest.raises(subprocess.CalledProcessError):
+        inv.run_and_forward("-c", "raise SystemExit(3)", stdout=io.BytesIO())
+
+
+def test_invoker_pool():
+    """Verify the pool runs all invocations and tags their output."""
+    inv = Invoker(sys.executable)
+    pool = InvokerPool(max_concurrency=2)
+    ids = [
+        pool.submit(inv, "-c", f"print('job {n}')", invocation_id=f"job-{n}")
+        for n in range(3)
+    ]
+    failing = pool.submit(inv, "-c", "raise SystemExit(4)")
+
+    with capture_logs() as logs:
+        results = pool.run_and_log()
+
+    assert [r.invocation_id for r in results] == [*ids, failing]
+    assert [r.returncode for r in results] == [0, 0, 0, 4]
+    assert failing == f"{Path(sys.executable).name}-3"
+    with pytest.raises(subprocess.CalledProcessError):
+        results[-1].check_returncode()
+    for n in range(3):
+        entry = next(e for e in logs if e["event"] == f"job {n}")
+        assert entry["invocation_id"] == f"job-{n}"
+
+    # Default ids keep counting across batches.
+    assert pool.submit(inv, "-c", "pass") == f"{Path(sys.executable).name}-4"
+
+
+def test_arun_and_log_in_running_loop():
+    """Verify the async API runs concurrently and cleans up its signal handler."""
+
+    async def _test() -> None:
+        inv = Invoker(sys.executable)
+        await asyncio.gather(
+            inv.arun_and_log("-c", "print('one')"),
+            inv.arun_and_log("-c", "print('two')"),
+        )
+        with pytest.raises(subprocess.CalledProcessError):
+            await inv.arun_and_log("-c", "raise SystemExit(2)")
+        loop = asyncio.get_running_loop()
+        assert not loop.remove_signal_handler(signal.SIGINT)
+
+    with capture_logs() as logs:
+        asyncio.run(_test())
+    assert {"one", "two"} <= {entry["event"] for entry in logs}
+
+
+def test_arun_captures_output():
+    async def _test() -> subprocess.CompletedProcess:
+        inv = Invoker(sys.executable)
+        return await inv.arun(
+            "-c", "print('out\\r'); import sys; print('err', file=sys.stderr)"
+        )
+
+    result = asyncio.run(_test())
+    assert result.returncode == 0
+    assert result.stdout == "out\n"
+    assert result.stderr == "err\n"
+
+
+def test_loop_factory():
+    created: list[asyncio.AbstractEventLoop] = []
+
+    def _factory() -> asyncio.AbstractEventLoop:
+        loop = asyncio.new_event_loop()
+        created.append(loop)
+        return loop
+
+    inv = Invoker(sys.executable, loop_factory=_factory)
+    inv.run_and_log("-c", "pass")
+    assert len(created) == 1
+    assert created[0].is_closed()
+
+
+def test_run_and_log_stats():
+    """Verify invocations report their throughput and resource usage."""
+    inv = Invoker(sys.executable, log_stats=True)
+    code = "import sys; print('a\\nb'); sys.stderr.write('c\\nd')"
+    with capture_logs() as logs:
+        result = inv.run_and_log("-c", code)
+
+    stats = result.stats
+    assert result.returncode == 0
+    assert stats.streams["stdout"] == StreamStats(byte_count=4, line_count=2)
+    assert stats.streams["stderr"] == StreamStats(byte_count=3, line_count=2)
+    assert stats.wall_time > 0
+    if sys.platform != "win32":
+        assert stats.user_time is not None
+
+    event = next(entry for entry in logs if entry["event"] == "invocation stats")
+    assert event["returncode"] == 0
+    assert event["streams"]["stdout"] == {"byte_count": 4, "line_count": 2}
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="no resource module")
+def test_run_stats_max_rss():
+    import resource
+
+    # Allocate more than any earlier subprocess of the test session.
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    size = (peak * (1 if sys.platform == "darwin" else 1024)) + 2**25
+    inv = Invoker(sys.executable)
+    assert inv.run("-c", f"data = b'x' * {size}").stats.max_rss > size
+    # A smaller subprocess does not raise the peak, its own is unknown.
+    assert inv.run("-c", "pass").stats.max_rss is None
+
+
+def test_run_stats():
+    inv = Invoker(sys.executable)
+    result = inv.run("-c", "print('é')")
+    assert result.stdout == "é\n"
+    assert result.stats.streams["stdout"] == StreamStats(byte_count=3, line_count=1)
+
+
+def test_run_and_log_sampling():
+    inv = Invoker(sys.executable, sample_every=10)
+    with capture_logs() as logs:
+        inv.run_and_log("-c", "for n in range(100): print(n)")
+
+    events = [entry["event"] for entry in logs]
+    assert events[:-1] == [str(n) for n in range(0, 100, 10)]
+    assert logs[-1] == {
+        "event": "90 lines suppressed",
+        "suppressed": 90,
+        "stdio_stream": "stdout",
+        "log_level": "info",
+    }
+
+
+def test_output_tail():
+    tail = OutputTail(max_lines=3, max_bytes=8)
+    tail.extend([b"a", b"b", b"c", b"d"])
+    assert tail.text() == "b\nc\nd"
+    tail.extend([b"12345", b"\xff6"])
+    assert tail.text() == "d\n12345\n�6"
+    tail.extend([b"0123456789"])
+    assert tail.text() == "01234567"
+
+
+def test_run_and_log_failure_tail():
+    inv = Invoker(sys.executable, tail_lines=5)
+    code = "import sys\nfor n in range(1000): print(n, file=sys.stderr)\nsys.exit(3)"
+    with pytest.raises(subprocess.CalledProcessError) as exc_info:
+        inv.run_and_log("-c", code)
+
+    err = exc_info.value
+    assert err.returncode == 3
+    assert err.stderr.splitlines() == ["995", "996", "997", "998", "999"]
+    assert err.output is None
+
+    with capture_logs() as logs:
+        log_subprocess_error("test", err, "failed")
+    assert [entry["event"] for entry in logs] == [
+        "995",
+        "996",
+        "997",
+        "998",
+        "999",
+        "error invoking test",
+    ]
+
+
+def test_log_subprocess_error_stdout_tail():
+    err = subprocess.CalledProcessError(1, "cmd", output="all\nof it", stderr="oops")
+    with capture_logs() as logs:
+        log_subprocess_error("test", err, "failed")
+    assert [entry["event"] for entry in logs] == ["oops", "error invoking test"]
+
+    inv = Invoker(sys.executable, tail_lines=2, tail_stdout=True)
+    code = "for n in range(100): print(n)\nraise SystemExit(1)"
+    with pytest.raises(subprocess.CalledProcessError) as exc_info:
+        inv.run_and_log("-c", code)
+    with capture_logs() as logs:
+        log_subprocess_error("test", exc_info.value, "failed")
+    assert [(entry["event"], entry["stdio_stream"]) for entry in logs[:2]] == [
+        ("98", "stdout"),
+        ("99", "stdout"),
+    ]
+
+
+def test_stream():
+    inv = Invoker(sys.executable)
+    code = "import sys\nfor n in range(5): print(n)\nsys.stdout.write('end')"
+    assert list(inv.stream("-c", code)) == [b"0", b"1", b"2", b"3", b"4", b"end"]
+    assert b"".join(inv.stream("-c", code, chunks=True)) == b"0\n1\n2\n3\n4\nend"
+
+
+def test_stream_long_lines():
+    inv = Invoker(sys.executable, max_line_size=2**16)
+    code = "print('x' * 2**22); print('end')"
+    with capture_logs() as logs:
+        assert [len(line) for line in inv.stream("-c", code)] == [2**16, 3]
+    assert logs[0]["event"] == "output line truncated"
+    assert logs[0]["line_length"] == 2**22
+
+    inv = Invoker(sys.executable, max_line_size=2**20, long_lines="split")
+    assert [len(line) for line in inv.stream("-c", code)] == [2**20] * 4 + [3]
+
+
+def test_stream_stops_early():
+    inv = Invoker(sys.executable)
+    lines = inv.stream("-c", "import itertools\nfor n in itertools.count(): print(n)")
+    assert [next(lines) for _ in range(3)] == [b"0", b"1", b"2"]
+    lines.close()
+
+
+def test_stream_chunks_stats():
+    inv = Invoker(sys.executable, log_stats=True)
+    code = "import sys\nfor n in range(5): print(n)\nsys.stdout.write('end')"
+    with capture_logs() as logs:
+        list(inv.stream("-c", code, chunks=True))
+    assert logs[-1]["streams"]["stdout"] == {"byte_count": 13, "line_count": 6}
+
+
+def test_stream_stops_early_kills_group(tmp_path: Path):
+    inv = Invoker(sys.executable, timeout=60)
+    pid_file = tmp_path / "pid"
+    code = (
+        "import subprocess, sys\n"
+        "sleep = 'import time; time.sleep(60)'\n"
+        "child = subprocess.Popen([sys.executable, '-c', sleep])\n"
+        f"open({str(pid_file)!r}, 'w').write(str(child.pid))\n"
+        "print('started', flush=True)\n"
+        "child.wait()"
+    )
+    lines = inv.stream("-c", code)
+    assert next(lines) == b"started"
+    deadline = time.monotonic() + 10
+    lines.close()
+
+    grandchild = int(pid_file.read_text())
+    while time.monotonic() < deadline:
+        try:
+            os.kill(grandchild, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.05)
+    else:
+        pytest.fail("the subprocess started by the child is still running")
+
+
+def test_astream_failure():
+    async def _consume() -> list[bytes]:
+        inv = Invoker(sys.executable)
+        code = "import sys; print('out'); sys.exit('boom')"
+        return [line async for line in inv.astream("-c", code)]
+
+    with pytest.raises(subprocess.CalledProcessError) as exc_info:
+        asyncio.run(_consume())
+    assert exc_info.value.stderr == "boom"
+
+
+def test_run_and_capture_spills():
+    inv = Invoker(sys.executable)
+    code = "for n in range(1000): print(n)"
+    small = inv.run_and_capture("-c", code).stdout
+    with inv.run_and_capture("-c", code, spill_threshold=100).stdout as large:
+        assert large.spilled
+        assert not small.spilled
+        assert len(large) == len(small)
+        assert large.buffer()[:4] == b"0\n1\n"
+        assert list(large)[-1] == b"999"
+        assert large.getvalue() == small.getvalue()
+    small.close()
+
+
+def test_captured_output_spills_in_thread():
+    capture = CapturedOutput(spill_threshold=4)
+    write = capture.write
+    on_loop = []
+
+    def _write(data: bytes) -> int:
+        on_loop.append(threading.current_thread() is threading.main_thread())
+        return write(data)
+
+    async def _capture() -> None:
+        for data in (b"ab", b"cdef", b"gh"):
+            await capture.awrite(data)
+
+    with capture, patch.object(capture, "write", _write):
+        asyncio.run(_capture())
+        # Only the writes kept in memory block the event loop.
+        assert on_loop == [True, False, False]
+        assert capture.spilled
+        assert capture.getvalue() == b"abcdefgh"
+
+
+def test_run_and_tee(tmp_path: Path):
+    inv = Invoker(sys.executable)
+    progress: list[bytes] = []
+    stderr = io.BytesIO()
+    code = "import sys\nfor n in range(3): print(n); print('err', file=sys.stderr)"
+
+    with capture_logs() as logs:
+        result = inv.run_and_tee(
+            "-c",
+            code,
+            stdout=[
+                FileSink(tmp_path / "out.txt", buffer_size=2),
+                LoggerSink(),
+                CallbackSink(progress.append, lines=True),
+            ],
+            stderr=[FileSink(stderr)],
+        )
+
+    assert (tmp_path / "out.txt").read_bytes() == b"0\n1\n2\n"
+    assert [entry["event"] for entry in logs] == ["0", "1", "2"]
+    assert progress == [b"0", b"1", b"2"]
+    assert stderr.getvalue() == b"err\n" * 3
+    assert result.stats.streams["stdout"].line_count == 3
+
+
+class _StuckSink:
+    def __init__(self) -> None:
+        self.closed = False
+
+    async def write(self, data: bytes) -> None:
+        await asyncio.sleep(10)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def test_run_and_tee_slow_sink():
+    inv = Invoker(sys.executable, chunk_size=1, sink_queue_size=1, sink_timeout=0.1)
+    chunks: list[bytes] = []
+    stuck = _StuckSink()
+
+    with capture_logs() as logs:
+        inv.run_and_tee(
+            "-c", "print('x' * 10)", stdout=[stuck, CallbackSink(chunks.append)]
+        )
+
+    assert b"".join(chunks) == b"x" * 10 + b"\n"
+    assert stuck.closed
+    assert logs[0]["event"] == "output sink detached"
+    assert logs[0]["reason"] == "too slow"
+
+
+def test_run_and_tee_failing_sink():
+    def _fail(data: bytes) -> None:
+        raise ValueError("bad output")
+
+    chunks: list[bytes] = []
+    with pytest.raises(ValueError, match="bad output"):
+        Invoker(sys.executable).run_and_tee(
+            "-c",
+            "print('x')",
+            stdout=[CallbackSink(_fail), CallbackSink(chunks.append)],
+        )
+    assert b"".join(chunks) == b"x\n"
+
+
+def test_exec_fast_spawn(process_mock: Mock, tmp_path: Path):
+    if sys.platform == "win32":
+        pytest.skip("env is not encoded on Windows")
+    binary = tmp_path / "echo"
+    binary.write_text("")
+    binary.chmod(0o755)
+    inv = Invoker("echo", env={"PATH": str(tmp_path)}, fast_spawn=True)
+
+    async def _test_exec() -> None:
+        with patch("asyncio.create_subprocess_exec") as mock:
+            mock.return_value = process_mock
+            await inv._exec("sub_command")
+            mock.assert_called_once_with(
+                str(binary),
+                "sub_command",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=None,
+                env={b"PATH": str(tmp_path).encode()},
+                close_fds=False,
+            )
+
+    asyncio.run(_test_exec())
+    assert inv._spawn_kwargs()["env"] is inv._spawn_kwargs()["env"]
+
+
+def test_run_fast_spawn():
+    inv = Invoker(Path(sys.executable).name, fast_spawn=True)
+    inv.popen_env["PATH"] = str(Path(sys.executable).parent)
+    assert inv.run("-c", "print('fast')").stdout == "fast\n"
+    assert Path(inv.executable).is_absolute()
+
+
+posix_only = pytest.mark.skipif(sys.platform == "win32", reason="POSIX only")
+
+SPAWN_AND_HANG = """
+import signal, subprocess, sys, time
+if sys.argv[1] == "ignore":
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+print(child.pid, flush=True)
+time.sleep(60)
+"""
+
+
+def _gone(pid: int) -> bool:
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@posix_only
+@pytest.mark.parametrize("mode", ["default", "ignore"])
+def test_run_and_log_timeout(mode: str):
+    inv = Invoker(sys.executable, timeout=0.5, kill_grace=0.3)
+    start = time.monotonic()
+    with capture_logs() as logs, pytest.raises(subprocess.TimeoutExpired):
+        inv.run_and_log("-c", SPAWN_AND_HANG, mode)
+    assert time.monotonic() - start < 10
+
+    events = {entry["event"]: entry for entry in logs}
+    assert events["subprocess limit exceeded"]["limit"] == "timeout"
+    assert ("subprocess killed" in events) == (mode == "ignore")
+    grandchild = next(int(entry["event"]) for entry in logs if entry["event"].isdigit())
+    assert _gone(grandchild)
+
+
+@posix_only
+def test_run_timeout():
+    inv = Invoker(sys.executable, timeout=0.5, kill_grace=0.3)
+    with pytest.raises(subprocess.TimeoutExpired) as exc_info:
+        inv.run("-c", SPAWN_AND_HANG, "ignore")
+    assert _gone(int(exc_info.value.stdout))
+
+
+def test_run_timeout_run_kwargs():
+    inv = Invoker(sys.executable, timeout=30)
+    result = inv.run("-c", "print('x')", stdout=None, stderr=None, capture_output=True)
+    assert result.stdout == "x\n"
+    with pytest.raises(subprocess.TimeoutExpired):
+        inv.run("-c", "import time; time.sleep(30)", timeout=0.2)
+
+
+@posix_only
+def test_resource_limits():
+    inv = Invoker(sys.executable, limits=ResourceLimits(cpu_time=1, nice=3))
+    import resource
+
+    if hasattr(resource, "prlimit"):
+        # Applied after the spawn, rather than from a thread-unsafe preexec_fn.
+        assert "preexec_fn" not in inv._spawn_kwargs()
+    assert int(inv.run("-c", "import os; print(os.nice(0))").stdout) == os.nice(0) + 3
+
+    with capture_logs() as logs, pytest.raises(subprocess.CalledProcessError):
+        inv.run_and_log("-c", "while True: pass")
+    assert logs[-1] == {
+        "event": "subprocess limit exceeded",
+        "cmd": sys.executable,
+        "limit": "cpu_time",
+        "cpu_time": 1,
+        "log_level": "warning",
+    }
+
+
+@pytest.mark.parametrize("timeout", [None, 60])
+def test_resource_limits_failure(timeout: float | None):
+    pids = []
+
+    def _apply_to(limits: ResourceLimits, pid: int) -> None:
+        pids.append(pid)
+        raise PermissionError("not allowed")
+
+    inv = Invoker(sys.executable, timeout=timeout, limits=ResourceLimits(nice=-5))
+    sleep = "import time; time.sleep(60)"
+    with (
+        patch.object(ResourceLimits, "apply_to", _apply_to),
+        patch("meltano.edk.process._PRLIMIT", new=True),
+    ):
+        with pytest.raises(PermissionError):
+            inv.run_and_log("-c", sleep)
+        with pytest.raises(PermissionError):
+            inv.run("-c", sleep, timeout=60)
+
+    # The subprocesses were killed and reaped.
+    for pid in pids:
+        with pytest.raises(ProcessLookupError):
+            os.kill(pid, 0)
+
+
+UPPER = "import sys\nfor line in sys.stdin: sys.stdout.write(line.upper())"
+
+
+def test_pipeline():
+    python = Invoker(sys.executable)
+    pipeline = (
+        Pipeline()
+        .add(python, "-c", "for n in range(3): print('line', n)")
+        .add(python, "-c", UPPER)
+        .add(python, "-c", "import sys; sys.stdout.write(sys.stdin.read()[::-1])")
+    )
+    with capture_logs() as logs:
+        results = pipeline.run_and_log()
+
+    assert [entry["event"] for entry in logs] == ["", "2 ENIL", "1 ENIL", "0 ENIL"]
+    assert {entry["invocation_id"] for entry in logs} == {
+        f"{Path(sys.executable).name}-2"
+    }
+    assert [result.returncode for result in results] == [0, 0, 0]
+    assert all(result.stats.wall_time > 0 for result in results)
+
+
+def test_pipeline_forward():
+    python = Invoker(sys.executable)
+    output = io.BytesIO()
+    pipeline = Pipeline().add(python, "-c", "print('a')").add(python, "-c", UPPER)
+    fds = set(os.listdir("/dev/fd")) if sys.platform != "win32" else set()
+    pipeline.run_and_log(stdout=output)
+    assert output.getvalue() == b"A\n"
+    if sys.platform != "win32":
+        assert set(os.listdir("/dev/fd")) == fds
+
+
+def test_pipeline_failure():
+    python = Invoker(sys.executable)
+    pipeline = (
+        Pipeline()
+        .add(python, "-c", "while True: print('x' * 100)")
+        .add(python, "-c", "import sys; sys.stdin.readline(); sys.exit('bad input')")
+    )
+    with pytest.raises(PipelineError) as exc_info:
+        pipeline.run_and_log()
+
+    err = exc_info.value
+    assert err.returncode == 1
+    assert err.stderr == "bad input"
+    assert err.results[0].returncode != 0
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs procfs")
+def test_pipeline_spawn_failure():
+    python = Invoker(sys.executable)
+    broken = Invoker(sys.executable)
+    fds = len(os.listdir("/proc/self/fd"))
+
+    for stage, error in (
+        (Invoker("meltano-edk-missing-binary"), FileNotFoundError),
+        (broken, OSError),
+    ):
+        pipeline = (
+            Pipeline().add(python, "-c", "print('x')").add(stage).add(python, "-c", CAT)
+        )
+        with (
+            capture_logs(),
+            pytest.raises(error),
+            patch.object(broken, "_spawn_kwargs", side_effect=OSError),
+        ):
+            pipeline.run_and_log()
+        # The pipes of the stages that did not spawn were closed.
+        assert len(os.listdir("/proc/self/fd")) == fds
+
+
+CAT = "import sys; sys.stdout.buffer.write(sys.stdin.buffer.read())"
+
+
+def test_run_and_log_stdin_iterable():
+    inv = Invoker(sys.executable)
+    with capture_logs() as logs:
+        inv.run_and_log("-c", UPPER, stdin=["first\n", b"second\n"])
+    assert [entry["event"] for entry in logs] == ["FIRST", "SECOND"]
+
+
+def test_run_and_capture_stdin_async_iterable():
+    chunk = b"x" * 2**16
+
+    async def _chunks() -> t.AsyncIterator[bytes]:
+        for _ in range(128):
+            yield chunk
+
+    async def _capture() -> bytes:
+        inv = Invoker(sys.executable)
+        with (await inv.arun_and_capture("-c", CAT, stdin=_chunks())).stdout as out:
+            return out.getvalue()
+
+    assert asyncio.run(_capture()) == chunk * 128
+
+
+def test_stdin_files(tmp_path: Path):
+    inv = Invoker(sys.executable)
+    path = tmp_path / "input"
+    path.write_bytes(b"from a file\n")
+    with path.open("rb") as file:
+        assert list(inv.stream("-c", CAT, stdin=file)) == [b"from a file"]
+    with path.open("rb") as file:
+        assert list(inv.stream("-c", CAT, stdin=file.fileno())) == [b"from a file"]
+    assert list(inv.stream("-c", CAT, stdin=io.BytesIO(b"in memory"))) == [b"in memory"]
+
+
+def test_stdin_buffered_files(tmp_path: Path):
+    inv = Invoker(sys.executable)
+    path = tmp_path / "input"
+    path.write_bytes(b"header\nbody\n")
+    with path.open("rb") as file:
+        # The rest of the file was read ahead into the buffer.
+        file.readline()
+        assert list(inv.stream("-c", CAT, stdin=file)) == [b"body"]
+
+    with gzip.open(tmp_path / "input.gz", "wb") as compressed:
+        compressed.write(b"decompressed\n")
+    with gzip.open(tmp_path / "input.gz", "rb") as compressed:
+        assert list(inv.stream("-c", CAT, stdin=compressed)) == [b"decompressed"]
+
+
+def test_stdin_streamed_from_pipe():
+    inv = Invoker(sys.executable)
+    echo = "import sys\nfor line in sys.stdin.buffer: print(line.decode(), end='')"
+    read_fd, write_fd = os.pipe()
+    # The producer only finishes if the test gets stuck waiting for the input.
+    producer = threading.Timer(30, os.close, (write_fd,))
+    with open(read_fd, "rb") as file:
+        lines = inv.stream("-u", "-c", echo, stdin=file)
+        os.write(write_fd, b"first\n")
+        producer.start()
+        assert next(lines) == b"first"
+        assert producer.is_alive()
+        producer.cancel()
+        os.write(write_fd, b"second\n")
+        os.close(write_fd)
+        assert list(lines) == [b"second"]
+
+
+def test_stdin_not_consumed():
+    inv = Invoker(sys.executable)
+    result = inv.run_and_log("-c", "pass", stdin=[b"x" * 2**16] * 64)
+    assert result.returncode == 0
+
+
+def test_pipeline_stdin():
+    python = Invoker(sys.executable)
+    output = io.BytesIO()
+    Pipeline().add(python, "-c", CAT).add(python, "-c", UPPER).run_and_log(
+        stdout=output, stdin=[b"piped\n"]
+    )
+    assert output.getvalue() == b"PIPED\n"
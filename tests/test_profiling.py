@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import pstats
+from pathlib import Path
+
+import pytest
+import structlog
+from structlog.testing import capture_logs
+
+from meltano.edk import profiling
+from meltano.edk.profiling import ProfileMode, Profiler
+
+from .test_meltano_edk import CustomExtension
+
+
+@pytest.fixture(autouse=True)
+def reset_profiler(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(profiling, "_profiler", None)
+    monkeypatch.setattr(profiling.atexit, "register", lambda func: func)
+
+
+def test_disabled_by_default(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.delenv(profiling.PROFILE_ENV, raising=False)
+    assert profiling.profiling_from_env() is None
+    with profiling.phase("invoke"):
+        pass
+
+
+def test_invalid_mode(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv(profiling.PROFILE_ENV, "cprofiel")
+    with capture_logs() as logs:
+        assert profiling.profiling_from_env() is None
+    assert logs[0]["event"] == "invalid profiling mode, profiling disabled"
+
+
+def test_pass_through_phase_timings(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv(profiling.PROFILE_ENV, "true")
+    assert isinstance(profiling.profiling_from_env(), Profiler)
+
+    with capture_logs() as logs:
+        CustomExtension().pass_through_invoker(structlog.get_logger(), "arg")
+
+    (event,) = [entry for entry in logs if entry["event"] == "extension profile"]
+    assert set(event["phases"]) == {"pre_invoke", "invoke", "post_invoke"}
+    assert event["total"] >= sum(event["phases"].values())
+    assert event["profile_path"] is None
+
+
+def test_cprofile_dump(tmp_path: Path):
+    profiler = profiling.configure_profiling(ProfileMode.cprofile, str(tmp_path))
+    assert profiling.configure_profiling(ProfileMode.timings) is profiler
+
+    with capture_logs() as logs:
+        CustomExtension().pass_through_invoker(structlog.get_logger(), "arg")
+        profiler.finish()
+
+    (event,) = [entry for entry in logs if entry["event"] == "extension profile"]
+    path = Path(event["profile_path"])
+    assert path.parent == tmp_path
+    functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+    assert "invoke" in functions
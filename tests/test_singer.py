@@ -0,0 +1,67 @@
+import json
+import sys
+from functools import partial
+
+import structlog
+from structlog.testing import capture_logs
+
+from meltano.edk.process import Invoker
+from meltano.edk.singer import SingerClassifier
+
+MESSAGES = [
+    {"type": "SCHEMA", "stream": "users", "schema": {}, "key_properties": ["id"]},
+    {"type": "RECORD", "stream": "users", "record": {"id": 1}},
+    {"stream": "users", "type": "RECORD", "record": {"id": 2}},
+    {"type": "RECORD", "stream": "orders", "record": {"type": "RECORD"}},
+    {"type": "STATE", "value": {"bookmarks": {"users": 2}}},
+]
+
+
+def _lines() -> list[bytes]:
+    return [json.dumps(message).encode() for message in MESSAGES]
+
+
+def test_classifier_counts_records():
+    classifier = SingerClassifier()
+    with capture_logs() as logs:
+        classifier.feed(
+            [*_lines(), b"plain text", b"{not json"], structlog.get_logger()
+        )
+        classifier.close(structlog.get_logger())
+
+    assert classifier.message_counts == {"SCHEMA": 1, "RECORD": 3, "STATE": 1}
+    assert classifier.record_counts == {"users": 2, "orders": 1}
+
+    events = [entry["event"] for entry in logs]
+    assert events == [
+        "singer schema",
+        "singer state",
+        "plain text",
+        "{not json",
+        "singer summary",
+    ]
+    assert logs[0]["key_properties"] == ["id"]
+    assert logs[1]["value"] == {"bookmarks": {"users": 2}}
+    assert logs[-1]["records"] == {"users": 2, "orders": 1}
+
+
+def test_classifier_periodic_summary():
+    classifier = SingerClassifier(summary_interval=0)
+    with capture_logs() as logs:
+        classifier.feed(_lines()[1:2], structlog.get_logger())
+
+    assert logs[-1]["event"] == "singer records"
+    assert logs[-1]["records"] == {"users": 1}
+
+
+def test_invoker_stdout_classifier():
+    code = "\n".join(f"print({line.decode()!r})" for line in _lines())
+    inv = Invoker(
+        sys.executable,
+        stdout_classifier=partial(SingerClassifier, summary_interval=60),
+    )
+    with capture_logs() as logs:
+        inv.run_and_log("-c", code)
+
+    events = [entry["event"] for entry in logs]
+    assert events == ["singer schema", "singer state", "singer summary"]
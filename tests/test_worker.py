@@ -0,0 +1,66 @@
+import os
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from meltano.edk.worker import Worker, WorkerCrashedError
+
+CLI = """\
+import os
+import sys
+
+def main():
+    command, *args = sys.argv[1:]
+    if command == "echo":
+        print(*args)
+        print("to stderr", file=sys.stderr)
+    elif command == "pid":
+        print(os.getpid())
+    elif command == "fail":
+        sys.exit(int(args[0]))
+    elif command == "crash":
+        os._exit(9)
+"""
+
+
+@pytest.fixture()
+def worker(tmp_path: Path):
+    (tmp_path / "fake_cli.py").write_text(CLI)
+    env = {**os.environ, "PYTHONPATH": str(tmp_path)}
+    with Worker.python_entry_point("fake_cli:main", env=env, max_restarts=1) as w:
+        yield w
+
+
+def test_worker_reuses_process(worker: Worker):
+    result = worker.run("echo", "hello", "world")
+    assert result.returncode == 0
+    assert result.stdout == "hello world\n"
+    assert result.stderr == "to stderr\n"
+    assert result.args[-3:] == ["echo", "hello", "world"]
+
+    assert worker.run("pid").stdout == worker.run("pid").stdout
+
+
+def test_worker_failure(worker: Worker):
+    with pytest.raises(subprocess.CalledProcessError) as exc_info:
+        worker.run("fail", "3")
+    assert exc_info.value.returncode == 3
+    assert worker.run("fail", "4", check=False).returncode == 4
+    assert worker.running
+
+
+def test_worker_restarts_after_crash(worker: Worker):
+    pid = worker.run("pid").stdout
+    with pytest.raises(WorkerCrashedError) as exc_info:
+        worker.run("crash")
+    assert exc_info.value.returncode == 9
+    assert not worker.running
+
+    assert worker.run("pid").stdout != pid
+    assert worker.restarts == 1
+
+    with pytest.raises(WorkerCrashedError):
+        worker.run("crash")
+    with pytest.raises(WorkerCrashedError):
+        worker.run("pid")